@@ -0,0 +1,157 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY, MetricsRegistry
+
+# Seconds; a request that queues longer than its class deadline is degraded instead
+ADMISSION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class AdmissionClass:
+    """Requests of one kind: their own concurrency limit, queue bound and queue deadline"""
+
+    def __init__(self, name: str, priority: int, limit: int, queue_seconds: float, max_waiting: int):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue_seconds = queue_seconds
+        self.max_waiting = max_waiting
+        self.running = 0
+        self.waiting = 0
+
+
+class AdmissionController:
+    """Per-class concurrency limits over a shared pool of slots, with priorities.
+
+    Every class also draws on capacity, the total of expensive requests
+    (LLM calls, geocodes, route planning) the process runs at once. When a
+    slot frees up, the highest-priority waiter whose class is under its own
+    limit gets it. A request that would exceed its class's max_waiting or
+    waits past queue_seconds is not admitted; the caller then answers from a
+    cache or a deterministic fallback instead of queueing more work.
+    """
+
+    def __init__(self, capacity: int, registry: MetricsRegistry = REGISTRY):
+        self.capacity = capacity
+        self.in_use = 0
+        self.classes: Dict[str, AdmissionClass] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future, AdmissionClass]] = []
+        self._sequence = itertools.count()
+
+        self.requests = registry.counter(
+            "admission_requests_total", "Requests by admission class and outcome", ["class", "outcome"]
+        )
+        self.queue_time = registry.histogram(
+            "admission_queue_seconds", "Time admitted requests waited for a slot", ["class"], buckets=ADMISSION_BUCKETS
+        )
+        self.running = registry.gauge("admission_running", "Admitted requests in progress", ["class"])
+        self.queued = registry.gauge("admission_waiting", "Requests waiting for admission", ["class"])
+
+    def add_class(self, name: str, priority: int, limit: int, queue_seconds: float,
+                  max_waiting: Optional[int] = None) -> AdmissionClass:
+        """Register a class; a lower priority number is served first"""
+        admission_class = AdmissionClass(
+            name, priority, limit, queue_seconds, limit * 2 if max_waiting is None else max_waiting
+        )
+        self.classes[name] = admission_class
+        self.running.labels(name).set_function(lambda: admission_class.running)
+        self.queued.labels(name).set_function(lambda: admission_class.waiting)
+        return admission_class
+
+    def _can_run(self, admission_class: AdmissionClass) -> bool:
+        return admission_class.running < admission_class.limit and self.in_use < self.capacity
+
+    def _take(self, admission_class: AdmissionClass):
+        admission_class.running += 1
+        self.in_use += 1
+
+    async def acquire(self, name: str) -> bool:
+        """Wait for a slot; False if the request should be degraded instead"""
+        admission_class = self.classes[name]
+        # Slots are handed to waiters as soon as they free up, so anyone still
+        # waiting is blocked by their own class limit and cannot be overtaken unfairly
+        if self._can_run(admission_class):
+            self._take(admission_class)
+            self.requests.labels(name, "admitted").inc()
+            self.queue_time.labels(name).observe(0.0)
+            return True
+        if admission_class.waiting >= admission_class.max_waiting:
+            self.requests.labels(name, "shed_queue_full").inc()
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (admission_class.priority, next(self._sequence), future, admission_class))
+        admission_class.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), admission_class.queue_seconds)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self.requests.labels(name, "shed_deadline").inc()
+                return False
+        except asyncio.CancelledError:
+            # The client went away; hand on a slot granted in the meantime
+            if future.done() and not future.cancelled():
+                self.release(name)
+            else:
+                future.cancel()
+            raise
+        finally:
+            admission_class.waiting -= 1
+        self.requests.labels(name, "admitted").inc()
+        self.queue_time.labels(name).observe(time.perf_counter() - started)
+        return True
+
+    def release(self, name: str):
+        admission_class = self.classes[name]
+        admission_class.running -= 1
+        self.in_use -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant freed slots to waiters in priority order"""
+        blocked = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            _, _, future, admission_class = entry
+            if future.done():
+                continue
+            if not self._can_run(admission_class):
+                # Its class is at its limit (or capacity is gone); other classes may still fit
+                blocked.append(entry)
+                continue
+            self._take(admission_class)
+            future.set_result(True)
+        for entry in blocked:
+            heapq.heappush(self._waiters, entry)
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[bool]:
+        """async with admission.slot(name) as admitted: ...; releases the slot if one was granted"""
+        admitted = await self.acquire(name)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(name)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "classes": {
+                name: {
+                    "priority": c.priority,
+                    "limit": c.limit,
+                    "queue_seconds": c.queue_seconds,
+                    "running": c.running,
+                    "waiting": c.waiting,
+                }
+                for name, c in self.classes.items()
+            },
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Optional, Tuple
+
+from geo import geohash_bbox
+from metrics import REGISTRY, MetricsRegistry
+from shared_cache import MemoryCache
+
+# Generates the entry for a cell from its centre: {"location": ..., "advisories": [...]}, or None on failure
+AdvisoryGenerator = Callable[[float, float], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class AdvisoryCache:
+    """AI travel advisories per geohash cell and time bucket.
+
+    Everyone in a cell during one bucket shares one generation, stored in
+    db.advisories under cache_key with a Date expires_at (a TTL index removes
+    it) and kept in a small in-process window. When the current bucket has
+    no entry yet, the previous bucket's is served while a background task
+    generates the new one (stale-while-revalidate). Concurrent misses for a
+    key share one generation in this process, and claim() keeps other
+    workers from refreshing the same key at the same time; a refresh that
+    fails gives its claim back with release() so the next request retries.
+    A miss never waits on a background refresh, which may give up to another
+    worker. A cold miss that would start a generation first asks admission()
+    for a slot; without one the caller gets an empty "shed" entry instead of
+    queueing an LLM call.
+
+    Cache documents have no is_active or top-level coordinates, so the
+    official advisory queries and geofences never pick them up.
+    """
+
+    def __init__(
+        self,
+        db,
+        generate: AdvisoryGenerator,
+        precision: int = 5,
+        bucket_seconds: float = 3600.0,
+        memory_entries: int = 2048,
+        claim: Optional[Callable[[str, float], Awaitable[bool]]] = None,
+        release: Optional[Callable[[str], Awaitable[None]]] = None,
+        admission: Optional[Callable[[], AsyncContextManager[bool]]] = None,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.db = db
+        self.generate = generate
+        self.precision = precision
+        self.bucket_seconds = bucket_seconds
+        self.recent = MemoryCache(memory_entries)
+        self.claim = claim
+        self.release = release
+        self.admission = admission
+        # Keyed by (cache key, refresh)
+        self._inflight: Dict[Tuple[str, bool], asyncio.Task] = {}
+        self.requests = registry.counter(
+            "advisory_cache_requests_total", "Advisory lookups by cache result", ["result"]
+        )
+        self.generations = registry.counter(
+            "advisory_generations_total", "Advisory generations by outcome", ["outcome"]
+        )
+
+    async def ensure_indexes(self):
+        cached = {"cache_key": {"$exists": True}}
+        await self.db.advisories.create_index("cache_key", unique=True, partialFilterExpression=cached)
+        await self.db.advisories.create_index("expires_at", expireAfterSeconds=0, partialFilterExpression=cached)
+
+    def _key(self, cell: str, bucket: int) -> str:
+        return f"{cell}:{bucket}"
+
+    def _bucket_end(self, bucket: int) -> float:
+        return (bucket + 1) * self.bucket_seconds
+
+    async def get(self, lat: float, lng: float) -> Tuple[Dict[str, Any], str]:
+        """The advisories for a point and whether they were a "hit", "stale", a "miss" or "shed" """
+        cell, bbox = geohash_bbox(lat, lng, self.precision)
+        bucket = int(time.time() // self.bucket_seconds)
+
+        entry = await self._load(self._key(cell, bucket))
+        if entry is not None:
+            self.requests.labels("hit").inc()
+            return entry, "hit"
+
+        previous = await self._load(self._key(cell, bucket - 1))
+        if previous is not None:
+            self.requests.labels("stale").inc()
+            self._generation(cell, bbox, bucket, refresh=True)
+            return previous, "stale"
+
+        if self.admission is None or (self._key(cell, bucket), False) in self._inflight:
+            self.requests.labels("miss").inc()
+            entry = await asyncio.shield(self._generation(cell, bbox, bucket, refresh=False))
+            return entry, "miss"
+        async with self.admission() as admitted:
+            if not admitted:
+                self.requests.labels("shed").inc()
+                return {"location": "", "advisories": []}, "shed"
+            self.requests.labels("miss").inc()
+            entry = await asyncio.shield(self._generation(cell, bbox, bucket, refresh=False))
+        return entry, "miss"
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = await self.recent.get(key)
+        if entry is not None:
+            return entry
+        doc = await self.db.advisories.find_one(
+            {"cache_key": key}, {"_id": 0, "location": 1, "advisories": 1, "generated_at": 1, "expires_at": 1}
+        )
+        if doc is None:
+            return None
+        expires_at = doc.pop("expires_at")
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if ttl <= 0:
+            # The TTL monitor runs about once a minute
+            return None
+        await self.recent.set(key, doc, ttl)
+        return doc
+
+    def _generation(self, cell: str, bbox, bucket: int, refresh: bool) -> "asyncio.Task":
+        """The in-flight generation for a key, started if there is none"""
+        key = self._key(cell, bucket)
+        task = self._inflight.get((key, refresh))
+        if task is None:
+            task = asyncio.create_task(self._generate(key, bbox, bucket, refresh))
+            self._inflight[(key, refresh)] = task
+            task.add_done_callback(lambda _: self._inflight.pop((key, refresh), None))
+        return task
+
+    async def _generate(self, key: str, bbox, bucket: int, refresh: bool) -> Dict[str, Any]:
+        claimed = refresh and self.claim is not None
+        if claimed and not await self.claim(f"advisory:{key}", self.bucket_seconds):
+            # Another worker is refreshing this cell
+            return {"location": "", "advisories": []}
+        min_lat, min_lng, max_lat, max_lng = bbox
+        try:
+            generated = await self.generate((min_lat + max_lat) / 2, (min_lng + max_lng) / 2)
+        except Exception as e:
+            logging.error(f"Advisory generation error for {key}: {str(e)}")
+            generated = None
+        if not generated or not generated.get("advisories"):
+            # Not cached, so the next request tries again
+            self.generations.labels("empty").inc()
+            if claimed and self.release is not None:
+                await self.release(f"advisory:{key}")
+            return generated or {"location": "", "advisories": []}
+
+        now = datetime.now(timezone.utc)
+        # Served as fresh for its own bucket and as stale during the next one
+        expires_at = datetime.fromtimestamp(self._bucket_end(bucket + 1), timezone.utc)
+        entry = {"location": generated["location"], "advisories": generated["advisories"], "generated_at": now}
+        await self.db.advisories.update_one(
+            {"cache_key": key},
+            {"$set": dict(entry, expires_at=expires_at)},
+            upsert=True
+        )
+        await self.recent.set(key, entry, (expires_at - now).total_seconds())
+        self.generations.labels("stored").inc()
+        return entry
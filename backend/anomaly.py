@@ -0,0 +1,228 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from geo import KM_PER_DEGREE, haversine_km
+
+IMPOSSIBLE_JUMP = "impossible_jump"
+PROLONGED_STILLNESS = "prolonged_stillness"
+ROUTE_DEVIATION = "route_deviation"
+
+
+@dataclass
+class Anomaly:
+    kind: str
+    tourist_id: str
+    latitude: float
+    longitude: float
+    timestamp: float
+    message: str
+    details: Dict[str, Any]
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "tourist_id": self.tourist_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "timestamp": self.timestamp,
+            "message": self.message,
+            "details": self.details
+        }
+
+
+class TrackState:
+    """Constant-size rolling state for one tourist"""
+
+    __slots__ = (
+        "lat", "lng", "ts", "fixes",
+        "speed_mean", "speed_var", "heading", "turn_mean",
+        "anchor_lat", "anchor_lng", "still_since", "still_reported",
+        "plan", "off_route",
+    )
+
+    def __init__(self):
+        self.lat = self.lng = self.ts = None
+        self.fixes = 0
+        self.speed_mean = 0.0
+        self.speed_var = 0.0
+        self.heading: Optional[float] = None
+        self.turn_mean = 0.0
+        self.anchor_lat = self.anchor_lng = None
+        self.still_since = None
+        self.still_reported = False
+        self.plan: Optional[Tuple[Tuple[float, float], ...]] = None
+        self.off_route = False
+
+
+def bearing_deg(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1_rad, lat2_rad = math.radians(lat1), math.radians(lat2)
+    delta_lng = math.radians(lng2 - lng1)
+    x = math.sin(delta_lng) * math.cos(lat2_rad)
+    y = math.cos(lat1_rad) * math.sin(lat2_rad) - math.sin(lat1_rad) * math.cos(lat2_rad) * math.cos(delta_lng)
+    return (math.degrees(math.atan2(x, y)) + 360.0) % 360.0
+
+
+def distance_to_path_km(lat: float, lng: float, path: Sequence[Tuple[float, float]]) -> float:
+    """Distance from a point to a polyline (equirectangular approximation around the point)"""
+    if len(path) == 1:
+        return haversine_km(lat, lng, path[0][0], path[0][1])
+
+    kx = KM_PER_DEGREE * math.cos(math.radians(lat))
+    best = float("inf")
+    for (lat1, lng1), (lat2, lng2) in zip(path, path[1:]):
+        ax, ay = (lng1 - lng) * kx, (lat1 - lat) * KM_PER_DEGREE
+        bx, by = (lng2 - lng) * kx, (lat2 - lat) * KM_PER_DEGREE
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        t = 0.0 if length_sq == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_sq))
+        best = min(best, math.hypot(ax + t * dx, ay + t * dy))
+    return best
+
+
+class AnomalyDetector:
+    """Incremental movement anomaly detection over location streams.
+
+    Each fix updates O(1) per-tourist state: the previous fix, exponentially
+    weighted speed and turn statistics, a stillness anchor and the planned
+    route. Anomalies are reported once per episode, not on every fix.
+    """
+
+    def __init__(
+        self,
+        max_speed_kmh: float = 900.0,
+        min_jump_km: float = 5.0,
+        speed_sigma: float = 6.0,
+        still_radius_km: float = 0.2,
+        still_seconds: float = 7200.0,
+        route_deviation_km: float = 100.0,
+        alpha: float = 0.2,
+    ):
+        self.max_speed_kmh = max_speed_kmh
+        self.min_jump_km = min_jump_km
+        self.speed_sigma = speed_sigma
+        self.still_radius_km = still_radius_km
+        self.still_seconds = still_seconds
+        self.route_deviation_km = route_deviation_km
+        self.alpha = alpha
+        self._tracks: Dict[str, TrackState] = {}
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def has_plan(self, tourist_id: str) -> bool:
+        track = self._tracks.get(tourist_id)
+        return bool(track and track.plan is not None)
+
+    def set_plan(self, tourist_id: str, destinations: Sequence[Tuple[float, float]]):
+        """Planned destinations in visiting order; an empty plan disables deviation checks"""
+        track = self._tracks.setdefault(tourist_id, TrackState())
+        track.plan = tuple(destinations)
+
+    def forget(self, tourist_id: str):
+        self._tracks.pop(tourist_id, None)
+
+    def stats(self, tourist_id: str) -> Optional[Dict[str, Any]]:
+        track = self._tracks.get(tourist_id)
+        if not track or track.ts is None:
+            return None
+        return {
+            "fixes": track.fixes,
+            "speed_mean_kmh": track.speed_mean,
+            "speed_std_kmh": math.sqrt(track.speed_var),
+            "heading_deg": track.heading,
+            "turn_mean_deg": track.turn_mean,
+            "still_since": track.still_since,
+            "off_route": track.off_route
+        }
+
+    def update(self, tourist_id: str, lat: float, lng: float, ts: float) -> List[Anomaly]:
+        """Feed one fix (ts in unix seconds) and return any new anomalies"""
+        track = self._tracks.get(tourist_id)
+        if track is None:
+            track = self._tracks[tourist_id] = TrackState()
+
+        anomalies: List[Anomaly] = []
+        if track.ts is None:
+            self._reset_position(track, lat, lng, ts)
+            self._check_route(tourist_id, track, lat, lng, ts, anomalies)
+            return anomalies
+
+        dt = ts - track.ts
+        if dt <= 0:
+            # Duplicate or out-of-order fix; nothing to learn from it
+            return anomalies
+
+        distance = haversine_km(track.lat, track.lng, lat, lng)
+        speed = distance / (dt / 3600.0)
+
+        # Impossible jump: faster than any plausible transport, or far outside this track's norm
+        speed_std = math.sqrt(track.speed_var)
+        unusual = track.fixes >= 5 and speed > track.speed_mean + self.speed_sigma * max(speed_std, 5.0)
+        if distance >= self.min_jump_km and (speed > self.max_speed_kmh or (unusual and speed > 250.0)):
+            anomalies.append(Anomaly(
+                IMPOSSIBLE_JUMP, tourist_id, lat, lng, ts,
+                f"Impossible movement: {distance:.1f} km in {dt / 60:.1f} min ({speed:.0f} km/h)",
+                {"distance_km": distance, "seconds": dt, "speed_kmh": speed,
+                 "from": {"lat": track.lat, "lng": track.lng}}
+            ))
+            # Treat the jump as a teleport: restart the rolling stats from here
+            self._reset_position(track, lat, lng, ts)
+            track.speed_mean = track.speed_var = 0.0
+            track.fixes = 1
+            self._check_route(tourist_id, track, lat, lng, ts, anomalies)
+            return anomalies
+
+        # Rolling speed and turn statistics (EWMA mean/variance)
+        delta = speed - track.speed_mean
+        track.speed_mean += self.alpha * delta
+        track.speed_var = (1 - self.alpha) * (track.speed_var + self.alpha * delta * delta)
+        if distance > 0.01:
+            heading = bearing_deg(track.lat, track.lng, lat, lng)
+            if track.heading is not None:
+                turn = abs((heading - track.heading + 180.0) % 360.0 - 180.0)
+                track.turn_mean += self.alpha * (turn - track.turn_mean)
+            track.heading = heading
+
+        # Prolonged stillness around an anchor point
+        if haversine_km(track.anchor_lat, track.anchor_lng, lat, lng) > self.still_radius_km:
+            track.anchor_lat, track.anchor_lng = lat, lng
+            track.still_since = ts
+            track.still_reported = False
+        elif not track.still_reported and ts - track.still_since >= self.still_seconds:
+            track.still_reported = True
+            anomalies.append(Anomaly(
+                PROLONGED_STILLNESS, tourist_id, lat, lng, ts,
+                f"No movement for {(ts - track.still_since) / 3600:.1f} hours",
+                {"still_since": track.still_since, "seconds": ts - track.still_since}
+            ))
+
+        track.lat, track.lng, track.ts = lat, lng, ts
+        track.fixes += 1
+        self._check_route(tourist_id, track, lat, lng, ts, anomalies)
+        return anomalies
+
+    def _reset_position(self, track: TrackState, lat: float, lng: float, ts: float):
+        track.lat, track.lng, track.ts = lat, lng, ts
+        track.anchor_lat, track.anchor_lng = lat, lng
+        track.still_since = ts
+        track.still_reported = False
+        track.heading = None
+        track.fixes += 1
+
+    def _check_route(self, tourist_id: str, track: TrackState, lat: float, lng: float, ts: float,
+                     anomalies: List[Anomaly]):
+        if not track.plan:
+            return
+        deviation = distance_to_path_km(lat, lng, track.plan)
+        if deviation > self.route_deviation_km:
+            if not track.off_route:
+                track.off_route = True
+                anomalies.append(Anomaly(
+                    ROUTE_DEVIATION, tourist_id, lat, lng, ts,
+                    f"Tourist is {deviation:.0f} km away from the planned route",
+                    {"deviation_km": deviation}
+                ))
+        elif deviation < self.route_deviation_km * 0.8:
+            # Hysteresis so a tourist hovering at the threshold is not re-flagged
+            track.off_route = False
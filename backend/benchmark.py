@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the Tourist Safety API.
+
+Runs the FastAPI app in-process against a local Mongo stand-in (mongomock
+from requirements-dev.txt, or a real server with --mongo-url) with the LLM
+and Nominatim replaced by fakes, drives weighted workload mixes from
+concurrent async clients and reports throughput and p50/p99 latency per
+endpoint. Results are written as JSON so runs can be compared:
+
+    python benchmark.py --scenario mixed --duration 30 --output after.json --baseline before.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import types
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+# Operation weights per scenario; operations are defined in OPERATIONS below
+SCENARIOS: Dict[str, Dict[str, float]] = {
+    "location_storm": {"location_update": 1},
+    "route_compare": {"route_compare": 1},
+    "admin_polling": {
+        "dashboard_stats": 3, "admin_alerts": 2, "admin_tourists": 2, "nearby_threats": 2, "risk_tile": 3
+    },
+    "mixed": {
+        "location_update": 70, "route_compare": 2, "dashboard_stats": 5, "admin_alerts": 4, "admin_tourists": 3,
+        "nearby_threats": 5, "risk_tile": 10, "emergency_alert": 1
+    },
+}
+
+BENCHMARK_DB_NAME = "tourist_safety_benchmark"
+
+
+# Fakes for external services
+
+class FakeLlmChat:
+    """Stand-in for emergentintegrations' LlmChat returning canned JSON after a simulated delay"""
+
+    latency = 0.0
+    rng = random.Random(0)
+
+    def __init__(self, api_key: Optional[str] = None, session_id: str = "", system_message: str = ""):
+        self.session_id = session_id
+
+    def with_model(self, provider: str, model: str) -> "FakeLlmChat":
+        return self
+
+    async def send_message(self, message) -> str:
+        await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        if self.session_id.startswith("efir_"):
+            return json.dumps({
+                "fir_number": f"E-FIR-{self.session_id[5:13]}", "incident_classification": "tourist_emergency",
+                "severity_level": "high", "incident_summary": "Benchmark incident",
+                "recommended_actions": ["Dispatch nearest unit"], "priority_level": "high"
+            })
+        if self.session_id.startswith("advisory_"):
+            return json.dumps([{
+                "title": "Benchmark advisory", "content": "Exercise normal precautions.",
+                "advisory_type": "security", "severity": "caution", "source": "local_authority"
+            }])
+        return json.dumps({
+            "overall_safety_score": 72, "risk_factors": ["Benchmark risk"], "safe_segments": [],
+            "danger_zones": [], "recommendations": ["Travel in daylight"], "alternative_suggestions": [],
+            "best_travel_times": ["Morning"], "emergency_contacts": ["112"]
+        })
+
+
+class FakeResponse:
+    def __init__(self, payload: Any):
+        self.status_code = 200
+        self._payload = payload
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class FakeNominatim:
+    """Replaces the server's HTTP GET; blocks like the real synchronous call would"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> FakeResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        if "/search" in url:
+            return FakeResponse([{"lat": "28.6139", "lon": "77.2090"}])
+        return FakeResponse({"display_name": "Benchmark Place"})
+
+
+class FakeUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def install_fake_llm(latency: float):
+    """Register FakeLlmChat as emergentintegrations.llm.chat, which the server imports on first use"""
+    FakeLlmChat.latency = latency
+    chat_module = types.ModuleType("emergentintegrations.llm.chat")
+    chat_module.LlmChat = FakeLlmChat
+    chat_module.UserMessage = FakeUserMessage
+    sys.modules["emergentintegrations"] = types.ModuleType("emergentintegrations")
+    sys.modules["emergentintegrations.llm"] = types.ModuleType("emergentintegrations.llm")
+    sys.modules["emergentintegrations.llm.chat"] = chat_module
+
+
+def load_server(mongo_url: Optional[str], db_name: str, llm_latency: float, geocode_latency: float):
+    """Import server.py wired to the Mongo stand-in and the fake LLM and geocoder"""
+    os.environ["MONGO_URL"] = mongo_url or "mongodb://benchmark.invalid"
+    os.environ["DB_NAME"] = db_name
+    if not mongo_url:
+        import database
+        from mongomock_motor import AsyncMongoMockClient
+        database.AsyncIOMotorClient = AsyncMongoMockClient
+    install_fake_llm(llm_latency)
+
+    import server
+    server.http_get = FakeNominatim(geocode_latency).get
+    return server
+
+
+# In-process ASGI client
+
+class AppClient:
+    """Calls an ASGI app directly, without sockets.
+
+    A request returns as soon as the response body is complete; background
+    tasks keep running on the loop afterwards, as they would under uvicorn.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pending: set = set()
+
+    async def request(self, method: str, path: str, body: Any = None,
+                      query: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        payload = json.dumps(body).encode() if body is not None else b""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(query or {}).encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"benchmark"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+        }
+        done = asyncio.get_running_loop().create_future()
+        status = [500]
+        chunks: List[bytes] = []
+        sent = [False]
+
+        async def receive():
+            if not sent[0]:
+                sent[0] = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await done
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body") and not done.done():
+                    done.set_result(None)
+
+        async def run():
+            try:
+                await self.app(scope, receive, send)
+            except Exception as e:
+                # Starlette has already answered 500; keep the app error out of the load loop
+                logging.debug(f"Unhandled app error on {method} {path}: {str(e)}")
+            finally:
+                if not done.done():
+                    done.set_result(None)
+
+        task = asyncio.create_task(run())
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        await done
+        return status[0], b"".join(chunks)
+
+    async def drain(self) -> float:
+        """Wait for outstanding background work; returns the seconds it took"""
+        started = time.perf_counter()
+        while self.pending:
+            await asyncio.gather(*list(self.pending), return_exceptions=True)
+        return time.perf_counter() - started
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Run the app's startup and shutdown handlers through the ASGI lifespan protocol"""
+    messages: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    started, stopped = loop.create_future(), loop.create_future()
+
+    async def send(message):
+        kind = message["type"]
+        waiter = started if kind.startswith("lifespan.startup") else stopped
+        if kind.endswith(".failed"):
+            waiter.set_exception(RuntimeError(message.get("message", kind)))
+        else:
+            waiter.set_result(None)
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, messages.get, send))
+    await messages.put({"type": "lifespan.startup"})
+    await started
+    try:
+        yield
+    finally:
+        await messages.put({"type": "lifespan.shutdown"})
+        await stopped
+        await task
+
+
+# Workload
+
+class Workload:
+    """Registered tourists moving around the bundled threat zones"""
+
+    def __init__(self, server, tourists: int, seed: int):
+        self.server = server
+        self.tourist_count = tourists
+        self.rng = random.Random(seed)
+        self.tourists: List[Dict[str, Any]] = []
+        self.hotspots = [
+            (r["latitude"], r["longitude"], r["radius_km"]) for r in server.global_threat_records()
+        ]
+
+    def near_hotspot(self, rng: random.Random) -> Tuple[float, float]:
+        lat, lng, radius_km = rng.choice(self.hotspots)
+        # Start inside or just outside the zone so geofence transitions happen
+        distance_km = rng.uniform(0, radius_km * 2)
+        bearing = rng.uniform(0, 2 * math.pi)
+        dlat = distance_km / 111.0 * math.cos(bearing)
+        dlng = distance_km / (111.0 * max(math.cos(math.radians(lat)), 0.01)) * math.sin(bearing)
+        return max(min(lat + dlat, 85.0), -85.0), ((lng + dlng + 180) % 360) - 180
+
+    async def setup(self, client: AppClient):
+        start = datetime.now(timezone.utc)
+        for i in range(self.tourist_count):
+            status, body = await client.request("POST", "/api/tourist-id/register", {
+                "tourist_name": f"Benchmark Tourist {i}",
+                "phone_number": f"+10000000{i:04d}",
+                "email": f"tourist{i}@benchmark.invalid",
+                "nationality": self.rng.choice(["IN", "US", "DE", "JP", "BR"]),
+                "emergency_contact_name": "Contact",
+                "emergency_contact_phone": "+19999999999",
+                "trip_start_date": start.isoformat(),
+                "trip_end_date": (start + timedelta(days=14)).isoformat(),
+                "planned_destinations": [],
+            })
+            if status != 200:
+                raise RuntimeError(f"Tourist registration failed with HTTP {status}: {body[:200]!r}")
+            lat, lng = self.near_hotspot(self.rng)
+            self.tourists.append({"id": json.loads(body)["id"], "lat": lat, "lng": lng})
+
+
+def location_update(workload: Workload, rng: random.Random):
+    tourist = rng.choice(workload.tourists)
+    # A walk of up to ~2 km per fix, with the occasional long jump
+    if rng.random() < 0.02:
+        tourist["lat"], tourist["lng"] = workload.near_hotspot(rng)
+    else:
+        tourist["lat"] = max(min(tourist["lat"] + rng.uniform(-0.02, 0.02), 85.0), -85.0)
+        tourist["lng"] = ((tourist["lng"] + rng.uniform(-0.02, 0.02) + 180) % 360) - 180
+    return "POST", "/api/location/update", {
+        "tourist_id": tourist["id"], "latitude": tourist["lat"], "longitude": tourist["lng"]
+    }, None
+
+
+def route_compare(workload: Workload, rng: random.Random):
+    start = workload.near_hotspot(rng)
+    bearing = rng.uniform(0, 2 * math.pi)
+    distance_deg = rng.uniform(0.2, 1.5)
+    end = (
+        max(min(start[0] + distance_deg * math.cos(bearing), 85.0), -85.0),
+        ((start[1] + distance_deg * math.sin(bearing) + 180) % 360) - 180,
+    )
+    return "POST", "/api/routes/compare", {
+        "tourist_id": rng.choice(workload.tourists)["id"],
+        "start_location": {"lat": start[0], "lng": start[1]},
+        "end_location": {"lat": end[0], "lng": end[1]},
+        "waypoints": [],
+    }, None
+
+
+def dashboard_stats(workload: Workload, rng: random.Random):
+    return "GET", "/api/admin/dashboard/stats", None, None
+
+
+def admin_alerts(workload: Workload, rng: random.Random):
+    return "GET", "/api/admin/alerts", None, None
+
+
+def admin_tourists(workload: Workload, rng: random.Random):
+    return "GET", "/api/admin/tourists", None, None
+
+
+def nearby_threats(workload: Workload, rng: random.Random):
+    lat, lng = workload.near_hotspot(rng)
+    return "GET", "/api/threats/nearby", None, {"lat": lat, "lng": lng, "radius": 50}
+
+
+def risk_tile(workload: Workload, rng: random.Random):
+    from geo import tile_for
+    lat, lng = workload.near_hotspot(rng)
+    z = rng.randint(4, 10)
+    _, x, y = tile_for(lat, lng, z)
+    return "GET", f"/api/risk-tiles/{z}/{x}/{y}", None, None
+
+
+def emergency_alert(workload: Workload, rng: random.Random):
+    tourist = rng.choice(workload.tourists)
+    return "POST", "/api/emergency/alert", {
+        "tourist_id": tourist["id"], "alert_type": "panic",
+        "latitude": tourist["lat"], "longitude": tourist["lng"], "message": "Benchmark panic"
+    }, None
+
+
+# Report labels use route templates so per-tile or per-id paths group together
+OPERATIONS: Dict[str, Tuple[str, Callable]] = {
+    "location_update": ("POST /api/location/update", location_update),
+    "route_compare": ("POST /api/routes/compare", route_compare),
+    "dashboard_stats": ("GET /api/admin/dashboard/stats", dashboard_stats),
+    "admin_alerts": ("GET /api/admin/alerts", admin_alerts),
+    "admin_tourists": ("GET /api/admin/tourists", admin_tourists),
+    "nearby_threats": ("GET /api/threats/nearby", nearby_threats),
+    "risk_tile": ("GET /api/risk-tiles/{z}/{x}/{y}", risk_tile),
+    "emergency_alert": ("POST /api/emergency/alert", emergency_alert),
+}
+
+
+# Load generation and statistics
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(values, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+async def run_scenario(client: AppClient, workload: Workload, mix: Dict[str, float], concurrency: int,
+                       duration: float, warmup: float, seed: int) -> Dict[str, Any]:
+    """Closed-loop load: each virtual client sends its next request when the last one completes"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = {OPERATIONS[name][0]: [] for name in names}
+    errors: Dict[str, int] = {label: 0 for label in latencies}
+    statuses: Dict[str, Dict[str, int]] = {label: {} for label in latencies}
+
+    loop_started = time.perf_counter()
+    measure_from = loop_started + warmup
+    deadline = measure_from + duration
+
+    async def virtual_client(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            label, build = OPERATIONS[rng.choices(names, weights)[0]]
+            method, path, body, query = build(workload, rng)
+            started = time.perf_counter()
+            status, _ = await client.request(method, path, body, query)
+            finished = time.perf_counter()
+            if started < measure_from or finished > deadline:
+                continue
+            latencies[label].append(finished - started)
+            statuses[label][str(status)] = statuses[label].get(str(status), 0) + 1
+            if status >= 400:
+                errors[label] += 1
+
+    await asyncio.gather(*(virtual_client(i) for i in range(concurrency)))
+    drain_seconds = await client.drain()
+    drain_started = time.perf_counter()
+    await workload.server.job_executor.join()
+    await workload.server.durable_jobs.join()
+    drain_seconds += time.perf_counter() - drain_started
+
+    endpoints = {}
+    for label, values in latencies.items():
+        endpoints[label] = summarize(values, errors[label], duration)
+        endpoints[label]["statuses"] = statuses[label]
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "endpoints": endpoints,
+        "total": summarize(all_latencies, sum(errors.values()), duration),
+        "background_drain_seconds": round(drain_seconds, 3),
+    }
+
+
+def server_stats(server) -> Dict[str, Any]:
+    """Server-side metrics gathered during the run"""
+    from database import command_summary
+    llm = server.REGISTRY.get("llm_call_duration_seconds")
+    return {
+        "mongo_commands": command_summary(limit=10),
+        "llm_calls": {
+            f"{purpose}/{outcome}": child.summary() for (purpose, outcome), child in (llm.children() if llm else [])
+        },
+        "loop_blocks": server.loop_block_detector.blocks if server.loop_block_detector else None,
+        "efir_latency": server.EFIR_LATENCY.labels().summary(),
+        "jobs": {
+            f"{lane}/{job}/{outcome}": child.value
+            for (lane, job, outcome), child in server.job_executor.jobs.children()
+        },
+        "durable_jobs": {
+            f"{lane}/{job_type}/{outcome}": child.value
+            for (lane, job_type, outcome), child in server.durable_jobs.jobs.children()
+        },
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    server = load_server(args.mongo_url, args.db_name, args.llm_latency_ms / 1000, args.geocode_latency_ms / 1000)
+    if args.mongo_url:
+        # Runs start from an empty database so results are comparable
+        from database import create_client
+        admin_client = create_client(args.mongo_url)
+        await admin_client.drop_database(args.db_name)
+        admin_client.close()
+
+    client = AppClient(server.app)
+    results: Dict[str, Any] = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "mongo": "server" if args.mongo_url else "mongomock",
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "tourists": args.tourists,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+            "geocode_latency_ms": args.geocode_latency_ms,
+        },
+        "scenarios": {},
+    }
+
+    async with lifespan(server.app):
+        workload = Workload(server, args.tourists, args.seed)
+        setup_started = time.perf_counter()
+        await workload.setup(client)
+        results["meta"]["setup_seconds"] = round(time.perf_counter() - setup_started, 3)
+
+        for name in args.scenario:
+            print(f"Running {name} for {args.duration:g}s at concurrency {args.concurrency}...", file=sys.stderr)
+            results["scenarios"][name] = await run_scenario(
+                client, workload, SCENARIOS[name], args.concurrency, args.duration, args.warmup, args.seed
+            )
+        results["server"] = server_stats(server)
+    return results
+
+
+# Reporting and comparison
+
+def print_results(results: Dict[str, Any]):
+    for name, scenario in results["scenarios"].items():
+        print(f"\n{name}")
+        print(f"  {'endpoint':<36} {'req':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        rows = list(scenario["endpoints"].items()) + [("total", scenario["total"])]
+        for label, stats in rows:
+            print(
+                f"  {label:<36} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} "
+                f"{stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}"
+            )
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold_pct: float) -> List[str]:
+    """Print per-endpoint changes and return the regressions beyond threshold_pct"""
+    regressions = []
+    for name, scenario in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        print(f"\n{name} (change vs baseline)")
+        print(f"  {'endpoint':<36} {'rps':>9} {'p50':>9} {'p99':>9}")
+        rows = list(scenario["endpoints"].items()) + [("total", scenario["total"])]
+        for label, stats in rows:
+            old = before["total"] if label == "total" else before["endpoints"].get(label)
+            if not old or not old["requests"] or not stats["requests"]:
+                continue
+            changes = {
+                key: (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                for key in ("throughput_rps", "p50_ms", "p99_ms")
+            }
+            print(f"  {label:<36} {changes['throughput_rps']:>+8.1f}% {changes['p50_ms']:>+8.1f}% "
+                  f"{changes['p99_ms']:>+8.1f}%")
+            for key in ("p50_ms", "p99_ms"):
+                if changes[key] > threshold_pct:
+                    regressions.append(f"{name} {label} {key} {old[key]} -> {stats[key]} ({changes[key]:+.1f}%)")
+            if -changes["throughput_rps"] > threshold_pct:
+                regressions.append(
+                    f"{name} {label} throughput {old['throughput_rps']} -> {stats['throughput_rps']} "
+                    f"({changes['throughput_rps']:+.1f}%)"
+                )
+    return regressions
+
+
+def report_regressions(regressions: List[str]) -> int:
+    if not regressions:
+        print("\nNo regressions beyond threshold")
+        return 0
+    print("\nRegressions:")
+    for line in regressions:
+        print(f"  {line}")
+    return 1
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run; repeat for several (default: all)")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent virtual clients")
+    parser.add_argument("--tourists", type=int, default=200, help="tourists registered before the run")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the generated workload")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="mean simulated LLM latency")
+    parser.add_argument("--geocode-latency-ms", type=float, default=100.0,
+                        help="simulated Nominatim latency (blocking, like the real call)")
+    parser.add_argument("--mongo-url", help="use a real MongoDB instead of mongomock")
+    parser.add_argument("--db-name", default=BENCHMARK_DB_NAME,
+                        help="database to use; it is dropped before the run when --mongo-url is given")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier results to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two saved result files without running")
+    parser.add_argument("--threshold", type=float, default=15.0,
+                        help="percent change in p50/p99 or throughput that counts as a regression")
+    args = parser.parse_args(argv)
+    args.scenario = args.scenario or list(SCENARIOS)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        return report_regressions(compare_results(baseline, current, args.threshold))
+
+    results = asyncio.run(run_benchmark(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return report_regressions(compare_results(baseline, results, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
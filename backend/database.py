@@ -0,0 +1,176 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from metrics import REGISTRY, MetricsRegistry
+
+# Pool checkout waits are usually microseconds; a saturated pool pushes them to the wait-queue timeout
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _collection_of(event: monitoring.CommandStartedEvent) -> str:
+    """Collection a command targets, or "" for database-level commands"""
+    target = event.command.get(event.command_name)
+    if isinstance(target, str):
+        return target
+    collection = event.command.get("collection")  # getMore
+    return collection if isinstance(collection, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Per-collection, per-command latency from PyMongo command events"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.latency = registry.histogram(
+            "mongo_command_duration_seconds", "MongoDB command latency as seen by the driver",
+            ["collection", "command"]
+        )
+        self.failures = registry.counter(
+            "mongo_command_failures_total", "MongoDB commands that returned an error",
+            ["collection", "command"]
+        )
+        self._inflight: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._inflight[(event.request_id, event.connection_id)] = _collection_of(event)
+
+    def _finish(self, event) -> str:
+        with self._lock:
+            return self._inflight.pop((event.request_id, event.connection_id), "")
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        self.latency.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        self.latency.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        self.failures.labels(collection, event.command_name).inc()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool size, checkouts in use and checkout wait times.
+
+    Checkout start and completion are reported on the same driver thread,
+    so the wait is timed with a thread-local start mark.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.wait = registry.histogram(
+            "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+            ["address"], buckets=POOL_WAIT_BUCKETS
+        )
+        self.checkout_failures = registry.counter(
+            "mongo_pool_checkout_failures_total", "Connection checkouts that failed", ["address", "reason"]
+        )
+        self.open = registry.gauge("mongo_pool_connections", "Open pooled connections", ["address"])
+        self.in_use = registry.gauge("mongo_pool_connections_in_use", "Connections checked out", ["address"])
+        self.cleared = registry.counter("mongo_pool_cleared_total", "Pool clears after server errors", ["address"])
+        self._local = threading.local()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _waited(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.cleared.labels(self._address(event)).inc()
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open.labels(self._address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        address = self._address(event)
+        self.wait.labels(address).observe(self._waited())
+        self.checkout_failures.labels(address, str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        self.wait.labels(address).observe(self._waited())
+        self.in_use.labels(address).inc()
+
+    def connection_checked_in(self, event):
+        self.in_use.labels(self._address(event)).dec()
+
+
+def create_client(
+    mongo_url: str,
+    max_pool_size: int = 100,
+    min_pool_size: int = 0,
+    wait_queue_timeout_ms: Optional[int] = None,
+    compressors: Optional[List[str]] = None,
+    write_concern: Optional[str] = None,
+    journal: Optional[bool] = None,
+    read_concern: Optional[str] = None,
+    registry: MetricsRegistry = REGISTRY,
+) -> AsyncIOMotorClient:
+    """Motor client with explicit pool settings and metrics listeners attached"""
+    options: Dict[str, Any] = {
+        "maxPoolSize": max_pool_size,
+        "minPoolSize": min_pool_size,
+        "event_listeners": [CommandMetrics(registry), PoolMetrics(registry)],
+    }
+    if wait_queue_timeout_ms:
+        options["waitQueueTimeoutMS"] = wait_queue_timeout_ms
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    if write_concern:
+        w = int(write_concern) if write_concern.isdigit() else write_concern
+        options["w"] = w
+    if journal is not None:
+        options["journal"] = journal
+    if read_concern:
+        options["readConcernLevel"] = read_concern
+    return AsyncIOMotorClient(mongo_url, **options)
+
+
+def pool_summary(registry: MetricsRegistry = REGISTRY) -> Dict[str, Any]:
+    """Current pool gauges and checkout wait percentiles per server address"""
+    summary: Dict[str, Any] = {}
+    for name, field in (("mongo_pool_connections", "open"), ("mongo_pool_connections_in_use", "in_use")):
+        metric = registry.get(name)
+        for (address,), child in metric.children() if metric else []:
+            summary.setdefault(address, {})[field] = child.value
+    wait = registry.get("mongo_pool_checkout_wait_seconds")
+    for (address,), child in wait.children() if wait else []:
+        summary.setdefault(address, {})["checkout_wait"] = child.summary()
+    return summary
+
+
+def command_summary(registry: MetricsRegistry = REGISTRY, limit: int = 20) -> List[Dict[str, Any]]:
+    """Slowest collection/command pairs by p99 latency"""
+    latency = registry.get("mongo_command_duration_seconds")
+    rows = [
+        {"collection": collection, "command": command, **child.summary()}
+        for (collection, command), child in (latency.children() if latency else [])
+    ]
+    rows.sort(key=lambda row: row["p99"], reverse=True)
+    return rows[:limit]
@@ -0,0 +1,37 @@
+from typing import Any, Optional
+
+
+class DatabaseHandle:
+    """The app's Motor database, connected by the lifespan handler.
+
+    Collections resolve on attribute access, so modules can hold the handle
+    from import time while the driver itself (pymongo, motor and the client's
+    monitor threads) is only loaded once the app starts.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.client: Optional[Any] = None
+        self._db: Optional[Any] = None
+
+    def connect(self, mongo_url: str, **options):
+        from database import create_client
+        self.client = create_client(mongo_url, **options)
+        self._db = self.client[self.name]
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self._db = None
+
+    def __getattr__(self, name: str):
+        # Only reached for names not set in __init__, i.e. collections and database methods
+        if self._db is None:
+            raise RuntimeError(f"Database used before startup (accessing {name})")
+        return getattr(self._db, name)
+
+    def __getitem__(self, name: str):
+        if self._db is None:
+            raise RuntimeError(f"Database used before startup (accessing {name})")
+        return self._db[name]
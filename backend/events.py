@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+
+class Subscription:
+    """One connected console: a bounded queue plus its topic filter.
+
+    When a slow client lets its queue fill up the oldest events are dropped
+    and the next delivered event carries the number of missed events, so the
+    client knows to resynchronise with a single full fetch.
+    """
+
+    def __init__(self, topics: Optional[Set[str]], max_queue: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def wants(self, topic: str) -> bool:
+        if not self.topics:
+            return True
+        return topic in self.topics or topic.split(".", 1)[0] in self.topics
+
+    def offer(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def next(self) -> Dict[str, Any]:
+        event = await self.queue.get()
+        if self.dropped:
+            event = dict(event, dropped=self.dropped)
+            self.dropped = 0
+        return event
+
+
+class EventBus:
+    """In-process publish/subscribe for admin console deltas.
+
+    publish() never blocks the request that produced the event: each
+    subscriber has its own bounded queue. A short replay buffer lets a
+    reconnecting client resume from the last event id it saw.
+    """
+
+    def __init__(self, max_queue: int = 256, replay_size: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: List[Subscription] = []
+        self._replay: Deque[Dict[str, Any]] = deque(maxlen=replay_size)
+        self._ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def queued(self) -> int:
+        """Events waiting in subscriber queues"""
+        return sum(s.queue.qsize() for s in self._subscribers)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, last_event_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(set(topics) if topics else None, self.max_queue)
+        if last_event_id is not None:
+            for event in self._replay:
+                if event["id"] > last_event_id and subscription.wants(event["topic"]):
+                    subscription.offer(event)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        event = {
+            "id": next(self._ids),
+            "topic": topic,
+            "data": data,
+            "published_at": datetime.now(timezone.utc).isoformat()
+        }
+        self._replay.append(event)
+        for subscription in self._subscribers:
+            if subscription.wants(topic):
+                subscription.offer(event)
+        return event
@@ -0,0 +1,116 @@
+import math
+from typing import Iterator, Tuple
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+
+# (min_lat, min_lng, max_lat, max_lng); longitudes may run past ±180 near the dateline
+BBox = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+Tile = Tuple[int, int, int]  # z, x, y
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in kilometers"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lng = math.radians(lng2 - lng1)
+
+    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+    return EARTH_RADIUS_KM * c
+
+
+def circle_bbox(lat: float, lng: float, radius_km: float) -> BBox:
+    """Bounding box of a circle; spans all longitudes when it reaches a pole"""
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat = max(-90.0, lat - delta_lat)
+    max_lat = min(90.0, lat + delta_lat)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if max_lat >= 90.0 or min_lat <= -90.0 or cos_lat < 1e-6:
+        return (min_lat, -180.0, max_lat, 180.0)
+
+    delta_lng = min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return (min_lat, lng - delta_lng, max_lat, lng + delta_lng)
+
+
+def cell_of(lat: float, lng: float, cell_deg: float) -> Cell:
+    """Grid cell holding a point"""
+    cols = max(1, int(round(360 / cell_deg)))
+    return (int(math.floor(lat / cell_deg)), int(math.floor(lng / cell_deg)) % cols)
+
+
+def bbox_cells(bbox: BBox, cell_deg: float) -> Iterator[Cell]:
+    """Grid cells overlapping a bounding box"""
+    min_lat, min_lng, max_lat, max_lng = bbox
+    total_cols = max(1, int(round(360 / cell_deg)))
+
+    if max_lng - min_lng >= 360.0:
+        cols = range(total_cols)
+    else:
+        col_start = int(math.floor(min_lng / cell_deg))
+        col_end = int(math.floor(max_lng / cell_deg))
+        cols = sorted(set(c % total_cols for c in range(col_start, col_end + 1)))
+
+    for row in range(int(math.floor(min_lat / cell_deg)), int(math.floor(max_lat / cell_deg)) + 1):
+        for col in cols:
+            yield (row, col)
+
+
+def tile_for(lat: float, lng: float, zoom: int) -> Tile:
+    """Slippy-map (web mercator) tile containing a point"""
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    n = 1 << zoom
+    x = int((lng + 180.0) / 360.0 * n) % n
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return (zoom, x, min(n - 1, max(0, y)))
+
+
+def parent_tile(tile: Tile, zoom: int) -> Tile:
+    z, x, y = tile
+    shift = z - zoom
+    return (zoom, x >> shift, y >> shift)
+
+
+def tile_y_to_lat(y: float, zoom: int) -> float:
+    """Latitude of a (fractional) web mercator tile row"""
+    n = math.pi - 2.0 * math.pi * y / (1 << zoom)
+    return math.degrees(math.atan(math.sinh(n)))
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    n = 1 << z
+    return (tile_y_to_lat(y + 1, z), x / n * 360.0 - 180.0, tile_y_to_lat(y, z), (x + 1) / n * 360.0 - 180.0)
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_bbox(lat: float, lng: float, precision: int) -> Tuple[str, BBox]:
+    """Geohash cell of a point and its bounds; precision 5 is about 5 x 5 km at mid latitudes"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude, starting with longitude
+        bounds, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars), (lat_range[0], lng_range[0], lat_range[1], lng_range[1])
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from geo import BBox, Cell, bbox_cells, cell_of, circle_bbox, haversine_km
+from geometry import PreparedGeometry
+
+ENTER = "enter"
+EXIT = "exit"
+DWELL = "dwell"
+
+
+class Fence:
+    """Circular geofence; subclasses override contains() and bbox"""
+
+    def __init__(self, fence_id: str, name: str, kind: str, level: int,
+                 lat: float, lng: float, radius_km: float):
+        self.id = fence_id
+        self.name = name
+        self.kind = kind  # "threat", "restricted", "advisory"
+        self.level = level
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = radius_km
+        self.bbox: BBox = circle_bbox(lat, lng, radius_km)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return haversine_km(lat, lng, self.lat, self.lng) <= self.radius_km
+
+
+class PolygonFence(Fence):
+    """Polygon or multipolygon geofence backed by a prepared geometry"""
+
+    def __init__(self, fence_id: str, name: str, kind: str, level: int,
+                 lat: float, lng: float, radius_km: float, shape: PreparedGeometry):
+        super().__init__(fence_id, name, kind, level, lat, lng, radius_km)
+        self.shape = shape
+        self.bbox = shape.bbox
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return self.shape.contains(lat, lng)
+
+
+@dataclass
+class GeofenceEvent:
+    tourist_id: str
+    fence_id: str
+    fence_name: str
+    fence_kind: str
+    level: int
+    event: str  # "enter", "exit", "dwell"
+    latitude: float
+    longitude: float
+    timestamp: datetime
+
+    def dict(self) -> Dict:
+        return {
+            "tourist_id": self.tourist_id,
+            "fence_id": self.fence_id,
+            "fence_name": self.fence_name,
+            "fence_kind": self.fence_kind,
+            "level": self.level,
+            "event": self.event,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "timestamp": self.timestamp.isoformat()
+        }
+
+
+class FenceIndex:
+    """Immutable grid of fences keyed by the cells their bounding boxes cover"""
+
+    def __init__(self, fences: Iterable[Fence], version: int, cell_deg: float = 0.5):
+        self.version = version
+        self.cell_deg = cell_deg
+        self.fences: Dict[str, Fence] = {f.id: f for f in fences}
+        self._cells: Dict[Cell, Tuple[Fence, ...]] = {}
+
+        buckets: Dict[Cell, List[Fence]] = defaultdict(list)
+        for fence in self.fences.values():
+            for cell in bbox_cells(fence.bbox, cell_deg):
+                buckets[cell].append(fence)
+        self._cells = {cell: tuple(fences) for cell, fences in buckets.items()}
+
+    def __len__(self) -> int:
+        return len(self.fences)
+
+    def cell_of(self, lat: float, lng: float) -> Cell:
+        return cell_of(lat, lng, self.cell_deg)
+
+    def fences_in(self, cell: Cell) -> Tuple[Fence, ...]:
+        return self._cells.get(cell, ())
+
+
+@dataclass
+class TouristFenceState:
+    cell: Optional[Cell] = None
+    index_version: int = -1
+    candidates: Tuple[Fence, ...] = ()
+    # fence id -> time the tourist entered it
+    inside: Dict[str, datetime] = field(default_factory=dict)
+    dwell_reported: set = field(default_factory=set)
+
+
+class GeofenceEngine:
+    """Stateful geofence evaluation over location streams.
+
+    Fences are grouped by source ("threats", "advisories", ...) so each
+    source can be replaced independently. Per-tourist state remembers the
+    grid cell of the previous fix and the fences bucketed there, so a fix
+    that stays in the same cell is tested only against that short list and
+    events are emitted only on membership transitions.
+    """
+
+    def __init__(self, dwell_seconds: float = 600, cell_deg: float = 0.5):
+        self.dwell_seconds = dwell_seconds
+        self.cell_deg = cell_deg
+        self._sources: Dict[str, List[Fence]] = {}
+        self._version = 0
+        self._index = FenceIndex([], self._version, cell_deg)
+        self._states: Dict[str, TouristFenceState] = {}
+
+    @property
+    def index(self) -> FenceIndex:
+        return self._index
+
+    def set_fences(self, source: str, fences: Iterable[Fence]):
+        """Replace all fences from one source and swap in a rebuilt index"""
+        self._sources[source] = list(fences)
+        self._version += 1
+        all_fences = [f for fences in self._sources.values() for f in fences]
+        self._index = FenceIndex(all_fences, self._version, self.cell_deg)
+
+    def forget(self, tourist_id: str):
+        """Drop membership state for a tourist"""
+        self._states.pop(tourist_id, None)
+
+    def tracked_tourists(self) -> int:
+        return len(self._states)
+
+    def memberships(self, tourist_id: str) -> List[Fence]:
+        state = self._states.get(tourist_id)
+        if not state:
+            return []
+        return [self._index.fences[fid] for fid in state.inside if fid in self._index.fences]
+
+    def update(self, tourist_id: str, lat: float, lng: float, timestamp: datetime) -> List[GeofenceEvent]:
+        """Evaluate one fix and return the transitions it caused"""
+        index = self._index
+        state = self._states.get(tourist_id)
+        if state is None:
+            state = self._states[tourist_id] = TouristFenceState()
+
+        cell = index.cell_of(lat, lng)
+        if cell != state.cell or state.index_version != index.version:
+            state.cell = cell
+            state.index_version = index.version
+            state.candidates = index.fences_in(cell)
+
+        now_inside = {fence.id: fence for fence in state.candidates if fence.contains(lat, lng)}
+        events = []
+
+        for fence_id in list(state.inside):
+            if fence_id not in now_inside:
+                del state.inside[fence_id]
+                state.dwell_reported.discard(fence_id)
+                fence = index.fences.get(fence_id)
+                if fence is not None:
+                    events.append(self._event(tourist_id, fence, EXIT, lat, lng, timestamp))
+                else:
+                    # Fence was removed; report the exit with what we know
+                    events.append(GeofenceEvent(tourist_id, fence_id, "", "", 0, EXIT, lat, lng, timestamp))
+
+        for fence_id, fence in now_inside.items():
+            entered_at = state.inside.get(fence_id)
+            if entered_at is None:
+                state.inside[fence_id] = timestamp
+                events.append(self._event(tourist_id, fence, ENTER, lat, lng, timestamp))
+            elif (fence_id not in state.dwell_reported
+                  and (timestamp - entered_at).total_seconds() >= self.dwell_seconds):
+                state.dwell_reported.add(fence_id)
+                events.append(self._event(tourist_id, fence, DWELL, lat, lng, timestamp))
+
+        return events
+
+    def _event(self, tourist_id: str, fence: Fence, event: str, lat: float, lng: float,
+               timestamp: datetime) -> GeofenceEvent:
+        return GeofenceEvent(tourist_id, fence.id, fence.name, fence.kind, fence.level,
+                             event, lat, lng, timestamp)
@@ -0,0 +1,146 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from geo import BBox, KM_PER_DEGREE
+
+# Polygons follow GeoJSON: rings of [lng, lat] pairs, first ring is the
+# exterior, later rings are holes. Rings must not cross the antimeridian.
+Ring = Sequence[Sequence[float]]
+Edge = Tuple[float, float, float, float]  # x1, y1, x2, y2 (lng, lat)
+
+
+class PreparedRing:
+    """Ring with its edges bucketed into latitude bands.
+
+    A point-in-ring test only ray-casts against the edges of the band the
+    point falls in, so complex rings cost roughly O(edges / bands) per test.
+    """
+
+    def __init__(self, coords: Ring, max_bands: int = 512):
+        points = [(float(p[0]), float(p[1])) for p in coords]
+        if len(points) > 1 and points[0] == points[-1]:
+            points = points[:-1]
+        if len(points) < 3:
+            raise ValueError("Polygon ring needs at least three points")
+
+        # Every edge, for distances; horizontal ones never cross a ray and are left out of the bands
+        self.edges: List[Edge] = []
+        for i, (x1, y1) in enumerate(points):
+            x2, y2 = points[(i + 1) % len(points)]
+            self.edges.append((x1, y1, x2, y2))
+        crossing = [edge for edge in self.edges if edge[1] != edge[3]]
+
+        lngs = [p[0] for p in points]
+        lats = [p[1] for p in points]
+        self.bbox: BBox = (min(lats), min(lngs), max(lats), max(lngs))
+
+        self.min_lat = self.bbox[0]
+        span = self.bbox[2] - self.bbox[0]
+        self.band_count = max(1, min(max_bands, len(crossing) // 4))
+        self.band_height = span / self.band_count if span > 0 else 1.0
+        self.bands: List[List[Edge]] = [[] for _ in range(self.band_count)]
+        for edge in crossing:
+            low, high = sorted((edge[1], edge[3]))
+            for band in range(self._band(low), self._band(high) + 1):
+                self.bands[band].append(edge)
+
+    def _band(self, lat: float) -> int:
+        band = int((lat - self.min_lat) / self.band_height)
+        return min(self.band_count - 1, max(0, band))
+
+    def contains(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if lat < min_lat or lat > max_lat or lng < min_lng or lng > max_lng:
+            return False
+
+        inside = False
+        for x1, y1, x2, y2 in self.bands[self._band(lat)]:
+            if (y1 > lat) != (y2 > lat):
+                if lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+        return inside
+
+
+class PreparedPolygon:
+    """Polygon with holes, ready for repeated point-in-polygon tests"""
+
+    def __init__(self, rings: Sequence[Ring]):
+        if not rings:
+            raise ValueError("Polygon needs an exterior ring")
+        self.exterior = PreparedRing(rings[0])
+        self.holes = [PreparedRing(r) for r in rings[1:]]
+        self.bbox = self.exterior.bbox
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if not self.exterior.contains(lat, lng):
+            return False
+        return not any(hole.contains(lat, lng) for hole in self.holes)
+
+    def edges(self):
+        yield from self.exterior.edges
+        for hole in self.holes:
+            yield from hole.edges
+
+
+class PreparedGeometry:
+    """Prepared Polygon or MultiPolygon with a combined bounding box"""
+
+    def __init__(self, polygons: List[PreparedPolygon]):
+        if not polygons:
+            raise ValueError("Geometry has no polygons")
+        self.polygons = polygons
+        self.bbox: BBox = (
+            min(p.bbox[0] for p in polygons),
+            min(p.bbox[1] for p in polygons),
+            max(p.bbox[2] for p in polygons),
+            max(p.bbox[3] for p in polygons),
+        )
+
+    def contains(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if lat < min_lat or lat > max_lat or lng < min_lng or lng > max_lng:
+            return False
+        return any(p.contains(lat, lng) for p in self.polygons)
+
+    def distance_km(self, lat: float, lng: float) -> float:
+        """Approximate distance to the geometry (0 inside), local equirectangular projection"""
+        if self.contains(lat, lng):
+            return 0.0
+
+        kx = KM_PER_DEGREE * math.cos(math.radians(lat))
+        ky = KM_PER_DEGREE
+        best = float("inf")
+        for polygon in self.polygons:
+            for x1, y1, x2, y2 in polygon.edges():
+                ax, ay = (x1 - lng) * kx, (y1 - lat) * ky
+                bx, by = (x2 - lng) * kx, (y2 - lat) * ky
+                dx, dy = bx - ax, by - ay
+                length_sq = dx * dx + dy * dy
+                t = 0.0 if length_sq == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_sq))
+                px, py = ax + t * dx, ay + t * dy
+                best = min(best, math.hypot(px, py))
+        return best
+
+    def within_km(self, lat: float, lng: float, radius_km: float) -> bool:
+        """True if the point is inside or within radius_km of the geometry"""
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        pad_lat = radius_km / KM_PER_DEGREE
+        pad_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        if (lat < min_lat - pad_lat or lat > max_lat + pad_lat
+                or lng < min_lng - pad_lng or lng > max_lng + pad_lng):
+            return False
+        return self.distance_km(lat, lng) <= radius_km
+
+
+def prepare_geometry(geometry: Optional[Dict[str, Any]]) -> Optional[PreparedGeometry]:
+    """Prepare a GeoJSON Polygon or MultiPolygon; returns None for anything else"""
+    if not geometry:
+        return None
+
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates") or []
+    if geometry_type == "Polygon":
+        return PreparedGeometry([PreparedPolygon(coordinates)])
+    if geometry_type == "MultiPolygon":
+        return PreparedGeometry([PreparedPolygon(rings) for rings in coordinates])
+    return None
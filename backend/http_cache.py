@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from metrics import REGISTRY, MetricsRegistry
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def versioned_etag(*parts) -> str:
+    """Strong ETag for a response fully determined by parts (content versions and request parameters)"""
+    return '"' + hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:24] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == bare for tag in candidates)
+
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Optional[Response]:
+    """A 304 for a client that already holds etag, so the endpoint can skip building the body"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+
+class ContentVersions:
+    """Change counters for collections, shared by every worker through db.counters.
+
+    Writers bump a collection's counter; read endpoints build their ETag from
+    the counters so a poll that finds them unchanged answers 304 without
+    querying or serializing anything.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def bump(self, name: str):
+        await self.db.counters.update_one({"_id": f"version:{name}"}, {"$inc": {"value": 1}}, upsert=True)
+
+    async def get(self, *names: str) -> Tuple[int, ...]:
+        docs = await self.db.counters.find({"_id": {"$in": [f"version:{name}" for name in names]}}).to_list(None)
+        values = {doc["_id"]: doc.get("value", 0) for doc in docs}
+        return tuple(values.get(f"version:{name}", 0) for name in names)
+
+
+class ConditionalGetMiddleware:
+    """ASGI middleware adding ETags, 304s, Cache-Control and compression to GET responses.
+
+    Buffered 200 responses under the given path prefixes get a body-hash
+    ETag unless the endpoint set a versioned one, and a 304 when it matches
+    If-None-Match. Text and JSON bodies of at least compress_min_bytes are
+    compressed with brotli (when the optional brotli package is installed and
+    the client accepts br) or gzip. Streams (text/event-stream) and bodies
+    over max_buffer_bytes pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app,
+        prefixes: Iterable[str] = ("/api/",),
+        cache_control: Optional[Dict[str, str]] = None,
+        default_cache_control: str = "private, no-cache",
+        compress_min_bytes: int = 1024,
+        max_buffer_bytes: int = 4 * 1024 * 1024,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        # Longest prefix first so specific paths override general ones
+        self.cache_control = sorted((cache_control or {}).items(), key=lambda item: -len(item[0]))
+        self.default_cache_control = default_cache_control
+        self.compress_min_bytes = compress_min_bytes
+        self.max_buffer_bytes = max_buffer_bytes
+        try:
+            import brotli
+            self.brotli = brotli
+        except ImportError:
+            self.brotli = None
+        self.responses = registry.counter(
+            "http_cache_responses_total", "GET responses by conditional outcome and encoding", ["outcome", "encoding"]
+        )
+        self.bytes_saved = registry.counter(
+            "http_cache_bytes_saved_total", "Body bytes not sent thanks to 304s and compression"
+        )
+
+    def _cache_control_for(self, path: str) -> str:
+        for prefix, value in self.cache_control:
+            if path.startswith(prefix):
+                return value
+        return self.default_cache_control
+
+    def _encoding_for(self, accept_encoding: str) -> Optional[str]:
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        if self.brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        start: Optional[dict] = None
+        chunks: List[bytes] = []
+        size = 0
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start, size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message.get("headers", [])}
+                if message["status"] == 304:
+                    # The endpoint answered from its content version
+                    self.responses.labels("not_modified", "identity").inc()
+                if (message["status"] != 200 or "content-encoding" in headers
+                        or headers.get("content-type", "").startswith("text/event-stream")):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > self.max_buffer_bytes:
+                passthrough = True
+                await send(start)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": message.get("more_body", False)})
+                return
+            if not message.get("more_body", False):
+                await self._respond(scope, request_headers, start, b"".join(chunks), send)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _respond(self, scope, request_headers: Dict[str, str], start: dict, body: bytes, send):
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        names = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in headers}
+
+        etag = names.get("etag")
+        if etag is None:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:24] + '"'
+            headers.append((b"etag", etag.encode("latin-1")))
+        if "cache-control" not in names:
+            headers.append((b"cache-control", self._cache_control_for(scope["path"]).encode("latin-1")))
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            self.responses.labels("not_modified", "identity").inc()
+            self.bytes_saved.inc(len(body))
+            not_modified_headers = [(k, v) for k, v in headers if k.lower() in (b"etag", b"cache-control", b"vary")]
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        encoding = None
+        if len(body) >= self.compress_min_bytes and names.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            encoding = self._encoding_for(request_headers.get("accept-encoding", ""))
+        if encoding is not None:
+            compressed = self.brotli.compress(body, quality=4) if encoding == "br" else gzip.compress(body, 5)
+            self.bytes_saved.inc(len(body) - len(compressed))
+            body = compressed
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            if not etag.startswith("W/"):
+                # The compressed bytes differ from the identity representation
+                headers = [(k, b"W/" + v if k.lower() == b"etag" else v) for k, v in headers]
+            headers.append((b"vary", b"Accept-Encoding"))
+        self.responses.labels("full", encoding or "identity").inc()
+
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send(dict(start, headers=headers))
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY, MetricsRegistry
+
+# Fields of the QR payload covered by the leaf hash; everything a checkpoint can read off the card
+LEAF_FIELDS = ("id", "name", "phone", "valid_until", "issued_at")
+GENESIS_HASH = "0" * 64
+
+# One step of an inclusion proof: which side the sibling is on and its hex digest
+ProofStep = Tuple[str, str]
+
+
+def leaf_hash(payload: Dict[str, Any]) -> str:
+    """Hash of the ID fields of a QR payload, reproducible by anyone holding the card"""
+    canonical = json.dumps({field: payload.get(field) for field in LEAF_FIELDS}, sort_keys=True, separators=(",", ":"))
+    # Leaves and inner nodes are prefixed differently so one cannot be passed off as the other
+    return hashlib.sha256(b"\x00" + canonical.encode()).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def merkle_tree(leaves: List[str]) -> Tuple[str, List[List[ProofStep]]]:
+    """Root of leaves and the inclusion proof of each one.
+
+    An unpaired node at the end of a level is carried up unchanged, so every
+    proof has at most ceil(log2(n)) steps.
+    """
+    proofs: List[List[ProofStep]] = [[] for _ in leaves]
+    level = list(leaves)
+    members = [[i] for i in range(len(leaves))]
+    while len(level) > 1:
+        next_level, next_members = [], []
+        for i in range(0, len(level), 2):
+            if i + 1 == len(level):
+                next_level.append(level[i])
+                next_members.append(members[i])
+                continue
+            left, right = level[i], level[i + 1]
+            for leaf in members[i]:
+                proofs[leaf].append(("r", right))
+            for leaf in members[i + 1]:
+                proofs[leaf].append(("l", left))
+            next_level.append(node_hash(left, right))
+            next_members.append(members[i] + members[i + 1])
+        level, members = next_level, next_members
+    return level[0], proofs
+
+
+def fold_proof(leaf: str, proof: List[ProofStep]) -> str:
+    """The root a leaf and its proof lead to"""
+    node = leaf
+    for side, sibling in proof:
+        node = node_hash(sibling, node) if side == "l" else node_hash(node, sibling)
+    return node
+
+
+def batch_hash(seq: int, prev_hash: str, root: str, count: int) -> str:
+    """Links a batch to the one before it, so no sealed batch can be rewritten unnoticed"""
+    return hashlib.sha256(f"{seq}:{prev_hash}:{root}:{count}".encode()).hexdigest()
+
+
+class IDLedger:
+    """Append-only ledger of digital IDs, batched into Merkle trees.
+
+    Registration appends the ID's leaf hash to db.id_ledger_leaves. Every
+    interval_seconds a worker claims the next batch number and seals the
+    pending leaves into it: it stamps them with a token of its own (a leaf
+    is only stamped while unstamped, so racing sealers never share one),
+    builds the tree over its stamped leaves in a fixed order and inserts
+    the batch with its root and a hash chaining it to the previous batch.
+    Only the sealer whose insert wins writes the batch number and inclusion
+    proofs to the leaves; a loser unstamps them for the next batch. Stamps
+    carry a lease of lease_seconds that the sealer renews before inserting
+    its batch, and a sealer whose lease ran out gives up. Only stamps whose
+    lease expired belong to a seal that died: they are finished if their
+    batch was inserted and released otherwise.
+
+    Verifying a QR payload is one indexed leaf lookup and at most
+    ceil(log2(max_batch)) hashes against a root held in memory; batches never
+    change once sealed.
+    """
+
+    def __init__(
+        self,
+        db,
+        interval_seconds: float = 5.0,
+        max_batch: int = 4096,
+        lease_seconds: float = 60.0,
+        claim: Optional[Callable[[str, float], Awaitable[bool]]] = None,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.db = db
+        self.interval_seconds = interval_seconds
+        self.max_batch = max_batch
+        self.lease_seconds = lease_seconds
+        self.claim = claim
+        self._batches: Dict[int, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.sealed = registry.counter("id_ledger_leaves_sealed_total", "IDs sealed into a ledger batch by this worker")
+        self.verifications = registry.counter(
+            "id_ledger_verifications_total", "ID verifications by result", ["result"]
+        )
+
+    async def ensure_indexes(self):
+        await self.db.id_ledger_leaves.create_index("tourist_id", unique=True)
+        await self.db.id_ledger_leaves.create_index([("batch", 1), ("queued_at", 1), ("tourist_id", 1)])
+        await self.db.id_ledger_leaves.create_index([("seal", 1), ("queued_at", 1), ("tourist_id", 1)], sparse=True)
+        await self.db.id_ledger_batches.create_index("seal", sparse=True)
+
+    async def append(self, tourist_id: str, payload: Dict[str, Any]) -> str:
+        """Queue an ID for the next batch; returns its leaf hash"""
+        leaf = leaf_hash(payload)
+        await self.db.id_ledger_leaves.insert_one({
+            "tourist_id": tourist_id,
+            "leaf": leaf,
+            "batch": None,
+            "seal": None,
+            "queued_at": datetime.now(timezone.utc)
+        })
+        return leaf
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                # seal() claims each batch number separately, so a backlog is sealed batch by batch
+                while await self.seal() == self.max_batch:
+                    pass
+            except Exception as e:
+                logging.error(f"ID ledger seal error: {str(e)}")
+
+    async def _last_batch(self) -> Optional[Dict[str, Any]]:
+        return await self.db.id_ledger_batches.find_one({}, {"_id": 1, "hash": 1}, sort=[("_id", -1)])
+
+    async def seal(self) -> int:
+        """Seal pending IDs into the next batch; returns how many it holds, 0 if another worker got there first"""
+        from pymongo.errors import DuplicateKeyError
+
+        await self._recover()
+        last = await self._last_batch()
+        seq = last["_id"] + 1 if last else 0
+        prev_hash = last["hash"] if last else GENESIS_HASH
+
+        pending = await self.db.id_ledger_leaves.find(
+            {"batch": None, "seal": None}, {"_id": 0, "tourist_id": 1}
+        ).sort([("queued_at", 1), ("tourist_id", 1)]).limit(self.max_batch).to_list(self.max_batch)
+        if not pending:
+            return 0
+        if self.claim is not None and not await self.claim(f"id_ledger_seal:{seq}", self.interval_seconds):
+            return 0
+
+        token = uuid.uuid4().hex
+        await self.db.id_ledger_leaves.update_many(
+            {"tourist_id": {"$in": [leaf["tourist_id"] for leaf in pending]}, "batch": None, "seal": None},
+            {"$set": {"seal": token, "lease_until": self._lease_end()}}
+        )
+        leaves = await self._stamped(token)
+        if not leaves:
+            return 0
+
+        root, proofs = merkle_tree([leaf["leaf"] for leaf in leaves])
+        if not await self._renew(token, len(leaves)):
+            # The lease ran out and recovery may have handed some leaves on; they are sealed again later
+            logging.warning(f"ID ledger seal lease expired before batch {seq}; releasing its leaves")
+            await self._release(token)
+            return 0
+        try:
+            await self.db.id_ledger_batches.insert_one({
+                "_id": seq,
+                "root": root,
+                "prev_hash": prev_hash,
+                "hash": batch_hash(seq, prev_hash, root, len(leaves)),
+                "count": len(leaves),
+                "seal": token,
+                "sealed_at": datetime.now(timezone.utc)
+            })
+        except DuplicateKeyError:
+            # Another worker sealed batch seq first; these leaves go into a later one
+            await self._release(token)
+            return 0
+        await self._write_proofs(seq, token, leaves, proofs)
+        self.sealed.inc(len(leaves))
+        return len(leaves)
+
+    async def _write_proofs(self, seq: int, token: str, leaves: List[Dict[str, Any]],
+                            proofs: List[List[ProofStep]]):
+        """Attach the sealed batch to its leaves; only leaves stamped with its token match"""
+        from pymongo import UpdateOne
+
+        await self.db.id_ledger_leaves.bulk_write([
+            UpdateOne(
+                {"tourist_id": leaf["tourist_id"], "seal": token},
+                {"$set": {"batch": seq, "index": index, "proof": [list(step) for step in proof]},
+                 "$unset": {"lease_until": ""}}
+            )
+            for index, (leaf, proof) in enumerate(zip(leaves, proofs))
+        ], ordered=False)
+
+    def _lease_end(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    async def _renew(self, token: str, count: int) -> bool:
+        """Extend the lease on a seal's stamps; False if any of them expired first"""
+        result = await self.db.id_ledger_leaves.update_many(
+            {"seal": token, "batch": None, "lease_until": {"$gt": datetime.now(timezone.utc)}},
+            {"$set": {"lease_until": self._lease_end()}}
+        )
+        return result.matched_count == count
+
+    async def _release(self, token: str, expired: bool = False):
+        query: Dict[str, Any] = {"seal": token, "batch": None}
+        if expired:
+            # A sealer that renewed in the meantime keeps its leaves
+            query["lease_until"] = {"$lt": datetime.now(timezone.utc)}
+        await self.db.id_ledger_leaves.update_many(query, {"$set": {"seal": None}, "$unset": {"lease_until": ""}})
+
+    async def _recover(self):
+        """Finish or release the stamps of seals whose lease expired"""
+        tokens = await self.db.id_ledger_leaves.distinct(
+            "seal", {"batch": None, "seal": {"$ne": None}, "lease_until": {"$lt": datetime.now(timezone.utc)}}
+        )
+        for token in tokens:
+            sealed = await self.db.id_ledger_batches.find_one({"seal": token})
+            if sealed is None:
+                await self._release(token, expired=True)
+                continue
+            leaves = await self._stamped(token)
+            root, proofs = merkle_tree([leaf["leaf"] for leaf in leaves])
+            if root != sealed["root"]:
+                logging.error(f"ID ledger batch {sealed['_id']} does not match its stamped leaves; not finishing it")
+                continue
+            await self._write_proofs(sealed["_id"], token, leaves, proofs)
+            logging.info(f"Finished interrupted ID ledger batch {sealed['_id']}")
+
+    async def _stamped(self, token: str) -> List[Dict[str, Any]]:
+        return await self.db.id_ledger_leaves.find(
+            {"seal": token}, {"_id": 0, "tourist_id": 1, "leaf": 1}
+        ).sort([("queued_at", 1), ("tourist_id", 1)]).to_list(None)
+
+    async def batch(self, seq: int) -> Optional[Dict[str, Any]]:
+        """A sealed batch, from memory after the first lookup"""
+        cached = self._batches.get(seq)
+        if cached is None:
+            cached = await self.db.id_ledger_batches.find_one({"_id": seq})
+            if cached is None:
+                return None
+            self._batches[seq] = cached
+        return cached
+
+    async def proof(self, tourist_id: str) -> Optional[Dict[str, Any]]:
+        """The stored leaf, batch and inclusion proof of an ID"""
+        return await self.db.id_ledger_leaves.find_one(
+            {"tourist_id": tourist_id}, {"_id": 0, "tourist_id": 1, "leaf": 1, "batch": 1, "index": 1, "proof": 1}
+        )
+
+    async def verify(self, payload: Dict[str, Any], proof: Optional[List[ProofStep]] = None,
+                     batch: Optional[int] = None) -> Dict[str, Any]:
+        """Check a QR payload against the ledger.
+
+        With proof and batch (as returned by proof()) no leaf lookup is
+        needed; otherwise the stored proof of payload["id"] is used.
+        """
+        leaf = leaf_hash(payload)
+        result: Dict[str, Any] = {"valid": False, "tourist_id": payload.get("id"), "leaf": leaf}
+        if proof is None or batch is None:
+            stored = await self.proof(str(payload.get("id")))
+            if stored is None:
+                return self._result(result, "unknown_id")
+            if stored["leaf"] != leaf:
+                return self._result(result, "payload_mismatch")
+            if stored.get("proof") is None:
+                # Registered within the last interval and not sealed yet
+                return self._result(result, "pending")
+            proof, batch = stored["proof"], stored["batch"]
+
+        sealed = await self.batch(batch)
+        if sealed is None:
+            return self._result(result, "pending")
+        try:
+            root = fold_proof(leaf, proof) if len(proof) <= 64 else None
+        except ValueError:
+            root = None
+        if root != sealed["root"]:
+            return self._result(result, "proof_mismatch")
+        result.update(valid=True, batch=batch, root=root, batch_hash=sealed["hash"], sealed_at=sealed["sealed_at"])
+        return self._result(result, "valid")
+
+    def _result(self, result: Dict[str, Any], reason: str) -> Dict[str, Any]:
+        self.verifications.labels(reason).inc()
+        result["reason"] = reason
+        return result
+
+    async def verify_chain(self) -> Dict[str, Any]:
+        """Recompute every batch hash from the genesis; the first broken link if any"""
+        prev_hash = GENESIS_HASH
+        count = 0
+        async for sealed in self.db.id_ledger_batches.find({}).sort("_id", 1):
+            if sealed["_id"] != count or sealed["prev_hash"] != prev_hash or sealed["hash"] != batch_hash(
+                    sealed["_id"], prev_hash, sealed["root"], sealed["count"]):
+                return {"valid": False, "batches": count, "broken_at": sealed["_id"]}
+            prev_hash = sealed["hash"]
+            count += 1
+        return {"valid": True, "batches": count, "head": prev_hash}
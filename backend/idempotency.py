@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import REGISTRY, MetricsRegistry
+from shared_cache import MemoryCache
+
+
+class IdempotencyStore:
+    """Responses to retried POSTs, looked up by the client's Idempotency-Key.
+
+    The first request with a key claims it with a "pending" document (unique on
+    scope and key, so only one worker runs the request) and stores its response
+    when done; replays within window_seconds get that response back. Recent
+    responses are also kept in a bounded in-process window, so a retry hitting
+    the same worker costs no database round trip. A pending claim whose request
+    died is taken over after pending_seconds.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "idempotency_keys",
+        window_seconds: float = 86400.0,
+        pending_seconds: float = 60.0,
+        max_entries: int = 10000,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        self.window_seconds = window_seconds
+        self.pending_seconds = pending_seconds
+        self.recent = MemoryCache(max_entries)
+        self.requests = registry.counter(
+            "idempotent_requests_total", "Requests carrying an Idempotency-Key by outcome", ["scope", "outcome"]
+        )
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("scope", 1), ("key", 1)], unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def begin(self, scope: str, key: str, fingerprint: str) -> Tuple[str, Optional[Any]]:
+        """Claim a key before running the request.
+
+        Returns ("new", None) when the caller should run the request,
+        ("replay", response) for a completed one, ("mismatch", None) when the
+        key was used with a different body and ("in_progress", None) while
+        another request holds it.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        cached = await self.recent.get(f"{scope}:{key}")
+        if cached is not None:
+            return self._outcome(scope, "replay_memory", cached, fingerprint)
+
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one({
+                "scope": scope,
+                "key": key,
+                "fingerprint": fingerprint,
+                "status": "pending",
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.pending_seconds),
+            })
+            self.requests.labels(scope, "new").inc()
+            return "new", None
+        except DuplicateKeyError:
+            pass
+
+        doc = await self.collection.find_one({"scope": scope, "key": key}, {"_id": 0})
+        if doc is None:
+            # Released or expired between the insert and the read; the client can retry
+            self.requests.labels(scope, "in_progress").inc()
+            return "in_progress", None
+        if doc["status"] == "done":
+            await self.recent.set(f"{scope}:{key}", doc, self.window_seconds)
+            return self._outcome(scope, "replay", doc, fingerprint)
+        if doc["fingerprint"] == fingerprint and self._expired(doc, now):
+            taken = await self.collection.update_one(
+                {"scope": scope, "key": key, "status": "pending", "expires_at": doc["expires_at"]},
+                {"$set": {"created_at": now, "expires_at": now + timedelta(seconds=self.pending_seconds)}}
+            )
+            if taken.modified_count:
+                self.requests.labels(scope, "new").inc()
+                return "new", None
+        outcome = "mismatch" if doc["fingerprint"] != fingerprint else "in_progress"
+        self.requests.labels(scope, outcome).inc()
+        return outcome, None
+
+    def _outcome(self, scope: str, label: str, doc: Dict[str, Any], fingerprint: str) -> Tuple[str, Optional[Any]]:
+        if doc["fingerprint"] != fingerprint:
+            self.requests.labels(scope, "mismatch").inc()
+            return "mismatch", None
+        self.requests.labels(scope, label).inc()
+        return "replay", doc["response"]
+
+    @staticmethod
+    def _expired(doc: Dict[str, Any], now: datetime) -> bool:
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at <= now
+
+    async def complete(self, scope: str, key: str, fingerprint: str, response: Any):
+        """Store the response of a claimed request for replays"""
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"scope": scope, "key": key, "fingerprint": fingerprint},
+            {"$set": {
+                "status": "done",
+                "response": response,
+                "completed_at": now,
+                "expires_at": now + timedelta(seconds=self.window_seconds),
+            }}
+        )
+        await self.recent.set(
+            f"{scope}:{key}", {"fingerprint": fingerprint, "response": response}, self.window_seconds
+        )
+
+    async def release(self, scope: str, key: str, fingerprint: str):
+        """Drop the claim of a request that failed, so a retry runs it again"""
+        await self.collection.delete_one(
+            {"scope": scope, "key": key, "fingerprint": fingerprint, "status": "pending"}
+        )
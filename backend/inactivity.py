@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# tourist id, last seen (unix seconds), lat, lng
+SilentTourist = Tuple[str, float, float, float]
+
+
+class TimerWheel:
+    """Hashed timer wheel keyed by deadline slot.
+
+    touch() moves a tourist to the slot of its new deadline in O(1); the
+    sweeper only visits slots whose time has passed, so there is no scan
+    over every tracked tourist.
+    """
+
+    def __init__(self, threshold_seconds: float, tick_seconds: float):
+        self.threshold_seconds = threshold_seconds
+        self.tick_seconds = tick_seconds
+        self._slots: Dict[int, Set[str]] = defaultdict(set)
+        self._slot_of: Dict[str, int] = {}
+        self._last_seen: Dict[str, Tuple[float, float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def _slot(self, timestamp: float) -> int:
+        return int(timestamp // self.tick_seconds)
+
+    def touch(self, tourist_id: str, lat: float, lng: float, now: float):
+        """Record a fix and re-arm the tourist's silence deadline"""
+        self._unlink(tourist_id)
+        slot = self._slot(now + self.threshold_seconds)
+        self._slots[slot].add(tourist_id)
+        self._slot_of[tourist_id] = slot
+        self._last_seen[tourist_id] = (now, lat, lng)
+
+    def forget(self, tourist_id: str):
+        self._unlink(tourist_id)
+        self._last_seen.pop(tourist_id, None)
+
+    def _unlink(self, tourist_id: str):
+        slot = self._slot_of.pop(tourist_id, None)
+        if slot is None:
+            return
+        members = self._slots.get(slot)
+        if members is not None:
+            members.discard(tourist_id)
+            if not members:
+                del self._slots[slot]
+
+    def expire(self, now: float) -> List[SilentTourist]:
+        """Pop every tourist whose deadline slot has passed.
+
+        An expired tourist stays disarmed until its next fix, so one silence
+        produces one alert.
+        """
+        current = self._slot(now)
+        expired = []
+        # Only populated slots exist, so empty stretches cost nothing
+        for slot in sorted(s for s in self._slots if s < current):
+            for tourist_id in self._slots.pop(slot):
+                self._slot_of.pop(tourist_id, None)
+                seen_at, lat, lng = self._last_seen.pop(tourist_id)
+                expired.append((tourist_id, seen_at, lat, lng))
+        return expired
+
+
+class InactivitySweeper:
+    """Background task that reports tourists who stopped sending fixes"""
+
+    def __init__(
+        self,
+        on_silence: Callable[[SilentTourist], Awaitable[None]],
+        threshold_seconds: float = 3600.0,
+        tick_seconds: float = 30.0,
+    ):
+        self.on_silence = on_silence
+        self.wheel = TimerWheel(threshold_seconds, tick_seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def threshold_seconds(self) -> float:
+        return self.wheel.threshold_seconds
+
+    def touch(self, tourist_id: str, lat: float, lng: float, seen_at: Optional[float] = None):
+        """Re-arm on a fix; seen_at re-arms from an earlier fix, as when rebuilding the wheel after a restart"""
+        self.wheel.touch(tourist_id, lat, lng, time.time() if seen_at is None else seen_at)
+
+    def forget(self, tourist_id: str):
+        self.wheel.forget(tourist_id)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        silent = self.wheel.expire(time.time() if now is None else now)
+        for entry in silent:
+            try:
+                await self.on_silence(entry)
+            except Exception as e:
+                logging.error(f"Inactivity alert error for {entry[0]}: {str(e)}")
+        return len(silent)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            await self.sweep()
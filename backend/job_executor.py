@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from metrics import REGISTRY, MetricsRegistry
+
+# Seconds; routine jobs may queue for minutes under a location storm, emergencies should not queue at all
+JOB_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Lane:
+    """One priority class of jobs with its own queue and worker pool"""
+
+    def __init__(self, name: str, workers: int, max_queue: int = 0):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.queued_keys: Set[Hashable] = set()
+        self.running = 0
+        self.tasks: List[asyncio.Task] = []
+
+
+class JobExecutor:
+    """Background jobs on named lanes, each with its own queue and workers.
+
+    Lanes share no workers, so a burst on one lane (routine safety analysis
+    after every location fix) can fill its own bounded queue but never delays
+    a job on another (panic alerts and E-FIRs). Jobs submitted with a key
+    are coalesced while an identical job is still waiting in the queue.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.lanes: Dict[str, Lane] = {}
+        self.wait = registry.histogram(
+            "job_queue_wait_seconds", "Time jobs spent queued before a worker picked them up",
+            ["lane", "job"], buckets=JOB_BUCKETS
+        )
+        self.duration = registry.histogram(
+            "job_run_seconds", "Time jobs spent running", ["lane", "job"], buckets=JOB_BUCKETS
+        )
+        self.jobs = registry.counter("jobs_total", "Jobs by lane and outcome", ["lane", "job", "outcome"])
+        self.depth = registry.gauge("job_queue_depth", "Jobs waiting per lane", ["lane"])
+        self.busy = registry.gauge("jobs_running", "Jobs running per lane", ["lane"])
+
+    def add_lane(self, name: str, workers: int, max_queue: int = 0) -> Lane:
+        """Register a lane; max_queue 0 means unbounded"""
+        lane = Lane(name, workers, max_queue)
+        self.lanes[name] = lane
+        self.depth.labels(name).set_function(lambda: lane.queue.qsize())
+        self.busy.labels(name).set_function(lambda: lane.running)
+        return lane
+
+    async def start(self):
+        for lane in self.lanes.values():
+            # Fresh queues bound to the running loop (the app may be started more than once, e.g. in tests)
+            lane.queue = asyncio.Queue(maxsize=lane.max_queue)
+            lane.queued_keys.clear()
+            lane.tasks = [
+                asyncio.create_task(self._work(lane), name=f"{lane.name}-worker-{i}") for i in range(lane.workers)
+            ]
+
+    def submit(self, lane_name: str, func: Callable[..., Awaitable[Any]], *args,
+               key: Optional[Hashable] = None) -> bool:
+        """Queue func(*args) on a lane; False when coalesced or the lane's queue is full"""
+        lane = self.lanes[lane_name]
+        job = func.__name__
+        if key is not None and key in lane.queued_keys:
+            self.jobs.labels(lane_name, job, "coalesced").inc()
+            return False
+        try:
+            lane.queue.put_nowait((func, args, key, time.monotonic()))
+        except asyncio.QueueFull:
+            self.jobs.labels(lane_name, job, "dropped").inc()
+            return False
+        if key is not None:
+            lane.queued_keys.add(key)
+        return True
+
+    async def _work(self, lane: Lane):
+        while True:
+            func, args, key, enqueued_at = await lane.queue.get()
+            if key is not None:
+                lane.queued_keys.discard(key)
+            job = func.__name__
+            self.wait.labels(lane.name, job).observe(time.monotonic() - enqueued_at)
+            lane.running += 1
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                await func(*args)
+                outcome = "ok"
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                logging.error(f"Job {job} on lane {lane.name} failed: {str(e)}")
+            finally:
+                lane.running -= 1
+                self.duration.labels(lane.name, job).observe(time.perf_counter() - started)
+                self.jobs.labels(lane.name, job, outcome).inc()
+                lane.queue.task_done()
+
+    async def join(self):
+        """Wait until every queued job has finished"""
+        await asyncio.gather(*(lane.queue.join() for lane in self.lanes.values()))
+
+    async def stop(self, drain_seconds: float = 10.0):
+        """Give queued jobs drain_seconds to finish, then cancel the workers"""
+        try:
+            await asyncio.wait_for(self.join(), drain_seconds)
+        except asyncio.TimeoutError:
+            for lane in self.lanes.values():
+                if lane.queue.qsize():
+                    logging.warning(f"Dropping {lane.queue.qsize()} queued {lane.name} jobs at shutdown")
+        tasks = [task for lane in self.lanes.values() for task in lane.tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for lane in self.lanes.values():
+            lane.tasks = []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "workers": lane.workers,
+                "max_queue": lane.max_queue,
+                "queued": lane.queue.qsize(),
+                "running": lane.running,
+            }
+            for name, lane in self.lanes.items()
+        }
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from job_executor import JOB_BUCKETS
+from metrics import REGISTRY, MetricsRegistry
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Statuses reported by the queue depth gauge; done jobs only wait for their TTL
+DEPTH_STATUSES = ("queued", "running", "failed")
+
+
+def _utc(value: datetime) -> datetime:
+    """Motor returns naive UTC datetimes unless the client is tz-aware"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class DurableJobQueue:
+    """Jobs stored in a Mongo collection and run by worker coroutines under a lease.
+
+    A worker claims the oldest due job on its lane by setting lease_until and
+    renews the lease while the handler runs. If the process dies the lease
+    runs out and any worker, in this process or another, claims the job
+    again; delivery is at-least-once, so handlers must be idempotent. A
+    failing job is retried with exponential backoff and jitter, and is kept
+    with status "failed" once it has used max_attempts.
+
+    Lanes have their own workers, as in JobExecutor, so emergency jobs never
+    wait behind routine ones. Jobs enqueued with a key are coalesced while a
+    job with the same key is still queued; a unique partial index on key
+    over queued jobs makes that hold under concurrent enqueues.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "jobs",
+        lease_seconds: float = 60.0,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 5.0,
+        retry_max_seconds: float = 300.0,
+        poll_seconds: float = 1.0,
+        retention_seconds: float = 7 * 86400.0,
+        depth_seconds: float = 15.0,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.depth_seconds = depth_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self.lane_of: Dict[str, str] = {}
+        self.lanes: Dict[str, int] = {}
+        self._wake: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._depth_task: Optional[asyncio.Task] = None
+
+        self.wait = registry.histogram(
+            "durable_job_queue_wait_seconds", "Time durable jobs were due before a worker claimed them",
+            ["lane", "type"], buckets=JOB_BUCKETS
+        )
+        self.duration = registry.histogram(
+            "durable_job_run_seconds", "Time durable job handlers ran", ["lane", "type"], buckets=JOB_BUCKETS
+        )
+        self.jobs = registry.counter(
+            "durable_jobs_total", "Durable jobs by type and outcome", ["lane", "type", "outcome"]
+        )
+        self.depth = registry.gauge(
+            "durable_jobs_depth", "Durable jobs per lane and status across all workers", ["lane", "status"]
+        )
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    def add_lane(self, name: str, workers: int):
+        self.lanes[name] = workers
+
+    def register(self, job_type: str, lane: str, handler: JobHandler):
+        """Run handler(payload) for jobs of job_type on lane's workers"""
+        self.handlers[job_type] = handler
+        self.lane_of[job_type] = lane
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("lane", 1), ("status", 1), ("run_at", 1)])
+        await self.collection.create_index(
+            "key", unique=True, partialFilterExpression={"status": "queued", "key": {"$exists": True}}
+        )
+        # Finished jobs carry expires_at; failed ones are kept for inspection
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], key: Optional[str] = None,
+                      delay_seconds: float = 0.0) -> Optional[str]:
+        """Persist a job; returns its id, or None when coalesced into a queued job with the same key"""
+        lane = self.lane_of[job_type]
+        now = datetime.now(timezone.utc)
+        job_id = str(uuid.uuid4())
+        doc = {
+            "id": job_id,
+            "type": job_type,
+            "lane": lane,
+            "payload": payload,
+            "attempts": 0,
+            "run_at": now + timedelta(seconds=delay_seconds),
+            "created_at": now,
+        }
+        if key is None:
+            await self.collection.insert_one(dict(doc, status="queued"))
+        else:
+            from pymongo.errors import DuplicateKeyError
+            try:
+                result = await self.collection.update_one(
+                    {"key": key, "status": "queued"}, {"$setOnInsert": doc}, upsert=True
+                )
+                coalesced = result.upserted_id is None
+            except DuplicateKeyError:
+                # A concurrent enqueue inserted the queued job first
+                coalesced = True
+            if coalesced:
+                self.jobs.labels(lane, job_type, "coalesced").inc()
+                return None
+        self.jobs.labels(lane, job_type, "enqueued").inc()
+        wake = self._wake.get(lane)
+        if wake is not None:
+            wake.set()
+        return job_id
+
+    async def claim(self, lane: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest due job on a lane, including jobs whose lease has run out"""
+        from pymongo import ReturnDocument
+        now = datetime.now(timezone.utc)
+        job = await self.collection.find_one_and_update(
+            {
+                "lane": lane,
+                "$or": [
+                    {"status": "queued", "run_at": {"$lte": now}},
+                    {"status": "running", "lease_until": {"$lte": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": self.worker_id,
+                    "started_at": now,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            job.pop("_id", None)
+        return job
+
+    def _owned(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Filter matching the job only while this claim still holds it"""
+        return {"id": job["id"], "status": "running", "attempts": job["attempts"]}
+
+    async def _renew(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            lease_until = datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+            await self.collection.update_one(self._owned(job), {"$set": {"lease_until": lease_until}})
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self, lane: str, job: Dict[str, Any]):
+        job_type = job["type"]
+        self.wait.labels(lane, job_type).observe(
+            max((datetime.now(timezone.utc) - _utc(job["run_at"])).total_seconds(), 0.0)
+        )
+        handler = self.handlers.get(job_type)
+        if handler is None or job["attempts"] > self.max_attempts:
+            # Unknown type, or a job whose workers kept dying mid-run
+            reason = "no handler" if handler is None else "lease expired on every attempt"
+            await self.collection.update_one(self._owned(job), {"$set": {"status": "failed", "last_error": reason}})
+            self.jobs.labels(lane, job_type, "failed").inc()
+            return
+
+        renew = asyncio.create_task(self._renew(job))
+        started = time.perf_counter()
+        try:
+            await handler(job["payload"])
+        except asyncio.CancelledError:
+            # Shutdown: the lease runs out and another worker retries the job
+            raise
+        except Exception as e:
+            from pymongo.errors import DuplicateKeyError
+            now = datetime.now(timezone.utc)
+            if job["attempts"] >= self.max_attempts:
+                update = {"status": "failed", "last_error": str(e), "finished_at": now}
+                outcome = "failed"
+                logging.error(f"Job {job['id']} ({job_type}) failed after {job['attempts']} attempts: {str(e)}")
+            else:
+                update = {"status": "queued", "last_error": str(e),
+                          "run_at": now + timedelta(seconds=self._backoff(job["attempts"]))}
+                outcome = "retried"
+                logging.warning(f"Job {job['id']} ({job_type}) attempt {job['attempts']} failed: {str(e)}")
+            try:
+                await self.collection.update_one(self._owned(job), {"$set": update, "$unset": {"lease_until": ""}})
+            except DuplicateKeyError:
+                # A newer job with the same key is already queued and will do this work
+                await self.collection.update_one(self._owned(job), {
+                    "$set": {"status": "done", "last_error": str(e), "finished_at": now,
+                             "expires_at": now + timedelta(seconds=self.retention_seconds)},
+                    "$unset": {"lease_until": ""},
+                })
+                outcome = "coalesced"
+            self.jobs.labels(lane, job_type, outcome).inc()
+        else:
+            now = datetime.now(timezone.utc)
+            await self.collection.update_one(self._owned(job), {
+                "$set": {
+                    "status": "done",
+                    "finished_at": now,
+                    "expires_at": now + timedelta(seconds=self.retention_seconds),
+                },
+                "$unset": {"lease_until": ""},
+            })
+            self.jobs.labels(lane, job_type, "done").inc()
+        finally:
+            renew.cancel()
+            self.duration.labels(lane, job_type).observe(time.perf_counter() - started)
+
+    async def _work(self, lane: str):
+        wake = self._wake[lane]
+        while True:
+            try:
+                job = await self.claim(lane)
+            except Exception as e:
+                logging.error(f"Job claim error on lane {lane}: {str(e)}")
+                job = None
+            if job is None:
+                wake.clear()
+                try:
+                    await asyncio.wait_for(wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(lane, job)
+
+    async def start(self):
+        """Start the worker coroutines for every lane"""
+        for lane, workers in self.lanes.items():
+            self._wake[lane] = asyncio.Event()
+            self._tasks.extend(
+                asyncio.create_task(self._work(lane), name=f"{lane}-job-worker-{i}") for i in range(workers)
+            )
+
+    async def stop(self):
+        """Stop claiming; jobs cut off mid-run are retried once their lease runs out"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wake = {}
+        if self._depth_task:
+            self._depth_task.cancel()
+            await asyncio.gather(self._depth_task, return_exceptions=True)
+            self._depth_task = None
+
+    def start_depth_gauge(self):
+        """Refresh durable_jobs_depth every depth_seconds, whether or not this process runs workers"""
+        if self._depth_task is None:
+            self._depth_task = asyncio.create_task(self._report_depth())
+
+    async def _report_depth(self):
+        while True:
+            try:
+                await self.refresh_depth()
+            except Exception as e:
+                logging.error(f"Job queue depth error: {str(e)}")
+            await asyncio.sleep(self.depth_seconds)
+
+    async def refresh_depth(self):
+        counts = await self._counts()
+        for lane in self.lanes:
+            for status in DEPTH_STATUSES:
+                self.depth.labels(lane, status).set(counts.get((lane, status), 0))
+
+    async def _counts(self) -> Dict[Tuple[str, str], int]:
+        rows = await self.collection.aggregate([
+            {"$group": {"_id": {"lane": "$lane", "status": "$status"}, "count": {"$sum": 1}}}
+        ]).to_list(None)
+        return {(row["_id"]["lane"], row["_id"]["status"]): row["count"] for row in rows}
+
+    async def join(self, timeout: float = 60.0):
+        """Wait until no job is queued and due, or running"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            pending = await self.collection.count_documents({
+                "$or": [
+                    {"status": "queued", "run_at": {"$lte": datetime.now(timezone.utc)}},
+                    {"status": "running"},
+                ]
+            })
+            if not pending:
+                return
+            await asyncio.sleep(0.05)
+
+    async def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            lane: {"workers": workers if self._tasks else 0} for lane, workers in self.lanes.items()
+        }
+        for (lane, status), count in (await self._counts()).items():
+            summary.setdefault(lane, {"workers": 0})[status] = count
+        return summary
@@ -0,0 +1,183 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from geo import Tile, parent_tile, tile_for
+
+Position = Tuple[float, float, float]  # lat, lng, unix timestamp
+
+
+def _viewport_ranges(min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int):
+    _, x0, y0 = tile_for(max_lat, min_lng, zoom)
+    _, x1, y1 = tile_for(min_lat, max_lng, zoom)
+    n = 1 << zoom
+    xs = range(x0, x1 + 1) if x0 <= x1 else list(range(x0, n)) + list(range(0, x1 + 1))
+    return xs, range(y0, y1 + 1)
+
+
+def viewport_tile_count(min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int) -> int:
+    xs, ys = _viewport_ranges(min_lat, min_lng, max_lat, max_lng, zoom)
+    return len(xs) * len(ys)
+
+
+def viewport_tiles(min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int) -> List[Tile]:
+    xs, ys = _viewport_ranges(min_lat, min_lng, max_lat, max_lng, zoom)
+    return [(zoom, x, y) for x in xs for y in ys]
+
+
+class ViewportSubscription:
+    """A console watching one map viewport.
+
+    Changes are coalesced per tourist until the next flush, so a tourist who
+    reports ten fixes between frames costs one entry in the next delta.
+    """
+
+    def __init__(self, bbox: Tuple[float, float, float, float], zoom: int):
+        self.bbox = bbox
+        self.zoom = zoom
+        self.tiles: List[Tile] = []
+        self._pending: Dict[str, Optional[Position]] = {}
+        self._changed = asyncio.Event()
+        self.seq = 0
+
+    def covers(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if not (min_lat <= lat <= max_lat):
+            return False
+        if min_lng <= max_lng:
+            return min_lng <= lng <= max_lng
+        return lng >= min_lng or lng <= max_lng  # viewport crosses the antimeridian
+
+    def mark(self, tourist_id: str, position: Optional[Position]):
+        self._pending[tourist_id] = position
+        self._changed.set()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def take_delta(self, precision: int = 5) -> Optional[Dict[str, Any]]:
+        """Pending changes as a compact delta frame, or None if nothing changed"""
+        self._changed.clear()
+        if not self._pending:
+            return None
+        pending, self._pending = self._pending, {}
+        self.seq += 1
+        return {
+            "seq": self.seq,
+            "upsert": [
+                [tid, round(pos[0], precision), round(pos[1], precision), int(pos[2])]
+                for tid, pos in pending.items() if pos is not None
+            ],
+            "remove": [tid for tid, pos in pending.items() if pos is None]
+        }
+
+
+class LivePositionStore:
+    """Latest position per tourist, bucketed into map tiles.
+
+    Positions are kept at a fine tile zoom. Viewport subscriptions register
+    on the coarsest zoom that keeps their tile count bounded, so an update
+    only touches the subscribers registered on the tiles it leaves and
+    enters instead of every open console.
+    """
+
+    def __init__(self, zoom: int = 14, max_subscription_tiles: int = 256):
+        self.zoom = zoom
+        self.max_subscription_tiles = max_subscription_tiles
+        self._positions: Dict[str, Position] = {}
+        self._tiles: Dict[str, Tile] = {}
+        self._members: Dict[Tile, Set[str]] = defaultdict(set)
+        self._subscribers: Dict[Tile, Set[ViewportSubscription]] = defaultdict(set)
+        self._subscription_zooms: Dict[int, int] = defaultdict(int)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def get(self, tourist_id: str) -> Optional[Position]:
+        return self._positions.get(tourist_id)
+
+    def update(self, tourist_id: str, lat: float, lng: float, timestamp: datetime):
+        position = (lat, lng, timestamp.timestamp())
+        tile = tile_for(lat, lng, self.zoom)
+        old_tile = self._tiles.get(tourist_id)
+        old_position = self._positions.get(tourist_id)
+
+        self._positions[tourist_id] = position
+        if old_tile != tile:
+            if old_tile is not None:
+                self._members[old_tile].discard(tourist_id)
+                if not self._members[old_tile]:
+                    del self._members[old_tile]
+            self._members[tile].add(tourist_id)
+            self._tiles[tourist_id] = tile
+
+        for subscription in self._affected(old_tile, tile):
+            if subscription.covers(lat, lng):
+                subscription.mark(tourist_id, position)
+            elif old_position and subscription.covers(old_position[0], old_position[1]):
+                subscription.mark(tourist_id, None)
+
+    def remove(self, tourist_id: str):
+        """Evict a tourist and tell any viewport that showed them"""
+        position = self._positions.pop(tourist_id, None)
+        tile = self._tiles.pop(tourist_id, None)
+        if tile is None:
+            return
+        self._members[tile].discard(tourist_id)
+        if not self._members[tile]:
+            del self._members[tile]
+        for subscription in self._affected(tile, tile):
+            if position and subscription.covers(position[0], position[1]):
+                subscription.mark(tourist_id, None)
+
+    def _affected(self, old_tile: Optional[Tile], tile: Tile):
+        subscriptions = set()
+        for zoom in self._subscription_zooms:
+            subscriptions.update(self._subscribers.get(parent_tile(tile, zoom), ()))
+            if old_tile is not None and old_tile != tile:
+                subscriptions.update(self._subscribers.get(parent_tile(old_tile, zoom), ()))
+        return subscriptions
+
+    def subscribe(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> ViewportSubscription:
+        zoom = self.zoom
+        while zoom > 0 and viewport_tile_count(min_lat, min_lng, max_lat, max_lng, zoom) > self.max_subscription_tiles:
+            zoom -= 1
+
+        subscription = ViewportSubscription((min_lat, min_lng, max_lat, max_lng), zoom)
+        subscription.tiles = viewport_tiles(min_lat, min_lng, max_lat, max_lng, zoom)
+        for tile in subscription.tiles:
+            self._subscribers[tile].add(subscription)
+        self._subscription_zooms[zoom] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: ViewportSubscription):
+        for tile in subscription.tiles:
+            subscribers = self._subscribers.get(tile)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[tile]
+        if subscription.tiles:
+            self._subscription_zooms[subscription.zoom] -= 1
+            if self._subscription_zooms[subscription.zoom] <= 0:
+                del self._subscription_zooms[subscription.zoom]
+        subscription.tiles = []
+
+    def snapshot(self, subscription: ViewportSubscription, precision: int = 5) -> Dict[str, Any]:
+        """Every position currently inside a subscription's viewport"""
+        upsert = []
+        tiles = set(subscription.tiles)
+        # Walk populated fine tiles rather than every child tile of the viewport
+        for member_tile, members in self._members.items():
+            if parent_tile(member_tile, subscription.zoom) not in tiles:
+                continue
+            for tourist_id in members:
+                lat, lng, ts = self._positions[tourist_id]
+                if subscription.covers(lat, lng):
+                    upsert.append([tourist_id, round(lat, precision), round(lng, precision), int(ts)])
+        return {"seq": 0, "snapshot": True, "upsert": upsert, "remove": []}
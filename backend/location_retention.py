@@ -0,0 +1,260 @@
+import asyncio
+import gzip
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from geo import KM_PER_DEGREE
+from metrics import REGISTRY, MetricsRegistry
+
+# lat, lng, unix seconds
+TrackPoint = Tuple[float, float, float]
+
+CHUNK = timedelta(hours=1)
+
+# Raw fixes fetched per cursor batch and written to the archive at a time
+ARCHIVE_BATCH = 1000
+
+
+def simplify_track(points: List[TrackPoint], tolerance_m: float) -> List[TrackPoint]:
+    """Douglas-Peucker simplification keeping every point further than tolerance_m from the kept line.
+
+    Distances use a local equirectangular projection, which is accurate to
+    well under a metre over the few kilometres an hour of fixes spans.
+    """
+    if len(points) <= 2:
+        return list(points)
+    mid_lat = sum(p[0] for p in points) / len(points)
+    km_x = KM_PER_DEGREE * max(math.cos(math.radians(mid_lat)), 0.01)
+    xy = [(p[1] * km_x * 1000.0, p[0] * KM_PER_DEGREE * 1000.0) for p in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        farthest, farthest_m = None, tolerance_m
+        for i in range(first + 1, last):
+            px, py = xy[i]
+            if length == 0:
+                distance = math.hypot(px - x1, py - y1)
+            else:
+                distance = abs(dy * (px - x1) - dx * (py - y1)) / length
+            if distance > farthest_m:
+                farthest, farthest_m = i, distance
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class LocationRetention:
+    """Keeps location_history small enough for its indexes to stay in memory.
+
+    Raw fixes carry recorded_at and are deleted by a TTL index after
+    raw_seconds. Before that, a background task compacts each past hour of
+    fixes into one location_tracks document per tourist, simplified with
+    Douglas-Peucker, and optionally writes the raw fixes to gzipped JSON
+    lines under archive_dir. Compaction walks forward hour by hour from a
+    watermark kept in retention_state; rewriting an hour replaces its
+    documents and files, so a chunk interrupted by a restart is simply
+    redone.
+    """
+
+    def __init__(
+        self,
+        db,
+        raw_seconds: float = 7 * 86400.0,
+        compact_after_seconds: float = 3600.0,
+        tolerance_m: float = 25.0,
+        interval_seconds: float = 300.0,
+        max_chunks_per_run: int = 24,
+        archive_dir: str = "",
+        claim: Optional[Callable[[str, float], Awaitable[bool]]] = None,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.db = db
+        self.raw_seconds = raw_seconds
+        self.compact_after_seconds = compact_after_seconds
+        self.tolerance_m = tolerance_m
+        self.interval_seconds = interval_seconds
+        self.max_chunks_per_run = max_chunks_per_run
+        self.archive_dir = archive_dir
+        self.claim = claim
+        self._task: Optional[asyncio.Task] = None
+
+        self.fixes = registry.counter(
+            "location_retention_fixes_total", "Raw location fixes processed by the retention task", ["action"]
+        )
+        self.points = registry.counter(
+            "location_track_points_total", "Simplified track points written to location_tracks"
+        )
+
+    async def ensure_indexes(self):
+        from pymongo.errors import OperationFailure
+
+        history = self.db.location_history
+        # Serves the latest-fixes query of the safety analysis
+        await history.create_index([("tourist_id", 1), ("timestamp", -1)])
+        try:
+            await history.create_index("recorded_at", expireAfterSeconds=int(self.raw_seconds))
+        except OperationFailure:
+            # The TTL changed since the index was built
+            await self.db.command(
+                "collMod", "location_history",
+                index={"keyPattern": {"recorded_at": 1}, "expireAfterSeconds": int(self.raw_seconds)}
+            )
+        await self.db.location_tracks.create_index([("tourist_id", 1), ("start", 1)], unique=True)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Location retention error: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _watermark(self) -> Optional[datetime]:
+        state = await self.db.retention_state.find_one({"_id": "location_history"})
+        if state:
+            return _utc(state["compacted_until"])
+        oldest = await self.db.location_history.find_one(
+            {"recorded_at": {"$exists": True}}, {"recorded_at": 1}, sort=[("recorded_at", 1)]
+        )
+        if not oldest:
+            return None
+        recorded_at = _utc(oldest["recorded_at"])
+        return recorded_at.replace(minute=0, second=0, microsecond=0)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Compact (and archive) every finished hour older than compact_after_seconds; returns hours done"""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=self.compact_after_seconds)
+        start = await self._watermark()
+        done = 0
+        while start is not None and start + CHUNK <= cutoff and done < self.max_chunks_per_run:
+            if self.claim is not None and not await self.claim(f"location_chunk:{start.isoformat()}", 600.0):
+                # Another worker has this hour; let it advance the watermark
+                break
+            await self.compact_chunk(start, start + CHUNK)
+            start += CHUNK
+            await self.db.retention_state.update_one(
+                {"_id": "location_history"}, {"$set": {"compacted_until": start}}, upsert=True
+            )
+            done += 1
+        return done
+
+    async def compact_chunk(self, start: datetime, end: datetime):
+        # Fixes stream in time order; only their points are held, and raw fixes go to the archive in batches
+        loop = asyncio.get_running_loop()
+        tracks: Dict[str, List[TrackPoint]] = defaultdict(list)
+        archive: Optional[_HourArchive] = None
+        pending: List[Dict[str, Any]] = []
+        count = 0
+        try:
+            async for fix in self.db.location_history.find(
+                {"recorded_at": {"$gte": start, "$lt": end}},
+                {"_id": 0, "tourist_id": 1, "latitude": 1, "longitude": 1, "recorded_at": 1, "timestamp": 1,
+                 "location_name": 1}
+            ).sort("recorded_at", 1).batch_size(ARCHIVE_BATCH):
+                tracks[fix["tourist_id"]].append(
+                    (fix["latitude"], fix["longitude"], _utc(fix["recorded_at"]).timestamp())
+                )
+                count += 1
+                if not self.archive_dir:
+                    continue
+                pending.append(fix)
+                if len(pending) >= ARCHIVE_BATCH:
+                    archive = await self._archive(archive, start, pending)
+                    pending = []
+            if pending:
+                archive = await self._archive(archive, start, pending)
+            if not count:
+                return
+
+            for tourist_id, points in tracks.items():
+                simplified = simplify_track(points, self.tolerance_m)
+                await self.db.location_tracks.update_one(
+                    {"tourist_id": tourist_id, "start": start},
+                    {"$set": {
+                        "end": end,
+                        "points": [list(p) for p in simplified],
+                        "raw_count": len(points),
+                        "tolerance_m": self.tolerance_m,
+                    }},
+                    upsert=True
+                )
+                self.points.inc(len(simplified))
+            self.fixes.labels("compacted").inc(count)
+
+            if archive is not None:
+                path = await loop.run_in_executor(None, archive.commit)
+                archive = None
+                self.fixes.labels("archived").inc(count)
+                logging.info(f"Archived {count} location fixes to {path}")
+        finally:
+            if archive is not None:
+                await loop.run_in_executor(None, archive.abort)
+
+    async def _archive(self, archive: Optional["_HourArchive"], start: datetime,
+                       fixes: List[Dict[str, Any]]) -> "_HourArchive":
+        """Append fixes to the hour's archive, opening it on the first batch"""
+        loop = asyncio.get_running_loop()
+        if archive is None:
+            archive = await loop.run_in_executor(None, _HourArchive, self.archive_dir, start)
+        await loop.run_in_executor(None, archive.write, fixes)
+        return archive
+
+
+class _HourArchive:
+    """One hour of raw fixes written to <archive_dir>/YYYY/MM/DD/HH.jsonl.gz as they stream in.
+
+    Lines go to a .partial file that replaces the archive only on commit,
+    so an interrupted chunk never leaves a truncated archive behind.
+    """
+
+    def __init__(self, archive_dir: str, start: datetime):
+        directory = os.path.join(archive_dir, start.strftime("%Y"), start.strftime("%m"), start.strftime("%d"))
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{start.strftime('%H')}.jsonl.gz")
+        self.partial = f"{self.path}.partial"
+        self._out = gzip.open(self.partial, "wt", encoding="utf-8")
+
+    def write(self, fixes: List[Dict[str, Any]]):
+        self._out.writelines(json.dumps(fix, default=lambda v: _utc(v).isoformat()) + "\n" for fix in fixes)
+
+    def commit(self) -> str:
+        self._out.close()
+        os.replace(self.partial, self.path)
+        return self.path
+
+    def abort(self):
+        self._out.close()
+        try:
+            os.remove(self.partial)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,294 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+_profile_ids = itertools.count(1)
+
+
+class RequestProfile:
+    """Timings for one sampled request: named stages plus optional stack samples"""
+
+    def __init__(self, method: str, path: str):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.route = path
+        self.status = 0
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        self.response_time = 0.0
+        self.stages: List[Dict[str, Any]] = []
+        self.stacks: Counter = Counter()
+
+    def add_stage(self, name: str, started: float, duration: float):
+        self.stages.append({
+            "name": name,
+            "offset_ms": round((started - self._started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3)
+        })
+
+    def finish(self, status: int, route: Optional[str]):
+        self.duration = time.perf_counter() - self._started
+        self.status = status
+        if route:
+            self.route = route
+
+    def server_timing(self) -> str:
+        """Stage totals as a Server-Timing header value"""
+        totals: Dict[str, float] = {}
+        for stage in self.stages:
+            totals[stage["name"]] = totals.get(stage["name"], 0.0) + stage["duration_ms"]
+        parts = [f"{name.replace(' ', '_')};dur={ms:.3f}" for name, ms in totals.items()]
+        parts.append(f"total;dur={self.response_time * 1000:.3f}")
+        return ", ".join(parts)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "response_ms": round(self.response_time * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "stages": self.stages,
+            "stack_samples": sum(self.stacks.values())
+        }
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a named stage of the current sampled request; free otherwise"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, started, time.perf_counter() - started)
+
+
+def _fold(frame) -> str:
+    """Flamegraph folded stack, root first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Background thread sampling the event loop thread's stack.
+
+    Each sample is credited to the profile of the asyncio task that was
+    running at that moment, so concurrent requests do not pollute each
+    other. Time spent in executor threads shows up as stage timings only.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._profiles: Dict[Any, RequestProfile] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def attach(self, task, profile: RequestProfile):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+                self._loop_thread = threading.get_ident()
+            self._profiles[task] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def detach(self, task):
+        with self._lock:
+            self._profiles.pop(task, None)
+
+    def _run(self):
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+        while True:
+            time.sleep(self.interval_seconds)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                task = current_tasks.get(self._loop) if current_tasks is not None else None
+                profile = self._profiles.get(task)
+                if profile is None:
+                    continue
+            profile.stacks[_fold(frame)] += 1
+
+
+class Profiler:
+    """Decides which requests to profile and keeps the most recent profiles"""
+
+    def __init__(self, sample_rate: float = 0.0, debug_token: str = "", stack_interval_ms: float = 0.0,
+                 keep: int = 200):
+        self.sample_rate = sample_rate
+        self.debug_token = debug_token
+        self.sampler = StackSampler(stack_interval_ms / 1000.0) if stack_interval_ms > 0 else None
+        self._profiles: Deque[RequestProfile] = deque(maxlen=keep)
+
+    def wants(self, header_value: Optional[str]) -> bool:
+        if header_value is not None and (not self.debug_token or header_value == self.debug_token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, method: str, path: str) -> RequestProfile:
+        profile = RequestProfile(method, path)
+        _current_profile.set(profile)
+        if self.sampler is not None:
+            self.sampler.attach(asyncio.current_task(), profile)
+        return profile
+
+    def finish(self, profile: RequestProfile, status: int, route: Optional[str]):
+        if self.sampler is not None:
+            self.sampler.detach(asyncio.current_task())
+        _current_profile.set(None)
+        profile.finish(status, route)
+        self._profiles.append(profile)
+
+    def recent(self, route: Optional[str] = None) -> List[RequestProfile]:
+        return [p for p in reversed(self._profiles) if route is None or p.route == route]
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def folded(self, profiles: List[RequestProfile]) -> str:
+        """Merged stack samples in flamegraph.pl / speedscope folded format"""
+        merged: Counter = Counter()
+        for profile in profiles:
+            merged.update(profile.stacks)
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling a sample of requests, or those sent with the debug header.
+
+    Profiled responses carry X-Profile-Id and a Server-Timing header with
+    the stage totals; the full profile is kept by the Profiler.
+    """
+
+    def __init__(self, app, profiler: Profiler, header: str = "x-debug-profile"):
+        self.app = app
+        self.profiler = profiler
+        self.header = header.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header_value = None
+        for name, value in scope.get("headers", []):
+            if name == self.header:
+                header_value = value.decode("latin-1")
+                break
+        if not self.profiler.wants(header_value):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start(scope["method"], scope["path"])
+        status = [500]
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                # Headers go out before the body, so only the id and timings so far fit here;
+                # duration keeps counting through post-response background tasks
+                profile.response_time = time.perf_counter() - profile._started
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile.id).encode()))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            self.profiler.finish(profile, status[0], route)
+
+
+class LoopBlockDetector:
+    """Watchdog thread that logs whenever the event loop stops turning for too long.
+
+    A heartbeat task stamps the time on every loop iteration it gets; when
+    the stamp goes stale past the threshold the watchdog captures the loop
+    thread's stack (the callback that is hogging it) and logs it once the
+    block ends, with the total blocked time.
+    """
+
+    def __init__(self, threshold_ms: float, heartbeat_ms: float = 10.0):
+        self.threshold = threshold_ms / 1000.0
+        self.heartbeat = heartbeat_ms / 1000.0
+        self.blocks = 0
+        self._last_beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread: Optional[int] = None
+
+    async def start(self):
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-block-detector", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _beat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.heartbeat)
+
+    def _watch(self):
+        blocked_stack = None
+        blocked_since = None
+        poll = min(self.threshold / 2, 0.05)
+        while not self._stop.wait(poll):
+            stale = time.monotonic() - self._last_beat
+            if stale > self.threshold + self.heartbeat:
+                if blocked_stack is None:
+                    frame = sys._current_frames().get(self._loop_thread)
+                    blocked_stack = "".join(traceback.format_stack(frame, limit=15)) if frame else "<no frame>"
+                    blocked_since = self._last_beat
+            elif blocked_stack is not None:
+                # _last_beat is the first beat after the block, so the gap is the blocked time
+                blocked_ms = (self._last_beat - blocked_since - self.heartbeat) * 1000
+                if blocked_ms >= self.threshold * 1000:
+                    self.blocks += 1
+                    logging.warning(f"Event loop blocked for {blocked_ms:.0f} ms in:\n{blocked_stack}")
+                blocked_stack = None
@@ -0,0 +1,66 @@
+import math
+from typing import Iterable
+
+import numpy as np
+
+from geo import EARTH_RADIUS_KM, circle_bbox
+
+
+def threat_penalty(threat_level: int) -> float:
+    """Risk contributed by one covering threat: (level / 10) squared"""
+    return (threat_level / 10.0) ** 2
+
+
+def _index_range(centers: np.ndarray, low: float, high: float):
+    return int(np.searchsorted(centers, low, side="left")), int(np.searchsorted(centers, high, side="right"))
+
+
+def rasterize_risk(lat_centers: np.ndarray, lng_centers: np.ndarray, threat_indexes: Iterable,
+                   centre_lat: float, centre_lng: float, reach_km: float) -> np.ndarray:
+    """Summed threat penalty at every (lat, lng) grid point.
+
+    lat_centers and lng_centers must be ascending. Only threats the index
+    returns for the grid's bounding circle (centre, reach_km) are drawn.
+    Circles are evaluated with vectorized haversine over the slice of the
+    grid their bounding box covers; polygons use their prepared shape.
+    """
+    risk = np.zeros((len(lat_centers), len(lng_centers)), dtype=np.float32)
+
+    for threat_index in threat_indexes:
+        for position in threat_index.candidate_positions(centre_lat, centre_lng, reach_km):
+            threat = threat_index.threats[position]
+            shape = threat_index.shapes[position]
+            penalty = threat_penalty(threat.threat_level)
+
+            if shape is not None:
+                t_min_lat, t_min_lng, t_max_lat, t_max_lng = shape.bbox
+                r0, r1 = _index_range(lat_centers, t_min_lat, t_max_lat)
+                c0, c1 = _index_range(lng_centers, t_min_lng, t_max_lng)
+                for r in range(r0, r1):
+                    lat = float(lat_centers[r])
+                    for c in range(c0, c1):
+                        if shape.contains(lat, float(lng_centers[c])):
+                            risk[r, c] += penalty
+                continue
+
+            min_lat, min_lng, max_lat, max_lng = circle_bbox(threat.latitude, threat.longitude, threat.radius_km)
+            r0, r1 = _index_range(lat_centers, min_lat, max_lat)
+            if r0 >= r1:
+                continue
+
+            # Circles near the antimeridian also cover the wrapped side
+            for offset in (-360.0, 0.0, 360.0):
+                c0, c1 = _index_range(lng_centers, min_lng + offset, max_lng + offset)
+                if c0 >= c1:
+                    continue
+                lat = np.radians(lat_centers[r0:r1])[:, None]
+                lng = np.radians(lng_centers[c0:c1])[None, :]
+                t_lat, t_lng = math.radians(threat.latitude), math.radians(threat.longitude)
+                a = (np.sin((lat - t_lat) / 2) ** 2
+                     + np.cos(lat) * math.cos(t_lat) * np.sin((lng - t_lng) / 2) ** 2)
+                distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+                risk[r0:r1, c0:c1] += np.where(distance <= threat.radius_km, penalty, 0.0).astype(np.float32)
+                if max_lng - min_lng >= 360.0:
+                    break
+
+    return risk
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from geo import MAX_MERCATOR_LAT, BBox, Tile, circle_bbox, haversine_km, tile_bbox, tile_for, tile_y_to_lat
+from geometry import prepare_geometry
+from risk_raster import rasterize_risk
+from shared_arrays import SharedArrayStore, content_key
+
+
+class RiskTile:
+    """One rendered tile: float16 risk values, row-major, north row first"""
+
+    __slots__ = ("key", "values", "generation", "_etag")
+
+    def __init__(self, key: Tile, values: np.ndarray, generation: int):
+        self.key = key
+        self.values = values
+        self.generation = generation
+        self._etag = None
+
+    @property
+    def etag(self) -> str:
+        """Derived from the pixels, so every worker tags identical tiles identically"""
+        if self._etag is None:
+            z, x, y = self.key
+            digest = hashlib.blake2b(self.values.tobytes(), digest_size=8).hexdigest()
+            self._etag = f'"rt-{z}-{x}-{y}-{digest}"'
+        return self._etag
+
+    def to_bytes(self) -> bytes:
+        return self.values.astype("<f2").tobytes()
+
+
+def threat_fingerprint(threat) -> Tuple:
+    """Content identity of a threat; ids are ignored so a re-seed with new ids is not a change"""
+    geometry = getattr(threat, "geometry", None)
+    return (
+        threat.name, threat.latitude, threat.longitude, threat.radius_km, threat.threat_level,
+        json.dumps(geometry, sort_keys=True) if geometry else None
+    )
+
+
+def threat_bbox(threat) -> BBox:
+    geometry = getattr(threat, "geometry", None)
+    if geometry:
+        shape = prepare_geometry(geometry)
+        if shape is not None:
+            return shape.bbox
+    return circle_bbox(threat.latitude, threat.longitude, threat.radius_km)
+
+
+def bbox_intersects(a: BBox, b: BBox) -> bool:
+    if a[0] > b[2] or a[2] < b[0]:
+        return False
+    for offset in (-360.0, 0.0, 360.0):
+        if a[1] + offset <= b[3] and a[3] + offset >= b[1]:
+            return True
+    return False
+
+
+class RiskTileStore:
+    """Multi-resolution web mercator risk raster built from threat layers.
+
+    Tiles up to precompute_zoom are rendered eagerly; deeper tiles render on
+    first request and stay in an LRU cache. When a layer changes only the
+    cached tiles overlapping the threats that actually changed are dropped,
+    so one new threat zone does not repaint the world.
+
+    With a SharedArrayStore the eager zoom levels are rendered once per host
+    into a memory-mapped pyramid that all workers read from.
+    """
+
+    def __init__(self, tile_size: int = 128, precompute_zoom: int = 3, lookup_zoom: int = 8,
+                 max_zoom: int = 14, cache_size: int = 4096, full_rebuild_threshold: int = 500,
+                 shared: Optional[SharedArrayStore] = None):
+        self.tile_size = tile_size
+        self.precompute_zoom = precompute_zoom
+        self.lookup_zoom = lookup_zoom
+        self.max_zoom = max_zoom
+        self.cache_size = cache_size
+        self.full_rebuild_threshold = full_rebuild_threshold
+        self.shared = shared
+        self.generation = 0
+        self.content_key = content_key([tile_size, precompute_zoom])
+        self._pyramid: Optional[Tuple[str, np.ndarray]] = None
+        self._pyramid_tiles: Dict[Tile, RiskTile] = {}
+        self._layers: Dict[str, object] = {}
+        self._fingerprints: Dict[str, Counter] = {}
+        self._tiles: "OrderedDict[Tile, RiskTile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    @property
+    def tile_bytes(self) -> int:
+        return self.tile_size * self.tile_size * 2
+
+    @property
+    def pyramid_tile_count(self) -> int:
+        return ((1 << (2 * (self.precompute_zoom + 1))) - 1) // 3
+
+    def set_layer(self, name: str, threat_index):
+        """Replace a layer and invalidate only the tiles its changes touch"""
+        new_prints = Counter()
+        by_print = {}
+        for threat in threat_index.threats:
+            fingerprint = threat_fingerprint(threat)
+            new_prints[fingerprint] += 1
+            by_print[fingerprint] = threat
+
+        old_prints = self._fingerprints.get(name, Counter())
+        old_index = self._layers.get(name)
+        old_by_print = {threat_fingerprint(t): t for t in old_index.threats} if old_index is not None else {}
+
+        changed = list(((new_prints - old_prints) + (old_prints - new_prints)).keys())
+
+        with self._lock:
+            self._layers[name] = threat_index
+            self._fingerprints[name] = new_prints
+            if not changed:
+                return
+            self.generation += 1
+            self.content_key = content_key(
+                [self.tile_size, self.precompute_zoom]
+                + [(layer, sorted(prints.items())) for layer, prints in sorted(self._fingerprints.items())]
+            )
+
+            if len(changed) > self.full_rebuild_threshold:
+                self._tiles.clear()
+                return
+
+            dirty = [threat_bbox(by_print.get(fp) or old_by_print[fp]) for fp in changed]
+            for key in list(self._tiles):
+                if any(bbox_intersects(tile_bbox(*key), box) for box in dirty):
+                    del self._tiles[key]
+
+    def valid_tile(self, z: int, x: int, y: int) -> bool:
+        return 0 <= z <= self.max_zoom and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+    def _pyramid_offset(self, z: int, x: int, y: int) -> int:
+        return ((1 << (2 * z)) - 1) // 3 + y * (1 << z) + x
+
+    def tile(self, z: int, x: int, y: int) -> RiskTile:
+        key = (z, x, y)
+        with self._lock:
+            if self._pyramid is not None and z <= self.precompute_zoom and self._pyramid[0] == self.content_key:
+                cached = self._pyramid_tiles.get(key)
+                if cached is None:
+                    cached = RiskTile(key, self._pyramid[1][self._pyramid_offset(z, x, y)], self.generation)
+                    self._pyramid_tiles[key] = cached
+                self.hits += 1
+                return cached
+            cached = self._tiles.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._tiles.move_to_end(key)
+                return cached
+            self.misses += 1
+            generation = self.generation
+            layers = list(self._layers.values())
+
+        rendered = RiskTile(key, self._render(z, x, y, layers), generation)
+        with self._lock:
+            # Drop renders that raced with a layer change
+            if generation == self.generation:
+                self._tiles[key] = rendered
+                if len(self._tiles) > self.cache_size:
+                    self._tiles.popitem(last=False)
+        return rendered
+
+    def _render(self, z: int, x: int, y: int, layers: List) -> np.ndarray:
+        size = self.tile_size
+        fractions = (np.arange(size) + 0.5) / size
+        # Rows ascend in latitude for rasterization, then flip so north is first
+        lat_centers = np.array([tile_y_to_lat(y + f, z) for f in fractions[::-1]])
+        n = 1 << z
+        lng_centers = (x + fractions) / n * 360.0 - 180.0
+
+        min_lat, min_lng, max_lat, max_lng = tile_bbox(z, x, y)
+        centre_lat, centre_lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+        reach = max(haversine_km(centre_lat, centre_lng, lat, lng)
+                    for lat in (min_lat, max_lat) for lng in (min_lng, max_lng))
+
+        risk = rasterize_risk(lat_centers, lng_centers, layers, centre_lat, centre_lng, reach)
+        return risk[::-1].astype(np.float16)
+
+    def precompute(self):
+        """Render every tile down to precompute_zoom"""
+        if self.shared is not None:
+            self._map_pyramid()
+            return
+        for z in range(self.precompute_zoom + 1):
+            for x in range(1 << z):
+                for y in range(1 << z):
+                    self.tile(z, x, y)
+
+    def _map_pyramid(self):
+        with self._lock:
+            key = self.content_key
+            layers = list(self._layers.values())
+
+        def build() -> np.ndarray:
+            size = self.tile_size
+            pyramid = np.zeros((self.pyramid_tile_count, size, size), dtype=np.float16)
+            for z in range(self.precompute_zoom + 1):
+                for x in range(1 << z):
+                    for y in range(1 << z):
+                        pyramid[self._pyramid_offset(z, x, y)] = self._render(z, x, y, layers)
+            return pyramid
+
+        pyramid = self.shared.get_or_build("risk-pyramid", key, build)
+        with self._lock:
+            # A layer change while building leaves the old pyramid unused
+            if key == self.content_key:
+                self._pyramid = (key, pyramid)
+                self._pyramid_tiles = {}
+                for cached in [k for k in self._tiles if k[0] <= self.precompute_zoom]:
+                    del self._tiles[cached]
+
+    def risk_at(self, lat: float, lng: float, zoom: Optional[int] = None) -> float:
+        """Risk at a point, read straight from the tile raster"""
+        zoom = self.lookup_zoom if zoom is None else zoom
+        z, x, y = tile_for(lat, lng, zoom)
+        tile = self.tile(z, x, y)
+
+        n = 1 << zoom
+        size = self.tile_size
+        px = int(((lng + 180.0) / 360.0 * n - x) * size)
+        clamped = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+        fy = (1.0 - math.asinh(math.tan(math.radians(clamped))) / math.pi) / 2.0 * n
+        py = int((fy - y) * size)
+        return float(tile.values[min(size - 1, max(0, py)), min(size - 1, max(0, px))])
+
+    def lookup(self, points: Iterable[Dict[str, float]], zoom: Optional[int] = None) -> List[float]:
+        return [self.risk_at(p["lat"], p["lng"], zoom) for p in points]
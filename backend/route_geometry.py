@@ -0,0 +1,179 @@
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+
+from geo import EARTH_RADIUS_KM, KM_PER_DEGREE, haversine_km
+
+Point = Dict[str, float]
+
+
+def _haversine(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    lat1, lng1, lat2, lng2 = (np.radians(a) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _wrap(delta_lng: np.ndarray) -> np.ndarray:
+    return (delta_lng + 180.0) % 360.0 - 180.0
+
+
+class DensifiedRoute:
+    """A polyline cut into sub-segments no longer than spacing_km.
+
+    Arrays are indexed by sub-segment; `segment` maps each one back to the
+    route segment (pair of consecutive input points) it belongs to.
+    """
+
+    def __init__(self, points: List[Point], spacing_km: float = 1.0):
+        lats = np.array([p["lat"] for p in points], dtype=np.float64)
+        lngs = np.array([p["lng"] for p in points], dtype=np.float64)
+        self.points = points
+        self.segment_count = max(0, len(points) - 1)
+
+        d_lat = lats[1:] - lats[:-1]
+        d_lng = _wrap(lngs[1:] - lngs[:-1])
+        self.segment_km = _haversine(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+        counts = np.maximum(1, np.ceil(self.segment_km / spacing_km)).astype(np.int64)
+
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.segment = np.repeat(np.arange(self.segment_count), counts)
+        step = np.arange(len(self.segment)) - self.offsets[:-1][self.segment]
+        n = counts[self.segment]
+        t0 = step / n
+        t1 = (step + 1) / n
+
+        seg = self.segment
+        self.lat0 = lats[:-1][seg] + t0 * d_lat[seg]
+        self.lng0 = lngs[:-1][seg] + t0 * d_lng[seg]
+        self.lat1 = lats[:-1][seg] + t1 * d_lat[seg]
+        self.lng1 = lngs[:-1][seg] + t1 * d_lng[seg]
+        self.km = self.segment_km[seg] / n
+
+    def __len__(self) -> int:
+        return len(self.segment)
+
+    def sub_segments(self, segments: List[int]) -> np.ndarray:
+        """Sub-segment indices belonging to the given route segments"""
+        return np.concatenate([np.arange(self.offsets[s], self.offsets[s + 1]) for s in segments])
+
+    def circle_overlap_km(self, lat: float, lng: float, radius_km: float, idx: np.ndarray) -> np.ndarray:
+        """Kilometers of each selected sub-segment inside a circle.
+
+        Each sub-segment is projected onto a local plane centred on the
+        circle and intersected analytically, so a segment that merely
+        clips the edge gets exactly the chord it travels inside.
+        """
+        mid_lat = (self.lat0[idx] + self.lat1[idx]) / 2
+        cos_lat = np.cos(np.radians((mid_lat + lat) / 2))
+        kx = KM_PER_DEGREE * np.maximum(cos_lat, 1e-6)
+        ax = _wrap(self.lng0[idx] - lng) * kx
+        ay = (self.lat0[idx] - lat) * KM_PER_DEGREE
+        dx = _wrap(self.lng1[idx] - lng) * kx - ax
+        dy = (self.lat1[idx] - lat) * KM_PER_DEGREE - ay
+
+        a = dx * dx + dy * dy
+        b = 2 * (ax * dx + ay * dy)
+        c = ax * ax + ay * ay - radius_km * radius_km
+        disc = b * b - 4 * a * c
+
+        inside = np.zeros(len(a))
+        hit = (disc > 0) & (a > 0)
+        root = np.sqrt(disc[hit])
+        t_in = np.clip((-b[hit] - root) / (2 * a[hit]), 0.0, 1.0)
+        t_out = np.clip((-b[hit] + root) / (2 * a[hit]), 0.0, 1.0)
+        inside[hit] = (t_out - t_in) * self.km[idx][hit]
+        return inside
+
+    def shape_overlap_km(self, shape, idx: np.ndarray) -> np.ndarray:
+        """Kilometers of each selected sub-segment inside a polygon, by midpoint test"""
+        mid_lat = (self.lat0[idx] + self.lat1[idx]) / 2
+        mid_lng = _wrap((self.lng0[idx] + self.lng1[idx]) / 2)
+        km = self.km[idx]
+        min_lat, min_lng, max_lat, max_lng = shape.bbox
+        inside = np.zeros(len(km))
+        in_box = np.nonzero((mid_lat >= min_lat) & (mid_lat <= max_lat) & (mid_lng >= min_lng) & (mid_lng <= max_lng))[0]
+        for i in in_box:
+            if shape.contains(float(mid_lat[i]), float(mid_lng[i])):
+                inside[i] = km[i]
+        return inside
+
+
+def _candidates(route: DensifiedRoute, threat_index) -> Dict[int, List[int]]:
+    """Threat position -> route segments whose bounding circle reaches its cells"""
+    by_threat: Dict[int, List[int]] = defaultdict(list)
+    points = route.points
+    for i in range(route.segment_count):
+        a, b = points[i], points[i + 1]
+        mid_lat = (a["lat"] + b["lat"]) / 2
+        mid_lng = a["lng"] + float(_wrap(np.float64(b["lng"] - a["lng"]))) / 2
+        reach = max(haversine_km(mid_lat, mid_lng, p["lat"], p["lng"]) for p in (a, b))
+        for position in threat_index.candidate_positions(mid_lat, mid_lng, reach):
+            by_threat[position].append(i)
+    return by_threat
+
+
+def score_route(points: List[Point], threat_index, spacing_km: float = 1.0) -> Dict[str, Any]:
+    """Per-segment threat exposure of a route.
+
+    Exposure is kilometers travelled inside a threat zone times its threat
+    level, summed per route segment and per zone. Circles are intersected
+    exactly; polygons are resolved to the densification spacing.
+    """
+    if len(points) < 2:
+        return {"length_km": 0.0, "exposure": 0.0, "segments": [], "zones": []}
+
+    route = DensifiedRoute(points, spacing_km)
+    segment_zones: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    segment_exposure = np.zeros(route.segment_count)
+    zones = []
+
+    for position, segments in _candidates(route, threat_index).items():
+        threat = threat_index.threats[position]
+        shape = threat_index.shapes[position]
+
+        idx = route.sub_segments(segments)
+        if shape is not None:
+            overlap = route.shape_overlap_km(shape, idx)
+        else:
+            overlap = route.circle_overlap_km(threat.latitude, threat.longitude, threat.radius_km, idx)
+
+        per_segment = np.bincount(route.segment[idx], weights=overlap, minlength=route.segment_count)
+        km_inside = float(per_segment.sum())
+        if km_inside <= 0:
+            continue
+
+        level = threat.threat_level
+        segment_exposure += per_segment * level
+        for i in np.nonzero(per_segment)[0]:
+            segment_zones[int(i)].append({
+                "threat_id": getattr(threat, "id", None),
+                "name": threat.name,
+                "threat_level": level,
+                "km_inside": round(float(per_segment[i]), 3)
+            })
+        zones.append({
+            "threat_id": getattr(threat, "id", None),
+            "name": threat.name,
+            "threat_type": threat.threat_type,
+            "threat_level": level,
+            "km_inside": round(km_inside, 3),
+            "exposure": round(km_inside * level, 3)
+        })
+
+    segments = [
+        {
+            "index": i,
+            "length_km": round(float(route.segment_km[i]), 3),
+            "exposure": round(float(segment_exposure[i]), 3),
+            "zones": segment_zones.get(i, [])
+        }
+        for i in range(route.segment_count)
+    ]
+    zones.sort(key=lambda z: z["exposure"], reverse=True)
+    return {
+        "length_km": round(float(route.segment_km.sum()), 3),
+        "exposure": round(float(segment_exposure.sum()), 3),
+        "segments": segments,
+        "zones": zones
+    }
@@ -0,0 +1,203 @@
+import heapq
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from geo import KM_PER_DEGREE
+from risk_raster import rasterize_risk
+
+Point = Dict[str, float]
+
+# 8-connected grid moves: (d_row, d_col)
+MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+class CostSurface:
+    """Threat-weighted cost raster over one region.
+
+    Each cell holds a travel-cost multiplier >= 1: 1 in open country plus a
+    penalty for every threat zone covering the cell, scaled by threat level.
+    """
+
+    def __init__(self, bbox: Tuple[float, float, float, float], cell_km: float, threat_index, risk_weight: float):
+        self.bbox = bbox
+        min_lat, min_lng, max_lat, max_lng = bbox
+        mid_lat = (min_lat + max_lat) / 2
+        self.km_y = KM_PER_DEGREE
+        self.km_x = KM_PER_DEGREE * max(math.cos(math.radians(mid_lat)), 0.01)
+
+        self.rows = max(2, int(math.ceil((max_lat - min_lat) * self.km_y / cell_km)))
+        self.cols = max(2, int(math.ceil((max_lng - min_lng) * self.km_x / cell_km)))
+        self.dlat = (max_lat - min_lat) / self.rows
+        self.dlng = (max_lng - min_lng) / self.cols
+        self.lat_centers = min_lat + (np.arange(self.rows) + 0.5) * self.dlat
+        self.lng_centers = min_lng + (np.arange(self.cols) + 0.5) * self.dlng
+
+        half_diagonal = math.hypot((max_lat - min_lat) * self.km_y, (max_lng - min_lng) * self.km_x) / 2
+        self.risk = rasterize_risk(self.lat_centers, self.lng_centers, [threat_index],
+                                   mid_lat, (min_lng + max_lng) / 2, half_diagonal)
+        self.cost = 1.0 + risk_weight * self.risk
+        self.version = threat_index.version
+
+    def cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        min_lat, min_lng, _, _ = self.bbox
+        row = min(self.rows - 1, max(0, int((lat - min_lat) / self.dlat)))
+        col = min(self.cols - 1, max(0, int((lng - min_lng) / self.dlng)))
+        return row, col
+
+    def center_of(self, row: int, col: int) -> Point:
+        return {"lat": float(self.lat_centers[row]), "lng": float(self.lng_centers[col])}
+
+    def route_cost(self, points: List[Point], samples_per_km: float = 1.0) -> Dict[str, float]:
+        """Length and risk-weighted cost of a polyline sampled over this surface"""
+        length_km = 0.0
+        exposure = 0.0
+        for a, b in zip(points, points[1:]):
+            dy = (b["lat"] - a["lat"]) * self.km_y
+            dx = (b["lng"] - a["lng"]) * self.km_x
+            segment_km = math.hypot(dx, dy)
+            steps = max(1, int(segment_km * samples_per_km))
+            for i in range(steps):
+                t = (i + 0.5) / steps
+                row, col = self.cell_of(a["lat"] + t * (b["lat"] - a["lat"]), a["lng"] + t * (b["lng"] - a["lng"]))
+                exposure += float(self.risk[row, col]) * segment_km / steps
+            length_km += segment_km
+        return {"length_km": length_km, "risk_exposure": exposure}
+
+    def astar(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Cheapest 8-connected path between two cells"""
+        rows, cols = self.rows, self.cols
+        cost = self.cost.ravel().tolist()
+        step_km = [math.hypot(dr * self.dlat * self.km_y, dc * self.dlng * self.km_x) for dr, dc in MOVES]
+        ky, kx = self.dlat * self.km_y, self.dlng * self.km_x
+
+        start_idx = start[0] * cols + start[1]
+        goal_idx = goal[0] * cols + goal[1]
+        goal_r, goal_c = goal
+
+        best = {start_idx: 0.0}
+        came_from = {}
+        heap = [(0.0, 0.0, start_idx)]
+        closed = set()
+
+        while heap:
+            _, g, idx = heapq.heappop(heap)
+            if idx == goal_idx:
+                break
+            if idx in closed:
+                continue
+            closed.add(idx)
+
+            r, c = divmod(idx, cols)
+            here = cost[idx]
+            for (dr, dc), length in zip(MOVES, step_km):
+                nr, nc = r + dr, c + dc
+                if nr < 0 or nr >= rows or nc < 0 or nc >= cols:
+                    continue
+                n_idx = nr * cols + nc
+                if n_idx in closed:
+                    continue
+                ng = g + length * (here + cost[n_idx]) * 0.5
+                if ng < best.get(n_idx, math.inf):
+                    best[n_idx] = ng
+                    came_from[n_idx] = idx
+                    h = math.hypot((goal_r - nr) * ky, (goal_c - nc) * kx)
+                    heapq.heappush(heap, (ng + h, ng, n_idx))
+
+        if goal_idx not in best:
+            return []
+        path = [goal_idx]
+        while path[-1] != start_idx:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return [divmod(i, cols) for i in path]
+
+
+def simplify_cells(cells: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Keep only the cells where the path changes direction"""
+    if len(cells) <= 2:
+        return cells
+    kept = [cells[0]]
+    for prev, here, nxt in zip(cells, cells[1:], cells[2:]):
+        if (here[0] - prev[0], here[1] - prev[1]) != (nxt[0] - here[0], nxt[1] - here[1]):
+            kept.append(here)
+    kept.append(cells[-1])
+    return kept
+
+
+class RoutePlanner:
+    """Safest-route search over cached threat-cost surfaces.
+
+    Regions are snapped outward to a fixed degree grid so nearby requests
+    share a surface; surfaces are cached per (region, threat index build).
+    Routes crossing the antimeridian are not supported.
+    """
+
+    def __init__(self, max_cells: int = 120, min_cell_km: float = 0.5, risk_weight: float = 20.0,
+                 snap_deg: float = 0.25, cache_size: int = 32):
+        self.max_cells = max_cells
+        self.min_cell_km = min_cell_km
+        self.risk_weight = risk_weight
+        self.snap_deg = snap_deg
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Any, CostSurface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def region_for(self, points: List[Point]) -> Tuple[float, float, float, float]:
+        lats = [p["lat"] for p in points]
+        lngs = [p["lng"] for p in points]
+        span = max(max(lats) - min(lats), max(lngs) - min(lngs))
+        pad = max(0.5, span * 0.3)
+        snap = self.snap_deg
+        return (
+            max(-89.0, math.floor((min(lats) - pad) / snap) * snap),
+            max(-180.0, math.floor((min(lngs) - pad) / snap) * snap),
+            min(89.0, math.ceil((max(lats) + pad) / snap) * snap),
+            min(180.0, math.ceil((max(lngs) + pad) / snap) * snap),
+        )
+
+    def surface(self, bbox: Tuple[float, float, float, float], threat_index) -> CostSurface:
+        key = (bbox, threat_index.build_id)
+        with self._lock:
+            surface = self._cache.get(key)
+            if surface is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return surface
+
+        self.misses += 1
+        min_lat, min_lng, max_lat, max_lng = bbox
+        mid_lat = (min_lat + max_lat) / 2
+        extent_km = max((max_lat - min_lat) * KM_PER_DEGREE,
+                        (max_lng - min_lng) * KM_PER_DEGREE * max(math.cos(math.radians(mid_lat)), 0.01))
+        cell_km = max(self.min_cell_km, extent_km / self.max_cells)
+        surface = CostSurface(bbox, cell_km, threat_index, self.risk_weight)
+
+        with self._lock:
+            self._cache[key] = surface
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return surface
+
+    def plan(self, stops: List[Point], threat_index) -> Optional[Dict[str, Any]]:
+        """Safest route through the given stops; None if no path was found"""
+        surface = self.surface(self.region_for(stops), threat_index)
+        route: List[Point] = [stops[0]]
+        for a, b in zip(stops, stops[1:]):
+            cells = surface.astar(surface.cell_of(a["lat"], a["lng"]), surface.cell_of(b["lat"], b["lng"]))
+            if not cells:
+                return None
+            for row, col in simplify_cells(cells)[1:-1]:
+                route.append(surface.center_of(row, col))
+            route.append(b)
+
+        return {
+            "route": route,
+            "metrics": surface.route_cost(route),
+            "surface": surface
+        }
@@ -1,41 +1,205 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from datetime import datetime, timedelta, timezone
 import asyncio
 import json
 import hashlib
-import qrcode
+import importlib
 import base64
 from io import BytesIO
-import requests
 import math
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from geo import haversine_km
+from threat_registry import ThreatIndex, ThreatRegistry
+from geofence import Fence, GeofenceEngine, PolygonFence
+from geometry import prepare_geometry
+from events import EventBus
+from live_positions import LivePositionStore
+from anomaly import AnomalyDetector
+from inactivity import InactivitySweeper
+from route_geometry import score_route
+from route_planner import RoutePlanner
+from risk_tiles import RiskTileStore
+from shared_arrays import SharedArrayStore
+from shared_cache import create_cache
+from db_handle import DatabaseHandle
+from job_executor import JOB_BUCKETS, JobExecutor
+from job_queue import DurableJobQueue
+from idempotency import IdempotencyStore
+from location_retention import LocationRetention
+from trip_lifecycle import TripLifecycleSweeper, trip_end_at
+from id_ledger import IDLedger, leaf_hash
+from advisory_cache import AdvisoryCache
+from http_cache import ConditionalGetMiddleware, ContentVersions, not_modified, versioned_etag
+from admission import AdmissionController
+from metrics import REGISTRY, RequestMetricsMiddleware
+from profiling import LoopBlockDetector, Profiler, ProfilingMiddleware, stage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection: pool sizing, wire compression and read/write concerns.
+# The client is created by the lifespan handler, so importing the app opens no connections
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+MONGO_COMPRESSORS = [c.strip() for c in os.environ.get('MONGO_COMPRESSORS', '').split(',') if c.strip()]
+MONGO_WRITE_CONCERN = os.environ.get('MONGO_WRITE_CONCERN', '')  # e.g. 1 or majority
+MONGO_JOURNAL = os.environ.get('MONGO_JOURNAL', '')
+MONGO_READ_CONCERN = os.environ.get('MONGO_READ_CONCERN', '')  # e.g. local or majority
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+db = DatabaseHandle(os.environ['DB_NAME'])
 
-# Create the main app without a prefix
-app = FastAPI()
+# Multi-worker coordination: cache/dedup backend (memory, mongo or redis) and the
+# directory for memory-mapped read-only arrays shared by workers on one host
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+SHARED_DATA_DIR = os.environ.get('SHARED_DATA_DIR', os.path.join(tempfile.gettempdir(), 'tourist-safety-shared'))
+
+# Created at startup: the mongo backend needs the connected database
+shared_cache = None
+shared_arrays = SharedArrayStore(SHARED_DATA_DIR) if SHARED_DATA_DIR else None
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Metrics exposed at /metrics (Mongo driver metrics are registered by the database layer)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"]
+)
+THREAT_LOOKUP_LATENCY = REGISTRY.histogram("threat_lookup_duration_seconds", "Time spent in get_nearby_threats")
+REVERSE_GEOCODE_LATENCY = REGISTRY.histogram(
+    "reverse_geocode_duration_seconds", "Time spent in reverse_geocode", ["outcome"]
+)
+LLM_LATENCY = REGISTRY.histogram("llm_call_duration_seconds", "LLM call latency", ["purpose", "outcome"])
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+
+# Opt-in request profiling: sampled fraction, debug header token (any value when empty),
+# stack sampling interval for profiled requests (0 disables) and event loop block threshold (0 disables)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DEBUG_TOKEN = os.environ.get('PROFILE_DEBUG_TOKEN', '')
+PROFILE_STACK_INTERVAL_MS = float(os.environ.get('PROFILE_STACK_INTERVAL_MS', '5'))
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get('LOOP_BLOCK_THRESHOLD_MS', '0'))
+
+profiler = Profiler(
+    sample_rate=PROFILE_SAMPLE_RATE,
+    debug_token=PROFILE_DEBUG_TOKEN,
+    stack_interval_ms=PROFILE_STACK_INTERVAL_MS
+)
+loop_block_detector = LoopBlockDetector(LOOP_BLOCK_THRESHOLD_MS) if LOOP_BLOCK_THRESHOLD_MS > 0 else None
+
 # AI Integration Setup
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
 
+# Threat registry refresh interval (seconds) for every worker process
+THREAT_REGISTRY_POLL_SECONDS = float(os.environ.get('THREAT_REGISTRY_POLL_SECONDS', '5'))
+
+# Geofencing: seconds inside a fence before a dwell event, and minimum level that raises an alert
+GEOFENCE_DWELL_SECONDS = float(os.environ.get('GEOFENCE_DWELL_SECONDS', '600'))
+GEOFENCE_ALERT_LEVEL = int(os.environ.get('GEOFENCE_ALERT_LEVEL', '7'))
+# Advisories are written straight to db.advisories, so every worker re-reads them on this interval
+ADVISORY_FENCE_POLL_SECONDS = float(os.environ.get('ADVISORY_FENCE_POLL_SECONDS', str(THREAT_REGISTRY_POLL_SECONDS)))
+
+# Idempotency-Key replays: how long responses are kept, in-process window size, and how long
+# a claimed key waits for its request before a retry may take it over
+IDEMPOTENCY_WINDOW_SECONDS = float(os.environ.get('IDEMPOTENCY_WINDOW_SECONDS', '86400'))
+IDEMPOTENCY_MEMORY_ENTRIES = int(os.environ.get('IDEMPOTENCY_MEMORY_ENTRIES', '10000'))
+IDEMPOTENCY_PENDING_SECONDS = float(os.environ.get('IDEMPOTENCY_PENDING_SECONDS', '60'))
+
+# HTTP caching of GET responses: public threat/advisory data may be reused for HTTP_PUBLIC_MAX_AGE
+# seconds, everything else is revalidated by ETag; bodies from HTTP_COMPRESS_MIN_BYTES are compressed
+HTTP_PUBLIC_MAX_AGE = int(os.environ.get('HTTP_PUBLIC_MAX_AGE', '30'))
+HTTP_COMPRESS_MIN_BYTES = int(os.environ.get('HTTP_COMPRESS_MIN_BYTES', '1024'))
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+PUBLIC_CACHE_CONTROL = f"public, max-age={HTTP_PUBLIC_MAX_AGE}"
+
+# Admin event stream: per-console queue bound and keepalive interval
+EVENT_STREAM_QUEUE_SIZE = int(os.environ.get('EVENT_STREAM_QUEUE_SIZE', '256'))
+EVENT_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_STREAM_HEARTBEAT_SECONDS', '15'))
+
+# Event bus for real-time admin console updates
+event_bus = EventBus(max_queue=EVENT_STREAM_QUEUE_SIZE)
+
+# Live position map feed: storage tile zoom and fastest allowed frame interval
+LIVE_POSITION_TILE_ZOOM = int(os.environ.get('LIVE_POSITION_TILE_ZOOM', '14'))
+LIVE_POSITION_MIN_INTERVAL = float(os.environ.get('LIVE_POSITION_MIN_INTERVAL', '0.25'))
+
+live_positions = LivePositionStore(zoom=LIVE_POSITION_TILE_ZOOM)
+
+# Movement anomaly thresholds
+ANOMALY_MAX_SPEED_KMH = float(os.environ.get('ANOMALY_MAX_SPEED_KMH', '900'))
+ANOMALY_STILL_SECONDS = float(os.environ.get('ANOMALY_STILL_SECONDS', '7200'))
+ANOMALY_ROUTE_DEVIATION_KM = float(os.environ.get('ANOMALY_ROUTE_DEVIATION_KM', '100'))
+# Fixes of one tourist can reach several workers (or be retried), each detecting the same anomaly;
+# one alert per tourist, kind and window is raised
+ANOMALY_ALERT_WINDOW_SECONDS = float(os.environ.get('ANOMALY_ALERT_WINDOW_SECONDS', '600'))
+
+anomaly_detector = AnomalyDetector(
+    max_speed_kmh=ANOMALY_MAX_SPEED_KMH,
+    still_seconds=ANOMALY_STILL_SECONDS,
+    route_deviation_km=ANOMALY_ROUTE_DEVIATION_KM
+)
+
+# Missed check-ins: silence before an alert, and sweeper resolution
+INACTIVITY_THRESHOLD_SECONDS = float(os.environ.get('INACTIVITY_THRESHOLD_SECONDS', '3600'))
+INACTIVITY_SWEEP_SECONDS = float(os.environ.get('INACTIVITY_SWEEP_SECONDS', '30'))
+
+# Trip lifecycle: how often tourists whose trip_end_date passed are deactivated and evicted
+TRIP_SWEEP_SECONDS = float(os.environ.get('TRIP_SWEEP_SECONDS', '60'))
+
+# Digital ID ledger: registrations are sealed into a Merkle batch every LEDGER_BATCH_SECONDS
+LEDGER_BATCH_SECONDS = float(os.environ.get('LEDGER_BATCH_SECONDS', '5'))
+LEDGER_MAX_BATCH = int(os.environ.get('LEDGER_MAX_BATCH', '4096'))
+LEDGER_LEASE_SECONDS = float(os.environ.get('LEDGER_LEASE_SECONDS', '60'))
+
+# location_history retention: raw fixes expire after LOCATION_RAW_RETENTION_SECONDS; hours older than
+# LOCATION_COMPACT_AFTER_SECONDS are first simplified into location_tracks (and gzipped to
+# LOCATION_ARCHIVE_DIR when set)
+LOCATION_RAW_RETENTION_SECONDS = float(os.environ.get('LOCATION_RAW_RETENTION_SECONDS', str(7 * 86400)))
+LOCATION_COMPACT_AFTER_SECONDS = float(os.environ.get('LOCATION_COMPACT_AFTER_SECONDS', '3600'))
+LOCATION_TRACK_TOLERANCE_M = float(os.environ.get('LOCATION_TRACK_TOLERANCE_M', '25'))
+LOCATION_RETENTION_INTERVAL_SECONDS = float(os.environ.get('LOCATION_RETENTION_INTERVAL_SECONDS', '300'))
+LOCATION_ARCHIVE_DIR = os.environ.get('LOCATION_ARCHIVE_DIR', '')
+
+# Safest-route planner: grid resolution and cost-surface cache size
+ROUTE_PLANNER_MAX_CELLS = int(os.environ.get('ROUTE_PLANNER_MAX_CELLS', '120'))
+ROUTE_COST_CACHE_SIZE = int(os.environ.get('ROUTE_COST_CACHE_SIZE', '32'))
+
+route_planner = RoutePlanner(max_cells=ROUTE_PLANNER_MAX_CELLS, cache_size=ROUTE_COST_CACHE_SIZE)
+
+# Route risk scoring: segments are cut into pieces no longer than this before scoring
+ROUTE_DENSIFY_KM = float(os.environ.get('ROUTE_DENSIFY_KM', '1.0'))
+# Zones named in the route analysis prompt (highest exposure first); the rest are only counted
+ROUTE_PROMPT_MAX_ZONES = int(os.environ.get('ROUTE_PROMPT_MAX_ZONES', '5'))
+
+# Risk heatmap tiles: pixels per side, eagerly rendered zooms, bulk lookup zoom and browser cache lifetime
+RISK_TILE_SIZE = int(os.environ.get('RISK_TILE_SIZE', '128'))
+RISK_TILE_PRECOMPUTE_ZOOM = int(os.environ.get('RISK_TILE_PRECOMPUTE_ZOOM', '3'))
+RISK_TILE_LOOKUP_ZOOM = int(os.environ.get('RISK_TILE_LOOKUP_ZOOM', '8'))
+RISK_TILE_MAX_AGE = int(os.environ.get('RISK_TILE_MAX_AGE', '300'))
+RISK_TILE_CACHE_SIZE = int(os.environ.get('RISK_TILE_CACHE_SIZE', '4096'))
+
+risk_tiles = RiskTileStore(
+    tile_size=RISK_TILE_SIZE,
+    precompute_zoom=RISK_TILE_PRECOMPUTE_ZOOM,
+    lookup_zoom=RISK_TILE_LOOKUP_ZOOM,
+    cache_size=RISK_TILE_CACHE_SIZE,
+    shared=shared_arrays
+)
+
 # Global threat database with coordinates (lat, lng, radius in km, threat details)
 GLOBAL_THREAT_DATABASE = {
     "natural_disasters": [
@@ -66,8 +230,17 @@ GLOBAL_THREAT_DATABASE = {
         {"name": "High Altitude Risk - Himalayas", "lat": 28.0139, "lng": 84.0917, "radius": 300, "threat_level": 6, "type": "altitude"}
     ],
     "restricted_areas": [
-        {"name": "Military Zone - DMZ Korea", "lat": 38.2400, "lng": 127.0600, "radius": 20, "threat_level": 10, "type": "military"},
-        {"name": "Radiation Zone - Chernobyl", "lat": 51.2763, "lng": 30.2218, "radius": 30, "threat_level": 9, "type": "radiation"},
+        {"name": "Military Zone - DMZ Korea", "lat": 38.2400, "lng": 127.0600, "radius": 20, "threat_level": 10, "type": "military",
+         "geometry": {"type": "Polygon", "coordinates": [[
+             [126.10, 37.78], [126.68, 37.98], [127.00, 38.33], [127.50, 38.35], [128.00, 38.48], [128.36, 38.64],
+             [128.36, 38.58], [128.00, 38.42], [127.50, 38.29], [127.00, 38.27], [126.68, 37.92], [126.10, 37.72],
+             [126.10, 37.78]
+         ]]}},
+        {"name": "Radiation Zone - Chernobyl", "lat": 51.2763, "lng": 30.2218, "radius": 30, "threat_level": 9, "type": "radiation",
+         "geometry": {"type": "Polygon", "coordinates": [[
+             [29.60, 51.10], [30.00, 50.95], [30.55, 51.05], [30.60, 51.30], [30.40, 51.55], [30.00, 51.55],
+             [29.65, 51.40], [29.60, 51.10]
+         ]]}},
         {"name": "Border Restricted - Pakistan-Afghanistan", "lat": 33.5138, "lng": 69.1793, "radius": 50, "threat_level": 9, "type": "border"}
     ]
 }
@@ -112,6 +285,7 @@ class LocationThreat(BaseModel):
     threat_level: int  # 1-10 scale
     radius_km: float
     description: str
+    geometry: Optional[Dict[str, Any]] = None  # GeoJSON Polygon/MultiPolygon, [lng, lat] order
     is_active: bool = Field(default=True)
     source: str = Field(default="global_database")
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -126,6 +300,7 @@ class DetailedAdvisory(BaseModel):
     severity: str  # "info", "caution", "warning", "danger", "critical"
     source: str  # "government", "embassy", "local_authority", "crowdsourced"
     affects_radius_km: float = Field(default=50.0)
+    geometry: Optional[Dict[str, Any]] = None  # GeoJSON Polygon/MultiPolygon, [lng, lat] order
     is_active: bool = Field(default=True)
     expires_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -182,26 +357,142 @@ class LocationUpdate(BaseModel):
 # Utility Functions
 def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """Calculate distance between two coordinates in kilometers"""
-    R = 6371  # Earth's radius in km
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lng = math.radians(lng2 - lng1)
+    return haversine_km(lat1, lng1, lat2, lng2)
+
+def global_threat_records() -> List[Dict[str, Any]]:
+    """Flatten the bundled threat database into LocationThreat fields"""
+    records = []
+    for category, threats in GLOBAL_THREAT_DATABASE.items():
+        for threat in threats:
+            records.append({
+                "name": threat["name"],
+                "latitude": threat["lat"],
+                "longitude": threat["lng"],
+                "threat_type": threat["type"],
+                "threat_level": threat["threat_level"],
+                "radius_km": threat["radius"],
+                "description": f"{category.replace('_', ' ').title()} - {threat['name']}",
+                "geometry": threat.get("geometry"),
+                "source": "global_database"
+            })
+    return records
+
+# Threat registry: serves db.global_threats, falling back to the bundled data
+threat_registry = ThreatRegistry(
+    db,
+    build_record=lambda doc: LocationThreat(**doc),
+    seed_records=global_threat_records,
+    poll_interval=THREAT_REGISTRY_POLL_SECONDS
+)
+
+# Threat types that mark a restricted area rather than a general threat zone
+RESTRICTED_THREAT_TYPES = {"military", "radiation", "border"}
+
+# Advisory severity mapped onto the 1-10 threat scale
+ADVISORY_SEVERITY_LEVELS = {"info": 2, "caution": 4, "warning": 6, "danger": 8, "critical": 10}
+
+def threat_fences(index) -> List[Fence]:
+    """Build geofences from the threat index, reusing its prepared polygons"""
+    fences = []
+    for threat, shape in zip(index.threats, index.shapes):
+        fence_args = dict(
+            fence_id=threat.id,
+            name=threat.name,
+            kind="restricted" if threat.threat_type in RESTRICTED_THREAT_TYPES else "threat",
+            level=threat.threat_level,
+            lat=threat.latitude,
+            lng=threat.longitude,
+            radius_km=threat.radius_km
+        )
+        fences.append(PolygonFence(shape=shape, **fence_args) if shape else Fence(**fence_args))
+    return fences
+
+geofence_engine = GeofenceEngine(dwell_seconds=GEOFENCE_DWELL_SECONDS)
+geofence_engine.set_fences("threats", threat_fences(threat_registry.index))
+threat_registry.add_listener(lambda index: geofence_engine.set_fences("threats", threat_fences(index)))
+
+def refresh_risk_layer(name: str, index: ThreatIndex):
+    """Swap a risk tile layer and re-render the eager zoom levels in the background"""
+    risk_tiles.set_layer(name, index)
+    try:
+        asyncio.get_running_loop().run_in_executor(None, risk_tiles.precompute)
+    except RuntimeError:
+        # No loop yet (import time); startup renders the eager tiles
+        pass
+
+refresh_risk_layer("threats", threat_registry.index)
+threat_registry.add_listener(lambda index: refresh_risk_layer("threats", index))
+
+advisory_fence_fingerprint: Optional[str] = None
+advisory_fence_task: Optional[asyncio.Task] = None
+
+async def refresh_advisory_fences() -> bool:
+    """Load active advisories with coordinates as geofences; returns True if they changed"""
+    global advisory_fence_fingerprint
+    advisories = await db.advisories.find({
+        "is_active": True,
+        "coordinates": {"$exists": True}
+    }, {"_id": 0}).sort("id", 1).to_list(None)
     
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    fingerprint = hashlib.sha1(json.dumps(advisories, sort_keys=True, default=str).encode()).hexdigest()
+    if fingerprint == advisory_fence_fingerprint:
+        return False
     
-    return R * c
+    fences = []
+    advisory_zones = []
+    for adv in advisories:
+        if not adv.get("coordinates"):
+            continue
+        fence_args = dict(
+            fence_id=adv["id"],
+            name=adv.get("title", "Travel Advisory"),
+            kind="advisory",
+            level=ADVISORY_SEVERITY_LEVELS.get(adv.get("severity"), 2),
+            lat=adv["coordinates"]["lat"],
+            lng=adv["coordinates"]["lng"],
+            radius_km=adv.get("affects_radius_km", 50.0)
+        )
+        try:
+            shape = prepare_geometry(adv.get("geometry"))
+        except (ValueError, TypeError, IndexError) as e:
+            logging.error(f"Invalid advisory geometry {adv['id']}: {str(e)}")
+            shape = None
+        fences.append(PolygonFence(shape=shape, **fence_args) if shape else Fence(**fence_args))
+        advisory_zones.append(LocationThreat(
+            id=adv["id"],
+            name=fence_args["name"],
+            latitude=fence_args["lat"],
+            longitude=fence_args["lng"],
+            threat_type=adv.get("advisory_type", "general"),
+            threat_level=fence_args["level"],
+            radius_km=fence_args["radius_km"],
+            description=adv.get("content", ""),
+            geometry=adv.get("geometry") if shape else None,
+            source="advisory"
+        ))
+    geofence_engine.set_fences("advisories", fences)
+    refresh_risk_layer("advisories", ThreatIndex(advisory_zones))
+    advisory_fence_fingerprint = fingerprint
+    return True
+
+async def poll_advisory_fences():
+    """Pick up advisories created, changed or deactivated since the last refresh"""
+    while True:
+        await asyncio.sleep(ADVISORY_FENCE_POLL_SECONDS)
+        try:
+            if await refresh_advisory_fences():
+                logging.info("Advisory geofences reloaded")
+        except Exception as e:
+            logging.error(f"Advisory geofence refresh error: {str(e)}")
 
-def generate_blockchain_hash(tourist_data: dict) -> str:
-    """Generate blockchain-style hash for digital ID"""
-    data_string = f"{tourist_data['tourist_name']}{tourist_data['phone_number']}{tourist_data['email']}{datetime.now().isoformat()}"
-    return hashlib.sha256(data_string.encode()).hexdigest()
+def generate_blockchain_hash(id_payload: dict) -> str:
+    """Ledger leaf hash of the digital ID fields carried in its QR code"""
+    return leaf_hash(id_payload)
 
 def generate_qr_code(data: dict) -> str:
     """Generate QR code for digital ID"""
     try:
+        import qrcode
         qr = qrcode.QRCode(version=1, box_size=10, border=5)
         qr.add_data(json.dumps(data))
         qr.make(fit=True)
@@ -215,59 +506,205 @@ def generate_qr_code(data: dict) -> str:
         return None
 
 def get_nearby_threats(latitude: float, longitude: float, radius_km: float = 100) -> List[LocationThreat]:
-    """Get threats near a location from global database"""
-    nearby_threats = []
-    
-    for category, threats in GLOBAL_THREAT_DATABASE.items():
-        for threat in threats:
-            distance = calculate_distance(latitude, longitude, threat["lat"], threat["lng"])
-            if distance <= max(radius_km, threat["radius"]):
-                threat_obj = LocationThreat(
-                    name=threat["name"],
-                    latitude=threat["lat"],
-                    longitude=threat["lng"],
-                    threat_type=threat["type"],
-                    threat_level=threat["threat_level"],
-                    radius_km=threat["radius"],
-                    description=f"{category.replace('_', ' ').title()} - {threat['name']}",
-                    source="global_database"
-                )
-                nearby_threats.append(threat_obj)
-    
-    return nearby_threats
+    """Get threats near a location from the threat registry"""
+    with THREAT_LOOKUP_LATENCY.time(), stage("threat_lookup"):
+        return threat_registry.nearby(latitude, longitude, radius_km)
 
-async def get_location_name(latitude: float, longitude: float) -> str:
-    """Get location name from coordinates using Nominatim"""
+# Blocking Nominatim calls run on their own threads, never on the default executor that renders tiles and
+# plans routes. E-FIR geocodes get a small pool of their own and a short timeout, so routine geocoding
+# load cannot delay an emergency report
+GEOCODE_POOL_SIZE = int(os.environ.get('GEOCODE_POOL_SIZE', '32'))
+GEOCODE_TIMEOUT_SECONDS = float(os.environ.get('GEOCODE_TIMEOUT_SECONDS', '5'))
+EMERGENCY_GEOCODE_POOL_SIZE = int(os.environ.get('EMERGENCY_GEOCODE_POOL_SIZE', '4'))
+EMERGENCY_GEOCODE_TIMEOUT_SECONDS = float(os.environ.get('EMERGENCY_GEOCODE_TIMEOUT_SECONDS', '2'))
+
+geocode_executor = ThreadPoolExecutor(GEOCODE_POOL_SIZE, thread_name_prefix="geocode")
+emergency_geocode_executor = ThreadPoolExecutor(EMERGENCY_GEOCODE_POOL_SIZE, thread_name_prefix="emergency-geocode")
+
+# Admission control: at most ADMISSION_CAPACITY expensive requests (LLM calls, geocodes, route planning)
+# run at once per worker. Each class has its own limit and queue deadline, after which it gets a cached
+# or deterministic answer. Priority: location > advisory/route. Location and advisory requests geocode, so
+# their limits default to a split of the geocode pool and never queue inside the executor instead.
+# Emergency alerts are not admission-controlled; their E-FIR geocodes have a pool of their own
+LOCATION_CONCURRENCY = int(os.environ.get('LOCATION_CONCURRENCY', str(GEOCODE_POOL_SIZE * 3 // 4)))
+LOCATION_QUEUE_SECONDS = float(os.environ.get('LOCATION_QUEUE_SECONDS', '0.25'))
+ADVISORY_CONCURRENCY = int(os.environ.get('ADVISORY_CONCURRENCY', str(max(GEOCODE_POOL_SIZE - LOCATION_CONCURRENCY, 1))))
+ADVISORY_QUEUE_SECONDS = float(os.environ.get('ADVISORY_QUEUE_SECONDS', '1'))
+ROUTE_CONCURRENCY = int(os.environ.get('ROUTE_CONCURRENCY', '8'))
+ROUTE_QUEUE_SECONDS = float(os.environ.get('ROUTE_QUEUE_SECONDS', '2'))
+ADMISSION_CAPACITY = int(os.environ.get('ADMISSION_CAPACITY', str(GEOCODE_POOL_SIZE)))
+
+admission = AdmissionController(ADMISSION_CAPACITY)
+admission.add_class("location", 1, LOCATION_CONCURRENCY, LOCATION_QUEUE_SECONDS)
+admission.add_class("advisory", 2, ADVISORY_CONCURRENCY, ADVISORY_QUEUE_SECONDS)
+admission.add_class("route", 2, ROUTE_CONCURRENCY, ROUTE_QUEUE_SECONDS)
+
+def http_get(url: str, **kwargs):
+    """requests.get; requests is imported on first use"""
+    import requests
+    return requests.get(url, **kwargs)
+
+async def reverse_geocode(latitude: float, longitude: float, emergency: bool = False) -> Optional[str]:
+    """Place name for coordinates from Nominatim, or None when the lookup fails"""
+    started = time.perf_counter()
+    outcome = "fallback"
+    executor = emergency_geocode_executor if emergency else geocode_executor
+    timeout = EMERGENCY_GEOCODE_TIMEOUT_SECONDS if emergency else GEOCODE_TIMEOUT_SECONDS
     try:
         url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={latitude}&lon={longitude}"
-        response = requests.get(url, timeout=5)
+        with stage("reverse_geocode"):
+            # The outer deadline also covers time spent waiting for a free thread
+            response = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(executor, lambda: http_get(url, timeout=timeout)),
+                timeout
+            )
         if response.status_code == 200:
-            data = response.json()
-            return data.get('display_name', f"{latitude}, {longitude}")
+            name = response.json().get('display_name')
+            if name:
+                outcome = "ok"
+                return name
     except:
-        pass
-    return f"{latitude}, {longitude}"
+        outcome = "error"
+    finally:
+        REVERSE_GEOCODE_LATENCY.labels(outcome).observe(time.perf_counter() - started)
+    return None
+
+async def get_location_name(latitude: float, longitude: float, emergency: bool = False) -> str:
+    """Get location name from coordinates using Nominatim"""
+    return await reverse_geocode(latitude, longitude, emergency) or f"{latitude}, {longitude}"
+
+def llm_chat(session_id: str, system_message: str):
+    """Gemini chat session; the LLM SDK is imported on first use"""
+    from emergentintegrations.llm.chat import LlmChat
+    return LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=session_id,
+        system_message=system_message
+    ).with_model("gemini", "gemini-2.0-flash")
+
+async def send_llm_message(chat, text: str, purpose: str) -> str:
+    """Send one prompt to the LLM and record its latency"""
+    from emergentintegrations.llm.chat import UserMessage
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with stage(f"llm_{purpose}"):
+            response = await chat.send_message(UserMessage(text=text))
+        outcome = "ok"
+        return response
+    finally:
+        LLM_LATENCY.labels(purpose, outcome).observe(time.perf_counter() - started)
+
+# Durable background jobs (db.jobs): panic alert E-FIRs run on their own workers so they never queue
+# behind routine safety analysis. Set JOB_WORKERS_IN_API=false to leave them to worker.py processes.
+EMERGENCY_JOB_WORKERS = int(os.environ.get('EMERGENCY_JOB_WORKERS', '4'))
+ROUTINE_JOB_WORKERS = int(os.environ.get('ROUTINE_JOB_WORKERS', '4'))
+JOB_WORKERS_IN_API = os.environ.get('JOB_WORKERS_IN_API', 'true').lower() == 'true'
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', '5'))
+JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', '300'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+JOB_RETENTION_SECONDS = float(os.environ.get('JOB_RETENTION_SECONDS', str(7 * 86400)))
+EFIR_SLO_SECONDS = float(os.environ.get('EFIR_SLO_SECONDS', '30'))
+
+durable_jobs = DurableJobQueue(
+    db,
+    lease_seconds=JOB_LEASE_SECONDS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    retry_base_seconds=JOB_RETRY_BASE_SECONDS,
+    retry_max_seconds=JOB_RETRY_MAX_SECONDS,
+    poll_seconds=JOB_POLL_SECONDS,
+    retention_seconds=JOB_RETENTION_SECONDS
+)
+durable_jobs.add_lane("emergency", EMERGENCY_JOB_WORKERS)
+durable_jobs.add_lane("routine", ROUTINE_JOB_WORKERS)
+
+# In-process jobs that only update this worker's memory (bounded queue, 0 = unbounded)
+LOCAL_JOB_WORKERS = int(os.environ.get('LOCAL_JOB_WORKERS', '2'))
+LOCAL_JOB_QUEUE_SIZE = int(os.environ.get('LOCAL_JOB_QUEUE_SIZE', '1000'))
+JOB_DRAIN_SECONDS = float(os.environ.get('JOB_DRAIN_SECONDS', '10'))
+
+job_executor = JobExecutor()
+job_executor.add_lane("local", LOCAL_JOB_WORKERS, LOCAL_JOB_QUEUE_SIZE)
+
+EFIR_LATENCY = REGISTRY.histogram(
+    "efir_latency_seconds", "Time from alert creation to the stored E-FIR", buckets=JOB_BUCKETS
+)
+EFIR_SLO_BREACHES = REGISTRY.counter("efir_slo_breaches_total", "E-FIRs stored later than EFIR_SLO_SECONDS")
+
+# Planned destination coordinates are cached per place name in the shared cache
+GEOCODE_CACHE_SECONDS = float(os.environ.get('GEOCODE_CACHE_SECONDS', '86400'))
+
+async def geocode_place(name: str) -> Optional[Dict[str, float]]:
+    """Resolve a place name to coordinates using Nominatim"""
+    cached = await shared_cache.get(f"geocode:{name}")
+    if cached is not None:
+        CACHE_REQUESTS.labels("geocode", "hit").inc()
+        return cached["coordinates"]
+    CACHE_REQUESTS.labels("geocode", "miss").inc()
+    
+    def lookup():
+        response = http_get(
+            "https://nominatim.openstreetmap.org/search",
+            params={"q": name, "format": "json", "limit": 1},
+            timeout=5
+        )
+        if response.status_code == 200 and response.json():
+            result = response.json()[0]
+            return {"lat": float(result["lat"]), "lng": float(result["lon"])}
+        return None
+    
+    try:
+        coordinates = await asyncio.get_running_loop().run_in_executor(geocode_executor, lookup)
+    except Exception as e:
+        logging.error(f"Geocoding error for {name}: {str(e)}")
+        return None
+    await shared_cache.set(f"geocode:{name}", {"coordinates": coordinates}, GEOCODE_CACHE_SECONDS)
+    return coordinates
+
+async def load_route_plan(tourist_id: str):
+    """Give the anomaly detector the tourist's planned destinations"""
+    tourist = await db.tourists.find_one({"id": tourist_id}, {"_id": 0, "planned_destinations": 1})
+    if not tourist:
+        return
+    
+    plan = []
+    for name in tourist.get("planned_destinations", []):
+        coordinates = await geocode_place(name)
+        if coordinates:
+            plan.append((coordinates["lat"], coordinates["lng"]))
+    anomaly_detector.set_plan(tourist_id, plan)
 
 # Enhanced AI Functions
 async def analyze_route_safety(route_points: List[Dict[str, float]], tourist_id: str) -> Dict[str, Any]:
     """Analyze route safety using AI"""
+    # Exact per-segment exposure along the whole route, not just at the waypoints
+    with stage("route_exposure"):
+        exposure = await asyncio.get_running_loop().run_in_executor(
+            None, score_route, route_points, threat_registry.index, ROUTE_DENSIFY_KM
+        )
+    danger_zones = [zone["name"] for zone in exposure["zones"]]
+    # Prompt size stays fixed however long or densely sampled the route is
+    top_zones = [
+        {"name": z["name"], "type": z["threat_type"], "level": z["threat_level"], "km_inside": z["km_inside"], "exposure": z["exposure"]}
+        for z in exposure["zones"][:ROUTE_PROMPT_MAX_ZONES]
+    ]
+    worst_segment = max(exposure["segments"], key=lambda s: s["exposure"], default=None)
+    
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"route_analysis_{tourist_id}",
-            system_message="You are an AI safety analyst specializing in travel route safety assessment worldwide."
-        ).with_model("gemini", "gemini-2.0-flash")
-        
-        # Get threats along the route
-        route_threats = []
-        for point in route_points:
-            threats = get_nearby_threats(point["lat"], point["lng"], 25)  # 25km radius
-            route_threats.extend(threats)
+        chat = llm_chat(
+            f"route_analysis_{tourist_id}",
+            "You are an AI safety analyst specializing in travel route safety assessment worldwide."
+        )
         
         analysis_prompt = f"""
         Analyze the safety of this travel route:
-        Route points: {json.dumps(route_points, default=str)}
-        Nearby threats: {[{"name": t.name, "type": t.threat_type, "level": t.threat_level} for t in route_threats]}
+        From: {json.dumps(route_points[0], default=str)} To: {json.dumps(route_points[-1], default=str)} ({len(route_points)} points)
+        Route length: {exposure["length_km"]} km
+        Total exposure (km x threat level): {exposure["exposure"]}
+        Threat zones crossed: {len(exposure["zones"])}; highest exposure (km travelled inside, exposure = km x level): {top_zones}
+        Highest-exposure segment: {json.dumps(worst_segment and {"index": worst_segment["index"], "length_km": worst_segment["length_km"], "exposure": worst_segment["exposure"]})}
         
         Provide analysis in JSON format:
         {{
@@ -282,17 +719,16 @@ async def analyze_route_safety(route_points: List[Dict[str, float]], tourist_id:
         }}
         """
         
-        user_message = UserMessage(text=analysis_prompt)
-        response = await chat.send_message(user_message)
+        response = await send_llm_message(chat, analysis_prompt, "route_analysis")
         
         try:
-            return json.loads(response)
+            analysis = json.loads(response)
         except json.JSONDecodeError:
-            return {
+            analysis = {
                 "overall_safety_score": 70,
                 "risk_factors": ["AI analysis error"],
                 "safe_segments": [],
-                "danger_zones": [],
+                "danger_zones": danger_zones,
                 "recommendations": ["Exercise general caution"],
                 "alternative_suggestions": [],
                 "best_travel_times": ["Daylight hours"],
@@ -301,25 +737,27 @@ async def analyze_route_safety(route_points: List[Dict[str, float]], tourist_id:
             
     except Exception as e:
         logging.error(f"Route safety analysis error: {str(e)}")
-        return {
+        analysis = {
             "overall_safety_score": 60,
             "risk_factors": ["Analysis unavailable"],
             "safe_segments": [],
-            "danger_zones": [],
+            "danger_zones": danger_zones,
             "recommendations": ["Use standard safety precautions"],
             "alternative_suggestions": [],
             "best_travel_times": ["Daylight hours"],
             "emergency_contacts": ["Local authorities"]
         }
+    
+    analysis["route_exposure"] = exposure
+    return analysis
 
 async def generate_detailed_advisory(location: str, coordinates: Dict[str, float]) -> List[DetailedAdvisory]:
     """Generate detailed travel advisories using AI"""
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"advisory_{location.replace(' ', '_')}",
-            system_message="You are a travel safety advisor with access to global threat intelligence."
-        ).with_model("gemini", "gemini-2.0-flash")
+        chat = llm_chat(
+            f"advisory_{location.replace(' ', '_')}",
+            "You are a travel safety advisor with access to global threat intelligence."
+        )
         
         # Get nearby threats
         threats = get_nearby_threats(coordinates["lat"], coordinates["lng"], 100)
@@ -341,8 +779,7 @@ async def generate_detailed_advisory(location: str, coordinates: Dict[str, float
         ]
         """
         
-        user_message = UserMessage(text=advisory_prompt)
-        response = await chat.send_message(user_message)
+        response = await send_llm_message(chat, advisory_prompt, "advisory")
         
         try:
             advisories_data = json.loads(response)
@@ -379,6 +816,28 @@ async def generate_detailed_advisory(location: str, coordinates: Dict[str, float
         logging.error(f"Advisory generation error: {str(e)}")
         return []
 
+# AI advisories are shared per geohash cell (precision 5 is about 5 x 5 km) and time bucket
+ADVISORY_GEOHASH_PRECISION = int(os.environ.get('ADVISORY_GEOHASH_PRECISION', '5'))
+ADVISORY_BUCKET_SECONDS = float(os.environ.get('ADVISORY_BUCKET_SECONDS', '3600'))
+ADVISORY_CACHE_ENTRIES = int(os.environ.get('ADVISORY_CACHE_ENTRIES', '2048'))
+
+async def generate_cell_advisories(lat: float, lng: float) -> Dict[str, Any]:
+    """Advisories for the centre of an advisory cache cell"""
+    location_name = await get_location_name(lat, lng)
+    advisories = await generate_detailed_advisory(location_name, {"lat": lat, "lng": lng})
+    return {"location": location_name, "advisories": [jsonable_encoder(adv) for adv in advisories]}
+
+advisory_cache = AdvisoryCache(
+    db,
+    generate_cell_advisories,
+    precision=ADVISORY_GEOHASH_PRECISION,
+    bucket_seconds=ADVISORY_BUCKET_SECONDS,
+    memory_entries=ADVISORY_CACHE_ENTRIES,
+    claim=lambda key, ttl_seconds: shared_cache.add(key, True, ttl_seconds),
+    release=lambda key: shared_cache.delete(key),
+    admission=lambda: admission.slot("advisory")
+)
+
 # API Routes
 
 # Enhanced Tourist Registration
@@ -386,47 +845,101 @@ async def generate_detailed_advisory(location: str, coordinates: Dict[str, float
 async def register_tourist(tourist_data: TouristIDCreate):
     """Register tourist with enhanced blockchain digital ID"""
     tourist_dict = tourist_data.dict()
+    tourist_obj = TouristID(**tourist_dict)
+    
+    # QR code data; everything but the hash is covered by the ledger leaf, so a checkpoint can recompute it
+    qr_data = {
+        "id": tourist_obj.id,
+        "name": tourist_obj.tourist_name,
+        "phone": tourist_obj.phone_number,
+        "valid_until": tourist_obj.trip_end_date.isoformat(),
+        "issued_at": tourist_obj.created_at.isoformat()
+    }
     
     # Generate blockchain hash
-    blockchain_hash = generate_blockchain_hash(tourist_dict)
+    blockchain_hash = generate_blockchain_hash(qr_data)
+    qr_data["blockchain_hash"] = blockchain_hash
     
     # Generate digital signature
     digital_signature = hashlib.sha256(f"{blockchain_hash}{tourist_dict['email']}".encode()).hexdigest()
     
-    # Create QR code data
-    qr_data = {
-        "id": str(uuid.uuid4()),
-        "name": tourist_dict["tourist_name"],
-        "phone": tourist_dict["phone_number"],
-        "blockchain_hash": blockchain_hash,
-        "valid_until": tourist_data.trip_end_date.isoformat()
-    }
-    
-    qr_code = generate_qr_code(qr_data)
-    
-    tourist_obj = TouristID(
-        **tourist_dict,
-        blockchain_hash=blockchain_hash,
-        digital_signature=digital_signature,
-        qr_code=qr_code
-    )
+    tourist_obj.blockchain_hash = blockchain_hash
+    tourist_obj.digital_signature = digital_signature
+    tourist_obj.qr_code = generate_qr_code(qr_data)
     
     # Store in database
     tourist_mongo = tourist_obj.dict()
     tourist_mongo["trip_start_date"] = tourist_obj.trip_start_date.isoformat()
     tourist_mongo["trip_end_date"] = tourist_obj.trip_end_date.isoformat()
+    tourist_mongo["trip_end_at"] = trip_end_at(tourist_obj.trip_end_date)
     tourist_mongo["created_at"] = tourist_obj.created_at.isoformat()
     
     await db.tourists.insert_one(tourist_mongo)
+    await trip_lifecycle.registered()
+    await id_ledger.append(tourist_obj.id, qr_data)
+    
+    event_bus.publish("tourist.registered", {
+        "id": tourist_obj.id,
+        "tourist_name": tourist_obj.tourist_name,
+        "nationality": tourist_obj.nationality,
+        "is_active": tourist_obj.is_active,
+        "created_at": tourist_obj.created_at
+    })
     return tourist_obj
 
+class IDVerificationRequest(BaseModel):
+    payload: Dict[str, Any]
+    proof: Optional[List[List[str]]] = None
+    batch: Optional[int] = None
+
+@api_router.post("/tourist-id/verify")
+async def verify_tourist_id(verification: IDVerificationRequest):
+    """Check a scanned QR payload against the ID ledger"""
+    result = await id_ledger.verify(verification.payload, verification.proof, verification.batch)
+    try:
+        valid_until = datetime.fromisoformat(str(verification.payload.get("valid_until")))
+        result["expired"] = trip_end_at(valid_until) < datetime.now(timezone.utc)
+    except ValueError:
+        result["expired"] = None
+    return result
+
+@api_router.get("/tourist-id/{tourist_id}/proof")
+async def get_tourist_id_proof(tourist_id: str):
+    """Inclusion proof of a digital ID, for checkpoints that verify against cached roots"""
+    stored = await id_ledger.proof(tourist_id)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Digital ID not in ledger")
+    if stored.get("proof") is None:
+        raise HTTPException(status_code=409, detail="Digital ID not sealed yet")
+    sealed = await id_ledger.batch(stored["batch"])
+    if sealed is None:
+        raise HTTPException(status_code=409, detail="Digital ID not sealed yet")
+    return dict(stored, root=sealed["root"], batch_hash=sealed["hash"])
+
 # Location-based threats
 @api_router.get("/threats/nearby")
-async def get_nearby_threats_api(lat: float, lng: float, radius: float = 100):
+async def get_nearby_threats_api(request: Request, response: Response, lat: float, lng: float, radius: float = 100):
     """Get threats near a location"""
-    threats = get_nearby_threats(lat, lng, radius)
-    location_name = await get_location_name(lat, lng)
+    # The place name is a label for the coordinates, so a revalidation is answered before geocoding
+    etag = versioned_etag("threats", threat_registry.index.content_hash, lat, lng, radius)
+    cached = not_modified(request, etag, PUBLIC_CACHE_CONTROL)
+    if cached:
+        return cached
     
+    location_name = None
+    async with admission.slot("location") as admitted:
+        if admitted:
+            location_name = await reverse_geocode(lat, lng)
+    if location_name:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+    else:
+        # Not cached, so the next request gets the place name once geocoding catches up
+        location_name = f"{lat}, {lng}"
+        if not admitted:
+            response.headers["X-Load-Shed"] = "location"
+        response.headers["Cache-Control"] = PRIVATE_CACHE_CONTROL
+    threats = get_nearby_threats(lat, lng, radius)
     return {
         "location": location_name,
         "coordinates": {"lat": lat, "lng": lng},
@@ -437,26 +950,66 @@ async def get_nearby_threats_api(lat: float, lng: float, radius: float = 100):
 
 # Route comparison
 @api_router.post("/routes/compare", response_model=RouteComparison)
-async def compare_routes(route_request: RouteRequest):
+async def compare_routes(route_request: RouteRequest, response: Response):
     """Compare planned route vs safest route"""
-    # For prototype, generate a safest route with slight variations
+    async with admission.slot("route") as admitted:
+        if admitted:
+            return await plan_and_compare_routes(route_request)
+    response.headers["X-Load-Shed"] = "route"
+    return await score_planned_route(route_request)
+
+async def score_planned_route(route_request: RouteRequest) -> RouteComparison:
+    """Overload answer: the planned route scored from threat exposure, without route search or LLM calls"""
+    planned_route = [route_request.start_location] + route_request.waypoints + [route_request.end_location]
+    exposure = await asyncio.get_running_loop().run_in_executor(
+        None, score_route, planned_route, threat_registry.index, ROUTE_DENSIFY_KM
+    )
+    # Exposure is km x threat level, so exposure per km is the average level along the route (0-10)
+    average_level = exposure["exposure"] / exposure["length_km"] if exposure["length_km"] else 0.0
+    score = int(round(max(0.0, 100.0 - 10.0 * average_level)))
+    danger_zones = [zone["name"] for zone in exposure["zones"]]
+    return RouteComparison(
+        planned_route=planned_route,
+        safest_route=planned_route,
+        planned_safety_score=score,
+        safest_safety_score=score,
+        risk_analysis={
+            "planned_risks": [f"Crosses {name}" for name in danger_zones],
+            "planned_recommendations": ["Avoid the listed threat zones where possible"] if danger_zones else [],
+            "safest_recommendations": [],
+            "danger_zones": danger_zones,
+            "planned_route_metrics": {},
+            "safest_route_metrics": {},
+            "planned_route_exposure": exposure,
+            "safest_route_exposure": exposure,
+            "degraded": True
+        },
+        recommendations=["Route planning is busy; retry shortly for a safer alternative"]
+    )
+
+async def plan_and_compare_routes(route_request: RouteRequest) -> RouteComparison:
+    """Safest route search and LLM analysis of both routes"""
     planned_route = [route_request.start_location] + route_request.waypoints + [route_request.end_location]
     
-    # Generate safest route (simplified - add slight deviations to avoid high-threat areas)
-    safest_route = []
-    for i, point in enumerate(planned_route):
-        # Get nearby threats
-        threats = get_nearby_threats(point["lat"], point["lng"], 10)
-        high_threat_zones = [t for t in threats if t.threat_level >= 7]
-        
-        if high_threat_zones and i > 0 and i < len(planned_route) - 1:
-            # Deviation to avoid high threat
-            safest_route.append({
-                "lat": point["lat"] + 0.01,  # Small deviation
-                "lng": point["lng"] + 0.01
-            })
-        else:
-            safest_route.append(point)
+    # Intermediate waypoints inside high-threat zones are dropped; the planner routes around the rest
+    stops = [
+        point for i, point in enumerate(planned_route)
+        if i == 0 or i == len(planned_route) - 1
+        or not any(t.threat_level >= 7 for t in get_nearby_threats(point["lat"], point["lng"], 0))
+    ]
+    
+    # A* over the cached threat-cost surface, off the event loop
+    threat_index = threat_registry.index
+    with stage("plan_route"):
+        plan = await asyncio.get_running_loop().run_in_executor(None, route_planner.plan, stops, threat_index)
+    
+    if plan:
+        safest_route = plan["route"]
+        safest_metrics = plan["metrics"]
+        planned_metrics = plan["surface"].route_cost(planned_route)
+    else:
+        safest_route = planned_route
+        safest_metrics = planned_metrics = {}
     
     # Analyze both routes
     planned_analysis = await analyze_route_safety(planned_route, route_request.tourist_id)
@@ -471,29 +1024,37 @@ async def compare_routes(route_request: RouteRequest):
             "planned_risks": planned_analysis.get("risk_factors", []),
             "planned_recommendations": planned_analysis.get("recommendations", []),
             "safest_recommendations": safest_analysis.get("recommendations", []),
-            "danger_zones": planned_analysis.get("danger_zones", [])
+            "danger_zones": planned_analysis.get("danger_zones", []),
+            "planned_route_metrics": planned_metrics,
+            "safest_route_metrics": safest_metrics,
+            "planned_route_exposure": planned_analysis["route_exposure"],
+            "safest_route_exposure": safest_analysis["route_exposure"]
         },
         recommendations=safest_analysis.get("alternative_suggestions", [])
     )
 
 # Enhanced advisories
 @api_router.get("/advisories/detailed")
-async def get_detailed_advisories(lat: float, lng: float, radius: float = 100):
+async def get_detailed_advisories(response: Response, lat: float, lng: float, radius: float = 100):
     """Get detailed location-based advisories"""
-    location_name = await get_location_name(lat, lng)
     coordinates = {"lat": lat, "lng": lng}
     
-    # Generate AI-powered advisories
-    ai_advisories = await generate_detailed_advisory(location_name, coordinates)
+    # AI-powered advisories for the surrounding cell, generated at most once per bucket
+    cached, result = await advisory_cache.get(lat, lng)
+    if result == "shed":
+        # Overloaded: official advisories only, no LLM call or geocode
+        response.headers["X-Load-Shed"] = "advisory"
+        response.headers["Cache-Control"] = "no-store"
+    location_name = cached["location"] or f"{lat}, {lng}"
     
     # Get stored advisories from database
     stored_advisories = await db.advisories.find({
         "is_active": True,
         "coordinates": {"$exists": True}
-    }).to_list(50)
+    }, {"_id": 0}).to_list(50)
     
     # Combine and return
-    all_advisories = [adv.dict() for adv in ai_advisories]
+    all_advisories = list(cached["advisories"])
     
     for stored in stored_advisories:
         if stored.get("coordinates"):
@@ -518,12 +1079,95 @@ async def get_detailed_advisories(lat: float, lng: float, radius: float = 100):
     }
 
 # Admin Dashboard APIs
+@api_router.get("/admin/db/health")
+async def get_database_health():
+    """Database round trip, connection pool state and slowest commands"""
+    from database import command_summary, pool_summary
+    started = datetime.now(timezone.utc)
+    try:
+        await db.command("ping")
+        ping_ms = (datetime.now(timezone.utc) - started).total_seconds() * 1000
+        status = "ok"
+    except Exception as e:
+        logging.error(f"Database ping error: {str(e)}")
+        ping_ms = None
+        status = "unreachable"
+    
+    return {
+        "status": status,
+        "ping_ms": ping_ms,
+        "pool_settings": {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "wait_queue_timeout_ms": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "compressors": MONGO_COMPRESSORS
+        },
+        "pools": pool_summary(),
+        "slowest_commands": command_summary()
+    }
+
+@api_router.get("/admin/jobs")
+async def get_job_status():
+    """Background job lanes and time from alert to E-FIR against its SLO"""
+    efir = EFIR_LATENCY.labels()
+    return {
+        "lanes": await durable_jobs.summary(),
+        "local_lanes": job_executor.summary(),
+        "efir": {
+            "slo_seconds": EFIR_SLO_SECONDS,
+            "count": efir.count,
+            "p50_seconds": efir.quantile(0.5) if efir.count else None,
+            "p99_seconds": efir.quantile(0.99) if efir.count else None,
+            "slo_breaches": EFIR_SLO_BREACHES.labels().value
+        }
+    }
+
+@api_router.get("/admin/ledger")
+async def get_ledger_status():
+    """ID ledger chain check and the latest sealed batches"""
+    latest = await db.id_ledger_batches.find({}).sort("_id", -1).limit(10).to_list(10)
+    for batch in latest:
+        batch["seq"] = batch.pop("_id")
+    return {
+        "chain": await id_ledger.verify_chain(),
+        "pending": await db.id_ledger_leaves.count_documents({"batch": None}),
+        "latest_batches": latest
+    }
+
+@api_router.get("/admin/admission")
+async def get_admission_status():
+    """Admission classes with their limits, running and waiting requests"""
+    return admission.summary()
+
+@api_router.get("/admin/profiles")
+async def get_request_profiles(route: Optional[str] = None, limit: int = 50):
+    """Recent profiled requests with per-stage timings"""
+    profiles = profiler.recent(route)[:limit]
+    return {
+        "sample_rate": profiler.sample_rate,
+        "stack_sampling": profiler.sampler is not None,
+        "profiles": [p.summary() for p in profiles]
+    }
+
+@api_router.get("/admin/profiles/flamegraph")
+async def get_profile_flamegraph(route: Optional[str] = None, profile_id: Optional[int] = None):
+    """Stack samples of profiled requests in folded format (flamegraph.pl, speedscope)"""
+    if profile_id is not None:
+        profile = profiler.get(profile_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        profiles = [profile]
+    else:
+        profiles = profiler.recent(route)
+    return Response(profiler.folded(profiles), media_type="text/plain")
+
 @api_router.get("/admin/dashboard/stats")
 async def get_admin_dashboard_stats():
     """Get comprehensive admin dashboard statistics"""
-    # Tourist statistics
-    total_tourists = await db.tourists.count_documents({})
-    active_tourists = await db.tourists.count_documents({"is_active": True})
+    # Tourist statistics (kept incrementally by registration and the trip lifecycle sweeper)
+    tourist_counts = await trip_lifecycle.counters()
+    total_tourists = tourist_counts["total"]
+    active_tourists = tourist_counts["active"]
     
     # Alert statistics
     total_alerts = await db.emergency_alerts.count_documents({})
@@ -531,17 +1175,18 @@ async def get_admin_dashboard_stats():
     resolved_alerts = await db.emergency_alerts.count_documents({"status": "resolved"})
     
     # Threat statistics
-    total_threats = len([t for category in GLOBAL_THREAT_DATABASE.values() for t in category])
-    high_threat_zones = len([t for category in GLOBAL_THREAT_DATABASE.values() for t in category if t["threat_level"] >= 8])
+    threat_index = threat_registry.index
+    total_threats = len(threat_index)
+    high_threat_zones = len([t for t in threat_index.threats if t.threat_level >= 8])
     
     # Advisory statistics
-    total_advisories = await db.advisories.count_documents({})
+    total_advisories = await db.advisories.count_documents({"cache_key": {"$exists": False}})
     active_advisories = await db.advisories.count_documents({"is_active": True})
     critical_advisories = await db.advisories.count_documents({"severity": "critical", "is_active": True})
     
     # Recent activity
-    recent_tourists = await db.tourists.find({}).sort("created_at", -1).limit(5).to_list(5)
-    recent_alerts = await db.emergency_alerts.find({}).sort("created_at", -1).limit(5).to_list(5)
+    recent_tourists = await db.tourists.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+    recent_alerts = await db.emergency_alerts.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
     
     return {
         "overview": {
@@ -563,14 +1208,15 @@ async def get_admin_dashboard_stats():
         "system_health": {
             "ai_integration_status": "operational",
             "database_status": "operational",
-            "threat_database_last_updated": datetime.now(timezone.utc).isoformat()
+            "threat_database_last_updated": threat_index.built_at.isoformat(),
+            "threat_registry_version": threat_index.version
         }
     }
 
 @api_router.get("/admin/tourists")
 async def get_all_tourists_admin(skip: int = 0, limit: int = 50):
     """Get all tourists for admin dashboard"""
-    tourists = await db.tourists.find({}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
+    tourists = await db.tourists.find({}, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
     
     # Convert datetime strings back to datetime objects
     for tourist in tourists:
@@ -587,10 +1233,37 @@ async def get_all_tourists_admin(skip: int = 0, limit: int = 50):
         }
     }
 
+@api_router.get("/admin/tourists/{tourist_id}/track")
+async def get_tourist_track(tourist_id: str, hours: int = 24):
+    """A tourist's movements: simplified hourly tracks plus raw fixes not yet compacted"""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    tracks = await db.location_tracks.find(
+        {"tourist_id": tourist_id, "end": {"$gt": since}}, {"_id": 0, "points": 1}
+    ).sort("start", 1).to_list(None)
+    points = [point for track in tracks for point in track["points"] if point[2] >= since.timestamp()]
+    
+    compacted_until = max(since, datetime.fromtimestamp(points[-1][2], timezone.utc)) if points else since
+    recent = await db.location_history.find(
+        {"tourist_id": tourist_id, "recorded_at": {"$gt": compacted_until}},
+        {"_id": 0, "latitude": 1, "longitude": 1, "recorded_at": 1}
+    ).sort("recorded_at", 1).to_list(None)
+    points.extend(
+        [fix["latitude"], fix["longitude"], fix["recorded_at"].replace(tzinfo=timezone.utc).timestamp()]
+        for fix in recent
+    )
+    return {"tourist_id": tourist_id, "hours": hours, "points": points}
+
 @api_router.get("/admin/alerts")
-async def get_all_alerts_admin(skip: int = 0, limit: int = 50):
+async def get_all_alerts_admin(request: Request, response: Response, skip: int = 0, limit: int = 50):
     """Get all alerts for admin dashboard"""
-    alerts = await db.emergency_alerts.find({}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
+    version, = await content_versions.get("emergency_alerts")
+    etag = versioned_etag("alerts", version, skip, limit)
+    cached = not_modified(request, etag, PRIVATE_CACHE_CONTROL)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    
+    alerts = await db.emergency_alerts.find({}, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
     
     # Convert datetime strings
     for alert in alerts:
@@ -614,12 +1287,20 @@ async def create_admin_log(log_data: AdminLog):
     log_mongo["timestamp"] = log_data.timestamp.isoformat()
     
     await db.admin_logs.insert_one(log_mongo)
+    await content_versions.bump("admin_logs")
     return {"status": "logged", "log_id": log_data.id}
 
 @api_router.get("/admin/logs")
-async def get_admin_logs(skip: int = 0, limit: int = 100):
+async def get_admin_logs(request: Request, response: Response, skip: int = 0, limit: int = 100):
     """Get admin activity logs"""
-    logs = await db.admin_logs.find({}).skip(skip).limit(limit).sort("timestamp", -1).to_list(limit)
+    version, = await content_versions.get("admin_logs")
+    etag = versioned_etag("logs", version, skip, limit)
+    cached = not_modified(request, etag, PRIVATE_CACHE_CONTROL)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    
+    logs = await db.admin_logs.find({}, {"_id": 0}).skip(skip).limit(limit).sort("timestamp", -1).to_list(limit)
     
     for log in logs:
         log["timestamp"] = datetime.fromisoformat(log["timestamp"])
@@ -633,92 +1314,283 @@ async def get_admin_logs(skip: int = 0, limit: int = 100):
         }
     }
 
+async def report_silent_tourist(entry):
+    """Raise an anomaly alert for a tourist who stopped reporting"""
+    tourist_id, last_seen, lat, lng = entry
+    tourist = await db.tourists.find_one({"id": tourist_id}, {"_id": 0, "is_active": 1, "last_location_at": 1})
+    if tourist is not None and not tourist.get("is_active", True):
+        return
+    
+    # With several workers another one may have received a newer fix and armed its own deadline
+    if tourist and tourist.get("last_location_at"):
+        if datetime.fromisoformat(tourist["last_location_at"]).timestamp() > last_seen + 1:
+            return
+    if not await claim_alert(f"silence:{tourist_id}:{int(last_seen)}", INACTIVITY_THRESHOLD_SECONDS):
+        return
+    
+    minutes = int((datetime.now(timezone.utc).timestamp() - last_seen) // 60)
+    await store_alert(EmergencyAlert(
+        tourist_id=tourist_id,
+        alert_type="anomaly",
+        latitude=lat,
+        longitude=lng,
+        message=f"No location update for {minutes} minutes (last seen {datetime.fromtimestamp(last_seen, timezone.utc).isoformat()})"
+    ))
+
+inactivity_sweeper = InactivitySweeper(
+    report_silent_tourist,
+    threshold_seconds=INACTIVITY_THRESHOLD_SECONDS,
+    tick_seconds=INACTIVITY_SWEEP_SECONDS
+)
+
+def evict_tourists(tourist_ids: List[str]):
+    """Drop this worker's in-memory state for tourists whose trip ended"""
+    for tourist_id in tourist_ids:
+        geofence_engine.forget(tourist_id)
+        anomaly_detector.forget(tourist_id)
+        live_positions.remove(tourist_id)
+        inactivity_sweeper.forget(tourist_id)
+
+trip_lifecycle = TripLifecycleSweeper(db, evict_tourists, interval_seconds=TRIP_SWEEP_SECONDS)
+
+location_retention = LocationRetention(
+    db,
+    raw_seconds=LOCATION_RAW_RETENTION_SECONDS,
+    compact_after_seconds=LOCATION_COMPACT_AFTER_SECONDS,
+    tolerance_m=LOCATION_TRACK_TOLERANCE_M,
+    interval_seconds=LOCATION_RETENTION_INTERVAL_SECONDS,
+    archive_dir=LOCATION_ARCHIVE_DIR,
+    # One worker compacts each hour
+    claim=lambda key, ttl_seconds: shared_cache.add(f"retention:{key}", True, ttl_seconds)
+)
+
+content_versions = ContentVersions(db)
+
+id_ledger = IDLedger(
+    db,
+    interval_seconds=LEDGER_BATCH_SECONDS,
+    max_batch=LEDGER_MAX_BATCH,
+    lease_seconds=LEDGER_LEASE_SECONDS,
+    # One worker seals each batch
+    claim=lambda key, ttl_seconds: shared_cache.add(key, True, ttl_seconds)
+)
+
+idempotency_store = IdempotencyStore(
+    db,
+    window_seconds=IDEMPOTENCY_WINDOW_SECONDS,
+    pending_seconds=IDEMPOTENCY_PENDING_SECONDS,
+    max_entries=IDEMPOTENCY_MEMORY_ENTRIES
+)
+
+async def run_idempotent(scope: str, request: Request, response: Response, idempotency_key: Optional[str], handler):
+    """Run handler() once per Idempotency-Key; retries with the same key and body get the first response"""
+    if not idempotency_key:
+        return await handler()
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+    
+    fingerprint = hashlib.sha256(await request.body()).hexdigest()
+    outcome, stored = await idempotency_store.begin(scope, idempotency_key, fingerprint)
+    if outcome == "replay":
+        response.headers["Idempotent-Replayed"] = "true"
+        return stored
+    if outcome == "mismatch":
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body")
+    if outcome == "in_progress":
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+    
+    try:
+        result = await handler()
+    except BaseException:
+        await idempotency_store.release(scope, idempotency_key, fingerprint)
+        raise
+    await idempotency_store.complete(scope, idempotency_key, fingerprint, jsonable_encoder(result))
+    return result
+
+async def claim_alert(key: str, ttl_seconds: float) -> bool:
+    """True for the first worker to raise this alert within ttl_seconds"""
+    return await shared_cache.add(f"alert:{key}", True, ttl_seconds)
+
+async def store_alert(alert_obj: "EmergencyAlert"):
+    """Persist a system-generated alert and notify admin consoles"""
+    alert_mongo = alert_obj.dict()
+    alert_mongo["created_at"] = alert_obj.created_at.isoformat()
+    await db.emergency_alerts.insert_one(alert_mongo)
+    await content_versions.bump("emergency_alerts")
+    event_bus.publish("alert.created", alert_obj.dict())
+
 # Enhanced location tracking
 @api_router.post("/location/update")
-async def update_location(location_data: LocationUpdate, background_tasks: BackgroundTasks):
-    """Update location with enhanced threat detection"""
+async def update_location(
+    location_data: LocationUpdate,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Update location with enhanced threat detection; retries carrying an Idempotency-Key are replayed"""
+    return await run_idempotent(
+        "location_update", request, response, idempotency_key, lambda: process_location_update(location_data)
+    )
+
+async def process_location_update(location_data: LocationUpdate):
+    """Store a fix and run geofence, anomaly and threat checks on it"""
     # Store location
     location_mongo = location_data.dict()
     location_mongo["timestamp"] = location_data.timestamp.isoformat()
+    # Server time as a BSON date: drives the TTL index and hourly compaction
+    location_mongo["recorded_at"] = datetime.now(timezone.utc)
     
-    await db.location_history.insert_one(location_mongo)
+    with stage("store_location"):
+        await db.location_history.insert_one(location_mongo)
+        
+        # Update current location
+        tourist = await db.tourists.find_one_and_update(
+            {"id": location_data.tourist_id},
+            {"$set": {
+                "current_location": {"lat": location_data.latitude, "lng": location_data.longitude},
+                "last_location_at": datetime.now(timezone.utc).isoformat()
+            }},
+            projection={"_id": 0, "is_active": 1, "trip_end_at": 1}
+        )
     
-    # Update current location
-    await db.tourists.update_one(
-        {"id": location_data.tourist_id},
-        {"$set": {"current_location": {"lat": location_data.latitude, "lng": location_data.longitude}}}
-    )
+    # Fixes from a trip that has ended are stored but not tracked, so they cannot
+    # bring back in-memory state the trip lifecycle sweep already evicted
+    tracked = tourist is None or (tourist.get("is_active", True) and (
+        "trip_end_at" not in tourist or trip_end_at(tourist["trip_end_at"]) > datetime.now(timezone.utc)
+    ))
     
-    # Get location name
-    location_name = await get_location_name(location_data.latitude, location_data.longitude)
+    # Get location name (skipped when geocoding is saturated; the fix itself is always processed)
+    async with admission.slot("location") as admitted:
+        if admitted:
+            location_name = await get_location_name(location_data.latitude, location_data.longitude)
+        else:
+            location_name = location_data.location_name or f"{location_data.latitude}, {location_data.longitude}"
     
     # Check for nearby threats
     threats = get_nearby_threats(location_data.latitude, location_data.longitude, 50)
     high_threats = [t for t in threats if t.threat_level >= 7]
     
-    # Create alerts for high threats
-    for threat in high_threats:
-        alert_data = {
-            "tourist_id": location_data.tourist_id,
-            "alert_type": "threat_proximity",
-            "latitude": location_data.latitude,
-            "longitude": location_data.longitude,
-            "message": f"High threat detected nearby: {threat.name} (Level {threat.threat_level}/10)"
+    if not tracked:
+        return {
+            "status": "location updated",
+            "location_name": location_name,
+            "threats_detected": len(threats),
+            "high_priority_threats": len(high_threats),
+            "geofence_events": [],
+            "anomalies": [],
+            "message": "Trip has ended; location stored without tracking"
         }
-        
-        # Check if similar alert already exists
-        existing_alert = await db.emergency_alerts.find_one({
-            "tourist_id": location_data.tourist_id,
-            "alert_type": "threat_proximity",
-            "status": "active"
-        })
-        
-        if not existing_alert:
-            from . import EmergencyAlert
-            alert_obj = EmergencyAlert(**alert_data)
-            alert_mongo = alert_obj.dict()
-            alert_mongo["created_at"] = alert_obj.created_at.isoformat()
-            await db.emergency_alerts.insert_one(alert_mongo)
     
-    # Perform safety analysis
-    background_tasks.add_task(perform_enhanced_safety_analysis, location_data.tourist_id)
+    # Geofence transitions (alerts only fire on entry, not on every fix inside a zone)
+    with stage("geofence"):
+        fence_events = geofence_engine.update(
+            location_data.tourist_id,
+            location_data.latitude,
+            location_data.longitude,
+            location_data.timestamp
+        )
+    
+    for event in fence_events:
+        if event.event != "enter" or event.level < GEOFENCE_ALERT_LEVEL:
+            continue
+        # Consecutive fixes can land on different workers, each seeing the entry
+        if await claim_alert(f"geofence:{location_data.tourist_id}:{event.fence_id}", GEOFENCE_DWELL_SECONDS):
+            await store_alert(EmergencyAlert(
+                tourist_id=location_data.tourist_id,
+                alert_type="geofence",
+                latitude=location_data.latitude,
+                longitude=location_data.longitude,
+                message=f"Entered {event.fence_kind} zone: {event.fence_name} (Level {event.level}/10)"
+            ))
+    
+    if fence_events:
+        await db.geofence_events.insert_many([event.dict() for event in fence_events])
+    
+    # Movement anomalies (impossible jumps, prolonged stillness, route deviation)
+    if not anomaly_detector.has_plan(location_data.tourist_id):
+        anomaly_detector.set_plan(location_data.tourist_id, [])
+        job_executor.submit("local", load_route_plan, location_data.tourist_id, key=("route_plan", location_data.tourist_id))
+    
+    with stage("anomaly_detection"):
+        anomalies = anomaly_detector.update(
+            location_data.tourist_id,
+            location_data.latitude,
+            location_data.longitude,
+            location_data.timestamp.timestamp()
+        )
+    
+    for anomaly in anomalies:
+        window = int(anomaly.timestamp // ANOMALY_ALERT_WINDOW_SECONDS)
+        if not await claim_alert(
+            f"anomaly:{location_data.tourist_id}:{anomaly.kind}:{window}", 2 * ANOMALY_ALERT_WINDOW_SECONDS
+        ):
+            continue
+        await store_alert(EmergencyAlert(
+            tourist_id=location_data.tourist_id,
+            alert_type="anomaly",
+            latitude=location_data.latitude,
+            longitude=location_data.longitude,
+            message=anomaly.message
+        ))
+    
+    live_positions.update(
+        location_data.tourist_id,
+        location_data.latitude,
+        location_data.longitude,
+        location_data.timestamp
+    )
+    inactivity_sweeper.touch(location_data.tourist_id, location_data.latitude, location_data.longitude)
+    event_bus.publish("location.updated", {
+        "tourist_id": location_data.tourist_id,
+        "lat": location_data.latitude,
+        "lng": location_data.longitude,
+        "timestamp": location_data.timestamp
+    })
+    
+    # Perform safety analysis (a burst of fixes from one tourist queues a single analysis)
+    await durable_jobs.enqueue(
+        "safety_analysis", {"tourist_id": location_data.tourist_id},
+        key=f"safety_analysis:{location_data.tourist_id}"
+    )
     
     return {
         "status": "location updated",
         "location_name": location_name,
         "threats_detected": len(threats),
         "high_priority_threats": len(high_threats),
+        "geofence_events": [event.dict() for event in fence_events],
+        "anomalies": [anomaly.kind for anomaly in anomalies],
         "message": "Enhanced safety analysis initiated"
     }
 
 async def perform_enhanced_safety_analysis(tourist_id: str):
-    """Enhanced background safety analysis"""
-    try:
-        # Get recent locations
-        recent_locations = await db.location_history.find(
-            {"tourist_id": tourist_id}
-        ).sort("timestamp", -1).limit(10).to_list(10)
-        
-        if not recent_locations:
-            return
-        
-        # Analyze route pattern
-        route_points = [
-            {"lat": loc["latitude"], "lng": loc["longitude"]}
-            for loc in recent_locations
-        ]
-        
-        # Get AI analysis
-        safety_analysis = await analyze_route_safety(route_points, tourist_id)
-        
-        # Update tourist safety score
-        await db.tourists.update_one(
-            {"id": tourist_id},
-            {"$set": {"safety_score": safety_analysis.get("overall_safety_score", 70)}}
-        )
-        
-    except Exception as e:
-        logging.error(f"Enhanced safety analysis error: {str(e)}")
+    """Enhanced background safety analysis; errors propagate so the job queue retries"""
+    # Get recent locations
+    recent_locations = await db.location_history.find(
+        {"tourist_id": tourist_id}, {"_id": 0, "latitude": 1, "longitude": 1}
+    ).sort("timestamp", -1).limit(10).to_list(10)
+    
+    if not recent_locations:
+        return
+    
+    # Analyze route pattern
+    route_points = [
+        {"lat": loc["latitude"], "lng": loc["longitude"]}
+        for loc in recent_locations
+    ]
+    
+    # Get AI analysis
+    safety_analysis = await analyze_route_safety(route_points, tourist_id)
+    
+    # Update tourist safety score (idempotent: a retry just recomputes it)
+    await db.tourists.update_one(
+        {"id": tourist_id},
+        {"$set": {"safety_score": safety_analysis.get("overall_safety_score", 70)}}
+    )
+
+durable_jobs.register(
+    "safety_analysis", "routine", lambda payload: perform_enhanced_safety_analysis(payload["tourist_id"])
+)
 
 # Keep existing routes from original implementation
 # ... (include all previous routes like emergency alerts, crowd reports, etc.)
@@ -743,8 +1615,19 @@ class EmergencyAlertCreate(BaseModel):
     message: Optional[str] = None
 
 @api_router.post("/emergency/alert", response_model=EmergencyAlert)
-async def create_emergency_alert(alert_data: EmergencyAlertCreate, background_tasks: BackgroundTasks):
-    """Create emergency alert with enhanced response"""
+async def create_emergency_alert(
+    alert_data: EmergencyAlertCreate,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Create emergency alert with enhanced response; a retried panic press files one alert and one E-FIR"""
+    return await run_idempotent(
+        "emergency_alert", request, response, idempotency_key, lambda: raise_emergency_alert(alert_data)
+    )
+
+async def raise_emergency_alert(alert_data: EmergencyAlertCreate) -> EmergencyAlert:
+    """Store a tourist-raised alert and queue its E-FIR"""
     alert_dict = alert_data.dict()
     alert_obj = EmergencyAlert(**alert_dict)
     
@@ -753,63 +1636,102 @@ async def create_emergency_alert(alert_data: EmergencyAlertCreate, background_ta
     alert_mongo["created_at"] = alert_obj.created_at.isoformat()
     
     await db.emergency_alerts.insert_one(alert_mongo)
+    await content_versions.bump("emergency_alerts")
+    event_bus.publish("alert.created", alert_obj.dict())
     
-    # Enhanced emergency response
-    background_tasks.add_task(handle_enhanced_emergency_response, alert_obj.id)
+    # Enhanced emergency response, persisted before the alert is acknowledged
+    await durable_jobs.enqueue("efir", jsonable_encoder(alert_obj))
     
     return alert_obj
 
-async def handle_enhanced_emergency_response(alert_id: str):
-    """Enhanced emergency response with AI E-FIR generation"""
+@api_router.post("/admin/alerts/{alert_id}/resolve")
+async def resolve_emergency_alert(alert_id: str, status: str = "resolved"):
+    """Resolve an alert or mark it as a false alarm"""
+    if status not in ("resolved", "false_alarm"):
+        raise HTTPException(status_code=400, detail="Status must be 'resolved' or 'false_alarm'")
+    
+    resolved_at = datetime.now(timezone.utc)
+    result = await db.emergency_alerts.update_one(
+        {"id": alert_id},
+        {"$set": {"status": status, "resolved_at": resolved_at.isoformat()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    await content_versions.bump("emergency_alerts")
+    
+    event_bus.publish("alert.resolved", {"id": alert_id, "status": status, "resolved_at": resolved_at})
+    return {"status": status, "alert_id": alert_id, "resolved_at": resolved_at}
+
+async def handle_enhanced_emergency_response(alert: Dict[str, Any]):
+    """Enhanced emergency response with AI E-FIR generation.
+    
+    Runs as a durable job and may be retried, so an alert that already has an
+    E-FIR is skipped and efir_records.alert_id is unique.
+    """
+    from pymongo.errors import DuplicateKeyError
+    
+    alert_obj = EmergencyAlert(**alert)
+    alert_id = alert_obj.id
+    if await db.efir_records.find_one({"alert_id": alert_id}, {"_id": 1}):
+        return
+    
+    # The alert comes with the job; tourist and location context are fetched together
+    tourist, location_name = await asyncio.gather(
+        db.tourists.find_one({"id": alert_obj.tourist_id}, {"_id": 0}),
+        get_location_name(alert_obj.latitude, alert_obj.longitude, emergency=True)
+    )
+    if not tourist:
+        return
+    
+    tourist["trip_start_date"] = datetime.fromisoformat(tourist["trip_start_date"])
+    tourist["trip_end_date"] = datetime.fromisoformat(tourist["trip_end_date"])
+    tourist["created_at"] = datetime.fromisoformat(tourist["created_at"])
+    tourist_obj = TouristID(**tourist)
+    
+    # Generate enhanced E-FIR with AI
+    efir_data = await generate_enhanced_efir(alert_obj, tourist_obj, location_name)
+    
+    # Store E-FIR
+    efir_record = {
+        "id": str(uuid.uuid4()),
+        "alert_id": alert_id,
+        "tourist_id": alert_obj.tourist_id,
+        "efir_data": efir_data,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    
     try:
-        # Get alert details
-        alert = await db.emergency_alerts.find_one({"id": alert_id})
-        if not alert:
-            return
-        
-        alert["created_at"] = datetime.fromisoformat(alert["created_at"])
-        alert_obj = EmergencyAlert(**alert)
-        
-        # Get tourist details
-        tourist = await db.tourists.find_one({"id": alert_obj.tourist_id})
-        if not tourist:
-            return
-        
-        tourist["trip_start_date"] = datetime.fromisoformat(tourist["trip_start_date"])
-        tourist["trip_end_date"] = datetime.fromisoformat(tourist["trip_end_date"])
-        tourist["created_at"] = datetime.fromisoformat(tourist["created_at"])
-        tourist_obj = TouristID(**tourist)
-        
-        # Generate enhanced E-FIR with AI
-        efir_data = await generate_enhanced_efir(alert_obj, tourist_obj)
-        
-        # Store E-FIR
-        efir_record = {
-            "id": str(uuid.uuid4()),
-            "alert_id": alert_id,
-            "tourist_id": alert_obj.tourist_id,
-            "efir_data": efir_data,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        
         await db.efir_records.insert_one(efir_record)
-        
-        logging.info(f"Enhanced E-FIR generated for alert {alert_id}: {efir_data.get('fir_number', 'N/A')}")
-        
-    except Exception as e:
-        logging.error(f"Enhanced emergency response error: {str(e)}")
+    except DuplicateKeyError:
+        # Another worker finished the same alert first
+        return
+    efir_latency = (datetime.now(timezone.utc) - alert_obj.created_at).total_seconds()
+    EFIR_LATENCY.observe(efir_latency)
+    if efir_latency > EFIR_SLO_SECONDS:
+        EFIR_SLO_BREACHES.inc()
+        logging.warning(f"E-FIR for alert {alert_id} took {efir_latency:.1f}s (SLO {EFIR_SLO_SECONDS:.0f}s)")
+    event_bus.publish("efir.created", {
+        "id": efir_record["id"],
+        "alert_id": alert_id,
+        "tourist_id": alert_obj.tourist_id,
+        "fir_number": efir_data.get("fir_number"),
+        "priority_level": efir_data.get("priority_level"),
+        "created_at": efir_record["created_at"]
+    })
+    
+    logging.info(f"Enhanced E-FIR generated for alert {alert_id}: {efir_data.get('fir_number', 'N/A')}")
+
+durable_jobs.register("efir", "emergency", handle_enhanced_emergency_response)
 
-async def generate_enhanced_efir(alert: EmergencyAlert, tourist: TouristID) -> Dict[str, Any]:
+async def generate_enhanced_efir(alert: EmergencyAlert, tourist: TouristID, location_name: str) -> Dict[str, Any]:
     """Generate enhanced E-FIR using AI with location context"""
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"efir_{alert.id}",
-            system_message="You are an AI assistant for generating comprehensive E-FIR reports for tourist emergencies with location-based context."
-        ).with_model("gemini", "gemini-2.0-flash")
+        chat = llm_chat(
+            f"efir_{alert.id}",
+            "You are an AI assistant for generating comprehensive E-FIR reports for tourist emergencies with location-based context."
+        )
         
         # Get location context
-        location_name = await get_location_name(alert.latitude, alert.longitude)
         nearby_threats = get_nearby_threats(alert.latitude, alert.longitude, 25)
         
         efir_prompt = f"""
@@ -849,8 +1771,7 @@ async def generate_enhanced_efir(alert: EmergencyAlert, tourist: TouristID) -> D
         }}
         """
         
-        user_message = UserMessage(text=efir_prompt)
-        response = await chat.send_message(user_message)
+        response = await send_llm_message(chat, efir_prompt, "efir")
         
         try:
             efir_data = json.loads(response)
@@ -902,20 +1823,7 @@ async def initialize_global_threats():
         await db.global_threats.delete_many({"source": "global_database"})
         
         # Insert new threats
-        threats_to_insert = []
-        for category, threats in GLOBAL_THREAT_DATABASE.items():
-            for threat in threats:
-                threat_obj = LocationThreat(
-                    name=threat["name"],
-                    latitude=threat["lat"],
-                    longitude=threat["lng"],
-                    threat_type=threat["type"],
-                    threat_level=threat["threat_level"],
-                    radius_km=threat["radius"],
-                    description=f"{category.replace('_', ' ').title()} - {threat['name']}",
-                    source="global_database"
-                )
-                threats_to_insert.append(threat_obj.dict())
+        threats_to_insert = [LocationThreat(**record).dict() for record in global_threat_records()]
         
         # Convert datetime for MongoDB
         for threat in threats_to_insert:
@@ -923,6 +1831,10 @@ async def initialize_global_threats():
         
         await db.global_threats.insert_many(threats_to_insert)
         
+        # Publish the new data to every worker
+        await threat_registry.bump_version()
+        await threat_registry.reload()
+        
         return {
             "status": "success",
             "message": f"Initialized {len(threats_to_insert)} global threats",
@@ -933,9 +1845,260 @@ async def initialize_global_threats():
         logging.error(f"Global threats initialization error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to initialize global threats")
 
+# Real-time admin events
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialize a bus event as a Server-Sent Events frame"""
+    payload = json.dumps(jsonable_encoder(event))
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {payload}\n\n"
+
+def parse_topics(topics: Optional[str]) -> Optional[List[str]]:
+    return [t.strip() for t in topics.split(",") if t.strip()] if topics else None
+
+@api_router.get("/admin/events/stream")
+async def stream_admin_events(request: Request, topics: Optional[str] = None):
+    """Server-Sent Events stream of alert, tourist, E-FIR and location deltas"""
+    last_event_id = request.headers.get("last-event-id")
+    subscription = event_bus.subscribe(
+        parse_topics(topics),
+        last_event_id=int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    )
+    
+    async def event_source():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.next(), timeout=EVENT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.websocket("/admin/events/ws")
+async def admin_events_websocket(websocket: WebSocket, topics: Optional[str] = None):
+    """WebSocket variant of the admin event stream"""
+    await websocket.accept()
+    subscription = event_bus.subscribe(parse_topics(topics))
+    try:
+        while True:
+            event = await subscription.next()
+            await websocket.send_json(jsonable_encoder(event))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_bus.unsubscribe(subscription)
+
+# Live tourist position map feed
+async def position_frames(subscription, interval: float):
+    """Snapshot first, then throttled deltas; None means send a keepalive"""
+    yield live_positions.snapshot(subscription)
+    while True:
+        if await subscription.wait(EVENT_STREAM_HEARTBEAT_SECONDS):
+            yield subscription.take_delta()
+            await asyncio.sleep(interval)
+        else:
+            yield None
+
+@api_router.get("/admin/positions/stream")
+async def stream_live_positions(
+    request: Request,
+    min_lat: float,
+    min_lng: float,
+    max_lat: float,
+    max_lng: float,
+    interval: float = 1.0
+):
+    """Server-Sent Events feed of tourist positions inside a viewport"""
+    subscription = live_positions.subscribe(min_lat, min_lng, max_lat, max_lng)
+    interval = max(interval, LIVE_POSITION_MIN_INTERVAL)
+    
+    async def event_source():
+        try:
+            async for frame in position_frames(subscription, interval):
+                if await request.is_disconnected():
+                    break
+                if frame is None:
+                    yield ": keepalive\n\n"
+                elif frame["upsert"] or frame["remove"] or frame.get("snapshot"):
+                    yield f"event: positions\ndata: {json.dumps(frame, separators=(',', ':'))}\n\n"
+        finally:
+            live_positions.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.websocket("/admin/positions/ws")
+async def live_positions_websocket(websocket: WebSocket, interval: float = 1.0):
+    """WebSocket position feed; send {"viewport": [min_lat, min_lng, max_lat, max_lng]} to (re)subscribe"""
+    await websocket.accept()
+    interval = max(interval, LIVE_POSITION_MIN_INTERVAL)
+    current = {"subscription": None}
+    
+    async def receive_viewports():
+        while True:
+            try:
+                message = await websocket.receive_json()
+                viewport = [float(v) for v in message["viewport"]]
+                if len(viewport) != 4:
+                    raise ValueError("expected [min_lat, min_lng, max_lat, max_lng]")
+                subscription = live_positions.subscribe(*viewport)
+            except (ValueError, TypeError, KeyError, AttributeError, OverflowError) as e:
+                # A bad message keeps the current subscription
+                await websocket.send_json({"error": f"Invalid viewport message: {str(e)}"})
+                continue
+            if current["subscription"]:
+                live_positions.unsubscribe(current["subscription"])
+            current["subscription"] = subscription
+            await websocket.send_json(live_positions.snapshot(subscription))
+    
+    receiver = asyncio.create_task(receive_viewports())
+    try:
+        while not receiver.done():
+            subscription = current["subscription"]
+            if subscription is None or not await subscription.wait(interval):
+                await asyncio.sleep(0 if subscription else interval)
+                continue
+            frame = subscription.take_delta()
+            if frame:
+                await websocket.send_json(frame)
+            await asyncio.sleep(interval)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if current["subscription"]:
+            live_positions.unsubscribe(current["subscription"])
+
+# Risk heatmap tiles
+class RiskLookupRequest(BaseModel):
+    points: List[Dict[str, float]]  # [{"lat": float, "lng": float}]
+    zoom: Optional[int] = None
+
+@api_router.get("/risk-tiles/{z}/{x}/{y}")
+async def get_risk_tile(z: int, x: int, y: int, request: Request):
+    """Raw float16 risk raster for one web mercator tile (row-major, north row first)"""
+    if not risk_tiles.valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    
+    tile = await asyncio.get_running_loop().run_in_executor(None, risk_tiles.tile, z, x, y)
+    headers = {
+        "ETag": tile.etag,
+        "Cache-Control": f"public, max-age={RISK_TILE_MAX_AGE}",
+        "X-Tile-Size": str(risk_tiles.tile_size),
+        "X-Tile-Dtype": "float16"
+    }
+    if request.headers.get("if-none-match") == tile.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile.to_bytes(), media_type="application/octet-stream", headers=headers)
+
+@api_router.post("/risk/lookup")
+async def lookup_risk(lookup: RiskLookupRequest):
+    """Bulk risk values for many points from the tile raster"""
+    zoom = lookup.zoom if lookup.zoom is not None else risk_tiles.lookup_zoom
+    if not 0 <= zoom <= risk_tiles.max_zoom:
+        raise HTTPException(status_code=400, detail=f"Zoom must be between 0 and {risk_tiles.max_zoom}")
+    
+    risks = await asyncio.get_running_loop().run_in_executor(None, risk_tiles.lookup, lookup.points, zoom)
+    return {"zoom": zoom, "generation": risk_tiles.generation, "risks": risks}
+
+# Runtime threat management
+@api_router.post("/admin/threats", response_model=LocationThreat)
+async def create_threat(threat: LocationThreat):
+    """Add a threat zone at runtime"""
+    try:
+        prepare_geometry(threat.geometry)
+    except (ValueError, TypeError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid threat geometry: {str(e)}")
+    
+    # "global_database" marks the bundled seed data, which /init/global-threats replaces wholesale
+    if threat.source == "global_database":
+        threat.source = "admin"
+    
+    threat_mongo = threat.dict()
+    threat_mongo["created_at"] = threat.created_at.isoformat()
+    
+    await db.global_threats.insert_one(threat_mongo)
+    await threat_registry.bump_version()
+    await threat_registry.reload()
+    return threat
+
+@api_router.delete("/admin/threats/{threat_id}")
+async def deactivate_threat(threat_id: str):
+    """Deactivate a threat zone at runtime"""
+    result = await db.global_threats.update_one({"id": threat_id}, {"$set": {"is_active": False}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Threat not found")
+    
+    await threat_registry.bump_version()
+    await threat_registry.reload()
+    return {"status": "deactivated", "threat_id": threat_id, "registry_version": threat_registry.version}
+
+def connect_database():
+    """Connect the database handle and the shared cache built on it (also used by worker.py)"""
+    global shared_cache
+    db.connect(
+        mongo_url,
+        max_pool_size=MONGO_MAX_POOL_SIZE,
+        min_pool_size=MONGO_MIN_POOL_SIZE,
+        wait_queue_timeout_ms=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        compressors=MONGO_COMPRESSORS,
+        write_concern=MONGO_WRITE_CONCERN,
+        journal=MONGO_JOURNAL.lower() == 'true' if MONGO_JOURNAL else None,
+        read_concern=MONGO_READ_CONCERN
+    )
+    shared_cache = create_cache(CACHE_BACKEND, db, REDIS_URL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect to MongoDB, start background services and warm up; undo it all on shutdown"""
+    connect_database()
+    await start_background_services()
+    await warm_up()
+    yield
+    await stop_background_services()
+
+# Create the main app without a prefix
+app = FastAPI(lifespan=lifespan)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+def cache_hit_ratio(cache) -> float:
+    lookups = cache.hits + cache.misses
+    return cache.hits / lookups if lookups else 0.0
+
+CACHE_HIT_RATIO = REGISTRY.gauge("cache_hit_ratio", "Hits over lookups since start", ["cache"])
+CACHE_HIT_RATIO.labels("risk_tiles").set_function(lambda: cache_hit_ratio(risk_tiles))
+CACHE_HIT_RATIO.labels("route_cost_surfaces").set_function(lambda: cache_hit_ratio(route_planner))
+REGISTRY.gauge("event_stream_queued_events", "Events waiting in admin stream queues").set_function(lambda: event_bus.queued)
+REGISTRY.gauge("event_stream_subscribers", "Connected admin stream consoles").set_function(lambda: event_bus.subscriber_count)
+REGISTRY.gauge("checkin_tracked_tourists", "Tourists with an armed check-in deadline").set_function(lambda: len(inactivity_sweeper.wheel))
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of every registered metric"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Innermost, so request metrics include compression
+app.add_middleware(
+    ConditionalGetMiddleware,
+    cache_control={"/api/threats/": PUBLIC_CACHE_CONTROL, "/api/advisories/": PUBLIC_CACHE_CONTROL},
+    default_cache_control=PRIVATE_CACHE_CONTROL,
+    compress_min_bytes=HTTP_COMPRESS_MIN_BYTES
+)
+app.add_middleware(RequestMetricsMiddleware, histogram=REQUEST_LATENCY)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -951,6 +2114,146 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Measured footprint of geofence, anomaly, live map and check-in state per tourist
+TRACKED_TOURIST_BYTES = 1600
+
+def log_worker_memory_budget():
+    """Log the memory each worker process is expected to hold at full caches"""
+    mb = 1024 * 1024
+    workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+    tile_cache = risk_tiles.cache_size * risk_tiles.tile_bytes / mb
+    # float32 risk plus float64 cost per cell
+    surfaces = ROUTE_COST_CACHE_SIZE * ROUTE_PLANNER_MAX_CELLS ** 2 * 12 / mb
+    pyramid = risk_tiles.pyramid_tile_count * risk_tiles.tile_bytes / mb
+    logger.info(
+        f"Worker memory budget ({workers} worker(s), cache backend {CACHE_BACKEND}): "
+        f"risk tile cache up to {tile_cache:.0f} MB, route cost surfaces up to {surfaces:.0f} MB, "
+        f"~{TRACKED_TOURIST_BYTES / 1024:.1f} KB per tracked tourist; "
+        f"shared risk pyramid {pyramid:.1f} MB mapped once per host"
+        + ("" if shared_arrays else " (sharing disabled, held per worker)")
+    )
+
+# Startup warm-up: how long to wait for MongoDB and the eager heatmap tiles, and the deferred
+# imports loaded in a background thread once the app is up (empty to import on first use only)
+STARTUP_WARMUP_TIMEOUT_SECONDS = float(os.environ.get('STARTUP_WARMUP_TIMEOUT_SECONDS', '10'))
+PRELOAD_MODULES = [
+    m.strip()
+    for m in os.environ.get('PRELOAD_MODULES', 'emergentintegrations.llm.chat,qrcode,PIL.Image,requests').split(',')
+    if m.strip()
+]
+
+def preload_modules():
+    """Import the deferred dependencies off the event loop"""
+    for name in PRELOAD_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            logger.info(f"Preloaded {name} in {time.perf_counter() - started:.2f}s")
+        except ImportError as e:
+            logging.error(f"Preload of {name} failed: {str(e)}")
+
+async def warm_up():
+    """Open pooled connections and render the eager heatmap tiles before taking traffic"""
+    loop = asyncio.get_running_loop()
+    if PRELOAD_MODULES:
+        loop.run_in_executor(None, preload_modules)
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), STARTUP_WARMUP_TIMEOUT_SECONDS)
+    except Exception as e:
+        logging.error(f"Warm-up database ping error: {str(e)}")
+    try:
+        await asyncio.wait_for(loop.run_in_executor(None, risk_tiles.precompute), STARTUP_WARMUP_TIMEOUT_SECONDS)
+    except Exception as e:
+        logging.error(f"Warm-up risk tile error: {str(e)}")
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+async def start_background_services():
+    log_worker_memory_budget()
+    if loop_block_detector:
+        await loop_block_detector.start()
+    try:
+        await shared_cache.ensure_indexes()
+    except Exception as e:
+        logging.error(f"Shared cache index error: {str(e)}")
+    try:
+        await idempotency_store.ensure_indexes()
+    except Exception as e:
+        logging.error(f"Idempotency key index error: {str(e)}")
+    try:
+        await location_retention.ensure_indexes()
+    except Exception as e:
+        logging.error(f"Location history index error: {str(e)}")
+    try:
+        await advisory_cache.ensure_indexes()
+    except Exception as e:
+        logging.error(f"Advisory cache index error: {str(e)}")
+    try:
+        await id_ledger.ensure_indexes()
+    except Exception as e:
+        logging.error(f"ID ledger index error: {str(e)}")
+    try:
+        await trip_lifecycle.ensure_indexes()
+        backfilled = await trip_lifecycle.backfill()
+        if backfilled:
+            logging.info(f"Set trip_end_at on {backfilled} tourists")
+        await trip_lifecycle.seed_counters()
+    except Exception as e:
+        logging.error(f"Trip lifecycle setup error: {str(e)}")
+    await threat_registry.start()
+    await inactivity_sweeper.start()
+    await trip_lifecycle.start()
+    await location_retention.start()
+    await id_ledger.start()
+    await job_executor.start()
+    await start_durable_jobs(JOB_WORKERS_IN_API)
+    try:
+        await refresh_advisory_fences()
+    except Exception as e:
+        logging.error(f"Advisory geofence load error: {str(e)}")
+    global advisory_fence_task
+    advisory_fence_task = asyncio.create_task(poll_advisory_fences())
+    
+    await warm_up_tourist_state()
+
+async def warm_up_tourist_state():
+    """Seed the live map and check-in wheel from active tourists' last fixes, so silence before a restart is reported"""
+    try:
+        now = datetime.now(timezone.utc)
+        async for tourist in db.tourists.find(
+            {"is_active": True, "current_location": {"$ne": None}},
+            {"_id": 0, "id": 1, "current_location": 1, "last_location_at": 1}
+        ):
+            location = tourist["current_location"]
+            seen_at = datetime.fromisoformat(tourist["last_location_at"]) if tourist.get("last_location_at") else now
+            live_positions.update(tourist["id"], location["lat"], location["lng"], seen_at)
+            inactivity_sweeper.touch(tourist["id"], location["lat"], location["lng"], seen_at.timestamp())
+    except Exception as e:
+        logging.error(f"Tourist state warm-up error: {str(e)}")
+
+async def start_durable_jobs(run_workers: bool):
+    """Create the job queue indexes and, if run_workers, claim jobs in this process"""
+    try:
+        await durable_jobs.ensure_indexes()
+        # A retried E-FIR job must not file a second report for the same alert
+        await db.efir_records.create_index("alert_id", unique=True)
+    except Exception as e:
+        logging.error(f"Job queue index error: {str(e)}")
+    durable_jobs.start_depth_gauge()
+    if run_workers:
+        await durable_jobs.start()
+
+async def stop_background_services():
+    if advisory_fence_task:
+        advisory_fence_task.cancel()
+    await durable_jobs.stop()
+    await job_executor.stop(JOB_DRAIN_SECONDS)
+    await threat_registry.stop()
+    await inactivity_sweeper.stop()
+    await trip_lifecycle.stop()
+    await location_retention.stop()
+    await id_ledger.stop()
+    await shared_cache.close()
+    if loop_block_detector:
+        await loop_block_detector.stop()
+    db.close()
\ No newline at end of file
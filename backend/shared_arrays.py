@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import os
+import time
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+
+def content_key(parts: Iterable) -> str:
+    """Stable short hash of the data an array was built from"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class SharedArrayStore:
+    """Read-only numpy arrays published to files and memory-mapped by every worker.
+
+    Arrays are keyed by a content hash, so workers holding the same data map
+    the same file and the OS page cache keeps a single copy. The first worker
+    to need an array renders it while holding a lock file; the others wait
+    for it to appear instead of rendering their own.
+    """
+
+    def __init__(self, directory: str, wait_seconds: float = 30.0):
+        self.directory = directory
+        self.wait_seconds = wait_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str, key: str) -> str:
+        return os.path.join(self.directory, f"{name}-{key}.npy")
+
+    def load(self, name: str, key: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._path(name, key), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def publish(self, name: str, key: str, array: np.ndarray) -> np.ndarray:
+        """Write an array atomically and return the mapped copy"""
+        path = self._path(name, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        self._prune(name, keep=path)
+        return np.load(path, mmap_mode="r")
+
+    def get_or_build(self, name: str, key: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """Map the array for key, building and publishing it if no worker has yet"""
+        array = self.load(name, key)
+        if array is not None:
+            return array
+
+        lock_path = self._path(name, key) + ".lock"
+        self._clear_stale_lock(lock_path)
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            deadline = time.monotonic() + self.wait_seconds
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                array = self.load(name, key)
+                if array is not None:
+                    return array
+            # The builder died or is very slow; a stale lock must not block startup
+            logging.warning(f"Timed out waiting for shared array {name}-{key}, building locally")
+            return self.publish(name, key, build())
+
+        try:
+            os.close(fd)
+            return self.publish(name, key, build())
+        finally:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _clear_stale_lock(self, lock_path: str):
+        """Drop a lock left behind by a worker that exited mid-build"""
+        try:
+            if time.time() - os.path.getmtime(lock_path) > self.wait_seconds:
+                os.remove(lock_path)
+        except OSError:
+            pass
+
+    def _prune(self, name: str, keep: str):
+        """Remove superseded arrays; workers still mapping them keep their pages"""
+        prefix = f"{name}-"
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry.startswith(prefix) and entry.endswith(".npy") and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,147 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+
+
+class MemoryCache:
+    """In-process cache backend for single-worker runs and tests.
+
+    Same interface as the shared backends: values expire after ttl_seconds,
+    and add() only succeeds for the first caller, which makes it usable for
+    deduplication.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def _live(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key: str, value: Any, ttl_seconds: float):
+        self._entries[key] = (time.time() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._live(key)
+        return entry[1] if entry is not None else None
+
+    async def set(self, key: str, value: Any, ttl_seconds: float):
+        self._store(key, value, ttl_seconds)
+
+    async def add(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        """Store value only if key is absent; True if this call stored it"""
+        if self._live(key) is not None:
+            return False
+        self._store(key, value, ttl_seconds)
+        return True
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def ensure_indexes(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class MongoCache:
+    """Cache backend shared by every worker through a Mongo collection.
+
+    A TTL index on expires_at removes stale documents; reads also check the
+    expiry because the TTL monitor only runs about once a minute.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    @staticmethod
+    def _expiry(ttl_seconds: float) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+
+    async def get(self, key: str) -> Optional[Any]:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"value": 1}
+        )
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: Any, ttl_seconds: float):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": self._expiry(ttl_seconds)}},
+            upsert=True
+        )
+
+    async def add(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self.collection.insert_one({"_id": key, "value": value, "expires_at": self._expiry(ttl_seconds)})
+            return True
+        except DuplicateKeyError:
+            # An expired document the TTL monitor has not removed yet does not count
+            taken = await self.collection.find_one_and_update(
+                {"_id": key, "expires_at": {"$lte": datetime.now(timezone.utc)}},
+                {"$set": {"value": value, "expires_at": self._expiry(ttl_seconds)}}
+            )
+            return taken is not None
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+    async def close(self):
+        pass
+
+
+class RedisCache:
+    """Cache backend on a Redis-compatible server (needs the optional redis package)"""
+
+    def __init__(self, url: str, prefix: str = "tourist-safety:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl_seconds: float):
+        await self.client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl_seconds * 1000)))
+
+    async def add(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        stored = await self.client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl_seconds * 1000)), nx=True)
+        return bool(stored)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_cache(backend: str, db=None, redis_url: Optional[str] = None):
+    """Cache backend named by CACHE_BACKEND: memory, mongo or redis"""
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "mongo":
+        return MongoCache(db.shared_cache)
+    if backend == "redis":
+        return RedisCache(redis_url or "redis://localhost:6379/0")
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from geo import bbox_cells, circle_bbox, haversine_km
+from geometry import prepare_geometry
+
+# Version stamp document shared by every worker process
+REGISTRY_META_ID = "global_threats"
+
+# Distinguishes rebuilds that keep the same version (change-stream reloads)
+_build_ids = itertools.count(1)
+
+
+def threat_content_hash(threats: List[Any]) -> str:
+    """Stable short hash of threat records in order, equal on every worker holding the same data"""
+    digest = hashlib.sha1()
+    for threat in threats:
+        digest.update(json.dumps(vars(threat), sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class ThreatIndex:
+    """Immutable lat/lng grid index over threat records.
+
+    Every threat is bucketed into each cell its own circle (or polygon
+    bounding box) overlaps, so a query only has to scan the cells covered by
+    the search radius. Polygon threats are prepared once at build time. Once
+    built the index is never mutated; the registry swaps in a new one.
+    """
+
+    def __init__(self, threats: List[Any], version: int = 0, cell_deg: float = 1.0):
+        self.version = version
+        self.build_id = next(_build_ids)
+        self.built_at = datetime.now(timezone.utc)
+        self.cell_deg = cell_deg
+        self.threats = list(threats)
+        # Change-stream reloads replace the data without moving version
+        self.content_hash = threat_content_hash(self.threats)
+        self.shapes = [prepare_geometry(getattr(t, "geometry", None)) for t in self.threats]
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+        for position, threat in enumerate(self.threats):
+            shape = self.shapes[position]
+            if shape is not None:
+                cells = bbox_cells(shape.bbox, cell_deg)
+            else:
+                cells = self._cells_for(threat.latitude, threat.longitude, threat.radius_km)
+            for cell in cells:
+                self._cells[cell].append(position)
+
+    def __len__(self) -> int:
+        return len(self.threats)
+
+    def _cells_for(self, lat: float, lng: float, radius_km: float):
+        """Grid cells covering the bounding box of a circle"""
+        return bbox_cells(circle_bbox(lat, lng, radius_km), self.cell_deg)
+
+    def candidate_positions(self, lat: float, lng: float, radius_km: float) -> List[int]:
+        """Positions of threats whose cells intersect the search area, in registry order"""
+        positions = set()
+        for cell in self._cells_for(lat, lng, radius_km):
+            positions.update(self._cells.get(cell, ()))
+        return sorted(positions)
+
+    def candidates(self, lat: float, lng: float, radius_km: float) -> List[Any]:
+        """Threats whose cells intersect the search area (unfiltered)"""
+        return [self.threats[p] for p in self.candidate_positions(lat, lng, radius_km)]
+
+    def nearby(self, lat: float, lng: float, radius_km: float) -> List[Any]:
+        """Threats within radius_km of a point, or whose own area covers it"""
+        matches = []
+        for position in self.candidate_positions(lat, lng, radius_km):
+            threat = self.threats[position]
+            shape = self.shapes[position]
+            if shape is not None:
+                if shape.within_km(lat, lng, radius_km):
+                    matches.append(threat)
+                continue
+            distance = haversine_km(lat, lng, threat.latitude, threat.longitude)
+            if distance <= max(radius_km, threat.radius_km):
+                matches.append(threat)
+        return matches
+
+
+class ThreatRegistry:
+    """Threat data loaded from db.global_threats with hot reload.
+
+    The registry polls a version stamp in db.registry_meta (or follows a
+    change stream when the deployment supports one) and rebuilds the
+    spatial index in a worker thread. Readers always see a complete index
+    because the swap is a single reference assignment.
+    """
+
+    def __init__(
+        self,
+        db,
+        build_record: Callable[[Dict[str, Any]], Any],
+        seed_records: Callable[[], List[Dict[str, Any]]],
+        poll_interval: float = 5.0,
+        cell_deg: float = 1.0,
+    ):
+        self.db = db
+        self.build_record = build_record
+        self.seed_records = seed_records
+        self.poll_interval = poll_interval
+        self.cell_deg = cell_deg
+        self._index = ThreatIndex([build_record(r) for r in seed_records()], version=0, cell_deg=cell_deg)
+        self._version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload_lock = asyncio.Lock()
+        self._listeners: List[Callable[[ThreatIndex], None]] = []
+
+    @property
+    def index(self) -> ThreatIndex:
+        return self._index
+
+    @property
+    def version(self) -> int:
+        return self._index.version
+
+    def add_listener(self, callback: Callable[[ThreatIndex], None]):
+        """Register a callback invoked after every index swap"""
+        self._listeners.append(callback)
+
+    def nearby(self, lat: float, lng: float, radius_km: float) -> List[Any]:
+        return self._index.nearby(lat, lng, radius_km)
+
+    async def _read_version(self) -> int:
+        meta = await self.db.registry_meta.find_one({"_id": REGISTRY_META_ID})
+        return int(meta.get("version", 0)) if meta else 0
+
+    async def _seeded(self) -> bool:
+        """Whether the bundled data was ever stored, even if every seeded threat has since been deactivated"""
+        return await self.db.global_threats.find_one({"source": "global_database"}, {"_id": 1}) is not None
+
+    async def bump_version(self) -> int:
+        """Mark the threat collection as changed for every worker"""
+        from pymongo import ReturnDocument
+        meta = await self.db.registry_meta.find_one_and_update(
+            {"_id": REGISTRY_META_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return int(meta["version"])
+
+    async def reload(self, force: bool = False) -> bool:
+        """Rebuild the index if the stored version moved; returns True on swap"""
+        async with self._reload_lock:
+            version = await self._read_version()
+            if not force and version == self._version:
+                return False
+
+            docs = await self.db.global_threats.find({"is_active": {"$ne": False}}, {"_id": 0}).to_list(None)
+            records = [self.build_record(doc) for doc in docs]
+            if not any(doc.get("source") == "global_database" for doc in docs) and not await self._seeded():
+                # Bundled data not initialised in Mongo yet: serve it alongside runtime additions
+                records = [self.build_record(r) for r in self.seed_records()] + records
+
+            loop = asyncio.get_running_loop()
+            index = await loop.run_in_executor(None, ThreatIndex, records, version, self.cell_deg)
+
+            self._index = index
+            self._version = version
+            for callback in self._listeners:
+                try:
+                    callback(index)
+                except Exception as e:
+                    logging.error(f"Threat registry listener error: {str(e)}")
+
+            logging.info(f"Threat registry loaded {len(index)} threats (version {version})")
+            return True
+
+    async def start(self):
+        try:
+            await self.reload(force=True)
+        except Exception as e:
+            logging.error(f"Threat registry initial load error: {str(e)}")
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        from pymongo.errors import OperationFailure
+        try:
+            await self._watch_change_stream()
+        except OperationFailure:
+            # Standalone servers have no change streams; fall back to polling
+            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Threat registry change stream error: {str(e)}")
+        await self._poll()
+
+    async def _watch_change_stream(self):
+        async with self.db.global_threats.watch() as stream:
+            async for _ in stream:
+                # Collapse bursts (e.g. insert_many) into a single rebuild
+                while await stream.try_next() is not None:
+                    pass
+                await self.reload(force=True)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Threat registry poll error: {str(e)}")
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from metrics import REGISTRY, MetricsRegistry
+
+COUNTERS_ID = "tourists"
+
+
+def trip_end_at(trip_end_date: datetime) -> datetime:
+    """trip_end_date as a UTC instant; dates sent without an offset are taken as UTC"""
+    if trip_end_date.tzinfo is None:
+        return trip_end_date.replace(tzinfo=timezone.utc)
+    return trip_end_date.astimezone(timezone.utc)
+
+
+class TripLifecycleSweeper:
+    """Deactivates tourists whose trip has ended and evicts them from worker memory.
+
+    trip_end_date is stored as an ISO string with the client's offset, which
+    does not sort as time, so tourists also carry trip_end_at as a BSON date.
+    Each sweep reads the trips that ended since the previous one through the
+    trip_end_at index, flips them to inactive with one update_many and calls
+    evict with their ids. Every worker sweeps: the first one to get there
+    deactivates the tourists, and all of them evict their own in-memory state.
+
+    Tourist totals are kept in db.counters and adjusted as tourists register
+    and expire, so the dashboard does not count the collection.
+    """
+
+    def __init__(
+        self,
+        db,
+        evict: Callable[[List[str]], None],
+        interval_seconds: float = 60.0,
+        batch_size: int = 1000,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.db = db
+        self.evict = evict
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._swept_until = datetime.now(timezone.utc)
+        self._task: Optional[asyncio.Task] = None
+        self.deactivated = registry.counter(
+            "tourists_deactivated_total", "Tourists deactivated by this worker because their trip ended"
+        )
+        self.evicted = registry.counter(
+            "tourists_evicted_total", "Tourists whose in-memory state this worker dropped after their trip ended"
+        )
+
+    async def ensure_indexes(self):
+        await self.db.tourists.create_index("trip_end_at")
+
+    async def backfill(self) -> int:
+        """Set trip_end_at on active tourists stored before it existed"""
+        updated = 0
+        async for tourist in self.db.tourists.find(
+            {"is_active": True, "trip_end_at": {"$exists": False}}, {"_id": 0, "id": 1, "trip_end_date": 1}
+        ):
+            end = trip_end_at(datetime.fromisoformat(tourist["trip_end_date"]))
+            await self.db.tourists.update_one({"id": tourist["id"]}, {"$set": {"trip_end_at": end}})
+            updated += 1
+        return updated
+
+    async def seed_counters(self):
+        """Count tourists once if the counters document does not exist yet"""
+        if await self.db.counters.find_one({"_id": COUNTERS_ID}):
+            return
+        total = await self.db.tourists.count_documents({})
+        active = await self.db.tourists.count_documents({"is_active": True})
+        await self.db.counters.update_one(
+            {"_id": COUNTERS_ID}, {"$setOnInsert": {"total": total, "active": active}}, upsert=True
+        )
+
+    async def registered(self):
+        await self.db.counters.update_one({"_id": COUNTERS_ID}, {"$inc": {"total": 1, "active": 1}}, upsert=True)
+
+    async def counters(self) -> Dict[str, int]:
+        doc = await self.db.counters.find_one({"_id": COUNTERS_ID}) or {}
+        return {"total": doc.get("total", 0), "active": doc.get("active", 0)}
+
+    async def start(self):
+        # Inactive tourists whose trip ended before startup were never loaded into memory
+        self._swept_until = datetime.now(timezone.utc)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self, now: Optional[datetime] = None) -> int:
+        """Deactivate and evict every trip that ended since the last sweep; returns tourists evicted"""
+        now = now or datetime.now(timezone.utc)
+        evicted = 0
+        while True:
+            # Active tourists whose trip ended at any time, plus ones another worker just deactivated
+            ended = await self.db.tourists.find(
+                {"trip_end_at": {"$lte": now}, "$or": [
+                    {"is_active": True},
+                    {"trip_end_at": {"$gt": self._swept_until}},
+                ]},
+                {"_id": 0, "id": 1, "trip_end_at": 1}
+            ).sort("trip_end_at", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not ended:
+                break
+            ids = [tourist["id"] for tourist in ended]
+            result = await self.db.tourists.update_many(
+                {"id": {"$in": ids}, "is_active": True}, {"$set": {"is_active": False}}
+            )
+            if result.modified_count:
+                await self.db.counters.update_one(
+                    {"_id": COUNTERS_ID}, {"$inc": {"active": -result.modified_count}}, upsert=True
+                )
+                self.deactivated.inc(result.modified_count)
+            self.evict(ids)
+            self.evicted.inc(len(ids))
+            evicted += len(ids)
+            last = ended[-1]["trip_end_at"]
+            self._swept_until = max(self._swept_until, last if last.tzinfo else last.replace(tzinfo=timezone.utc))
+            if len(ended) < self.batch_size:
+                break
+        self._swept_until = max(self._swept_until, now)
+        return evicted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                count = await self.sweep()
+                if count:
+                    logging.info(f"Trip lifecycle: evicted {count} tourists whose trip ended")
+            except Exception as e:
+                logging.error(f"Trip lifecycle sweep error: {str(e)}")
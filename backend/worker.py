@@ -0,0 +1,35 @@
+"""Run durable background jobs (E-FIRs, safety analysis) outside the API process.
+
+    python worker.py
+
+Start the API with JOB_WORKERS_IN_API=false to leave all jobs to these
+processes, or run both to add capacity; jobs are claimed under a lease, so
+any number of workers can share the queue.
+"""
+import asyncio
+import logging
+import signal
+
+import server
+
+
+async def main():
+    server.connect_database()
+    await server.threat_registry.start()
+    await server.start_durable_jobs(True)
+    logging.info(f"Job worker {server.durable_jobs.worker_id} started on lanes {sorted(server.durable_jobs.lanes)}")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    await stopping.wait()
+
+    await server.durable_jobs.stop()
+    await server.threat_registry.stop()
+    await server.shared_cache.close()
+    server.db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -650,6 +650,50 @@ const AdminDashboard = () => {
     loadAdminData();
   }, []);
 
+  // Live deltas from the backend event bus instead of re-polling
+  useEffect(() => {
+    const source = new EventSource(`${API}/admin/events/stream?topics=alert,tourist`);
+
+    const handleEvent = (handler) => (message) => {
+      const event = JSON.parse(message.data);
+      if (event.dropped) {
+        // This console fell behind; resync with one full fetch
+        loadAdminData();
+        return;
+      }
+      handler(event.data);
+    };
+
+    const updateOverview = (changes) => {
+      setDashboardData((current) => current && {
+        ...current,
+        overview: Object.keys(changes).reduce(
+          (overview, key) => ({ ...overview, [key]: (overview[key] || 0) + changes[key] }),
+          current.overview
+        )
+      });
+    };
+
+    source.addEventListener('alert.created', handleEvent((alert) => {
+      setAlerts((current) => [alert, ...current].slice(0, 10));
+      updateOverview({ total_alerts: 1, active_alerts: 1 });
+    }));
+
+    source.addEventListener('alert.resolved', handleEvent((update) => {
+      setAlerts((current) => current.map((alert) => (
+        alert.id === update.id ? { ...alert, status: update.status, resolved_at: update.resolved_at } : alert
+      )));
+      updateOverview(update.status === 'resolved' ? { active_alerts: -1, resolved_alerts: 1 } : { active_alerts: -1 });
+    }));
+
+    source.addEventListener('tourist.registered', handleEvent((tourist) => {
+      setTourists((current) => [tourist, ...current].slice(0, 10));
+      updateOverview({ total_tourists: 1, active_tourists: 1 });
+    }));
+
+    return () => source.close();
+  }, []);
+
   const loadAdminData = async () => {
     try {
       const [statsResponse, touristsResponse, alertsResponse] = await Promise.all([
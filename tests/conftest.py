@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# The backend is a flat set of modules imported by name, as server.py does
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def mongo():
+    """A fresh in-memory database per test; the same stand-in benchmark.py uses"""
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()["test"]
@@ -0,0 +1,97 @@
+import asyncio
+
+from admission import AdmissionController
+from metrics import MetricsRegistry
+
+
+def make_controller(capacity, **classes):
+    controller = AdmissionController(capacity, registry=MetricsRegistry())
+    for name, (priority, limit, queue_seconds) in classes.items():
+        controller.add_class(name, priority, limit, queue_seconds)
+    return controller
+
+
+def outcomes(controller, name):
+    return {values[1]: child.value for values, child in controller.requests.children() if values[0] == name}
+
+
+def test_requests_within_limits_are_admitted_at_once():
+    async def run():
+        controller = make_controller(4, location=(1, 2, 1.0), route=(2, 2, 1.0))
+        granted = [await controller.acquire(name) for name in ("location", "location", "route", "route")]
+        summary = controller.summary()
+        for name in ("location", "location", "route", "route"):
+            controller.release(name)
+        return granted, summary, controller.in_use
+
+    granted, summary, in_use = asyncio.run(run())
+    assert granted == [True] * 4
+    assert summary["in_use"] == 4 and summary["classes"]["route"]["running"] == 2
+    assert in_use == 0
+
+
+def test_freed_capacity_goes_to_the_highest_priority_waiter():
+    order = []
+
+    async def waiter(controller, name):
+        async with controller.slot(name) as admitted:
+            order.append((name, admitted))
+
+    async def run():
+        controller = make_controller(1, location=(1, 4, 1.0), route=(2, 4, 1.0))
+        assert await controller.acquire("route")
+        # Route queued first, location second; location still goes first
+        tasks = [asyncio.create_task(waiter(controller, "route")), asyncio.create_task(waiter(controller, "location"))]
+        await asyncio.sleep(0)
+        controller.release("route")
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == [("location", True), ("route", True)]
+
+
+def test_waiter_blocked_by_its_class_limit_does_not_hold_up_others():
+    async def run():
+        controller = make_controller(4, location=(1, 1, 1.0), route=(2, 4, 1.0))
+        assert await controller.acquire("location")
+        blocked = asyncio.create_task(controller.acquire("location"))
+        await asyncio.sleep(0)
+        # Capacity is free; only the location class is full
+        assert await controller.acquire("route")
+        controller.release("route")
+        assert not blocked.done()
+        controller.release("location")
+        return await blocked
+
+    assert asyncio.run(run()) is True
+
+
+def test_full_queue_and_deadline_shed():
+    async def run():
+        controller = make_controller(1, route=(2, 1, 0.01))
+        controller.classes["route"].max_waiting = 1
+        assert await controller.acquire("route")
+        late = asyncio.create_task(controller.acquire("route"))
+        await asyncio.sleep(0)
+        assert await controller.acquire("route") is False
+        assert await late is False
+        return controller
+
+    controller = asyncio.run(run())
+    assert outcomes(controller, "route") == {"admitted": 1, "shed_queue_full": 1, "shed_deadline": 1}
+    assert controller.classes["route"].waiting == 0
+
+
+def test_cancelled_waiter_hands_its_slot_on():
+    async def run():
+        controller = make_controller(1, location=(1, 2, 1.0))
+        assert await controller.acquire("location")
+        first = asyncio.create_task(controller.acquire("location"))
+        second = asyncio.create_task(controller.acquire("location"))
+        await asyncio.sleep(0)
+        first.cancel()
+        controller.release("location")
+        await asyncio.gather(first, return_exceptions=True)
+        return await second, controller.in_use
+
+    assert asyncio.run(run()) == (True, 1)
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from advisory_cache import AdvisoryCache
+from geo import geohash_bbox
+from metrics import MetricsRegistry
+
+LAT, LNG = 28.61, 77.21
+
+
+class Generator:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self, lat, lng):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"location": "Delhi", "advisories": [f"advisory {self.calls}"]}
+
+
+def make_cache(mongo, generate, **kwargs):
+    return AdvisoryCache(mongo, generate, registry=MetricsRegistry(), **kwargs)
+
+
+async def store_previous_bucket(mongo, cache):
+    cell, _ = geohash_bbox(LAT, LNG, cache.precision)
+    bucket = int(time.time() // cache.bucket_seconds)
+    key = cache._key(cell, bucket - 1)
+    await mongo.advisories.insert_one({
+        "cache_key": key, "location": "Delhi", "advisories": ["old"],
+        "generated_at": datetime.now(timezone.utc), "expires_at": datetime.now(timezone.utc) + timedelta(hours=1),
+    })
+    return key
+
+
+def test_concurrent_misses_share_one_generation(mongo):
+    generate = Generator(delay=0.01)
+
+    async def run():
+        cache = make_cache(mongo, generate)
+        results = await asyncio.gather(*[cache.get(LAT, LNG) for _ in range(5)])
+        assert {result for _, result in results} == {"miss"}
+        return await cache.get(LAT, LNG)
+
+    entry, result = asyncio.run(run())
+    assert result == "hit" and entry["advisories"] == ["advisory 1"]
+    assert generate.calls == 1
+
+
+def test_stale_entry_is_served_while_refreshing(mongo):
+    generate = Generator()
+
+    async def run():
+        cache = make_cache(mongo, generate)
+        await store_previous_bucket(mongo, cache)
+        entry, result = await cache.get(LAT, LNG)
+        assert (entry["advisories"], result) == (["old"], "stale")
+        await asyncio.gather(*cache._inflight.values())
+        return await cache.get(LAT, LNG)
+
+    entry, result = asyncio.run(run())
+    assert (entry["advisories"], result) == (["advisory 1"], "hit")
+
+
+def test_miss_does_not_wait_on_a_refresh_that_lost_its_claim(mongo):
+    generate = Generator()
+
+    async def lost(key, ttl):
+        return False
+
+    async def run():
+        cache = make_cache(mongo, generate, claim=lost)
+        previous = await store_previous_bucket(mongo, cache)
+        await cache.get(LAT, LNG)
+        # The stale entry vanishes while the refresh is still in flight
+        await mongo.advisories.delete_many({})
+        await cache.recent.delete(previous)
+        return await cache.get(LAT, LNG)
+
+    entry, result = asyncio.run(run())
+    assert result == "miss"
+    assert entry["advisories"] == ["advisory 1"]
+
+
+def test_cold_miss_without_admission_is_shed(mongo):
+    generate = Generator()
+
+    @asynccontextmanager
+    async def full():
+        yield False
+
+    async def run():
+        cache = make_cache(mongo, generate, admission=full)
+        return await cache.get(LAT, LNG)
+
+    assert asyncio.run(run()) == ({"location": "", "advisories": []}, "shed")
+    assert generate.calls == 0
+
+
+def test_failed_generation_is_not_cached(mongo):
+    async def failing(lat, lng):
+        raise RuntimeError("LLM down")
+
+    async def run():
+        cache = make_cache(mongo, failing)
+        assert await cache.get(LAT, LNG) == ({"location": "", "advisories": []}, "miss")
+        return await mongo.advisories.count_documents({})
+
+    assert asyncio.run(run()) == 0
+
+
+def test_failed_refresh_gives_its_claim_back(mongo):
+    claims = set()
+    outcomes = iter([RuntimeError("LLM down"), {"location": "Delhi", "advisories": ["fresh"]}])
+
+    async def flaky(lat, lng):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def claim(key, ttl):
+        if key in claims:
+            return False
+        claims.add(key)
+        return True
+
+    async def release(key):
+        claims.discard(key)
+
+    async def run():
+        cache = make_cache(mongo, flaky, claim=claim, release=release)
+        await store_previous_bucket(mongo, cache)
+        for _ in range(2):
+            assert (await cache.get(LAT, LNG))[1] == "stale"
+            await asyncio.gather(*cache._inflight.values())
+        return await cache.get(LAT, LNG)
+
+    entry, result = asyncio.run(run())
+    assert (entry["advisories"], result) == (["fresh"], "hit")
+    assert len(claims) == 1
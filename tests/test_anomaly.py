@@ -0,0 +1,103 @@
+from anomaly import (
+    IMPOSSIBLE_JUMP, PROLONGED_STILLNESS, ROUTE_DEVIATION, AnomalyDetector, distance_to_path_km,
+)
+from geo import KM_PER_DEGREE
+
+
+def kinds(anomalies):
+    return [a.kind for a in anomalies]
+
+
+def walk(detector, tourist_id, start_ts, fixes, step_seconds=60, lat=28.6, lng=77.2, step_deg=0.0005):
+    """Walk north at about 3 km/h; returns every anomaly raised"""
+    raised = []
+    for i in range(fixes):
+        raised += detector.update(tourist_id, lat + i * step_deg, lng, start_ts + i * step_seconds)
+    return raised
+
+
+def test_normal_walk_raises_nothing():
+    detector = AnomalyDetector()
+    assert walk(detector, "t1", 0, 50) == []
+    stats = detector.stats("t1")
+    assert stats["fixes"] == 50
+    assert 2.0 < stats["speed_mean_kmh"] < 5.0
+    assert stats["heading_deg"] < 1.0 or stats["heading_deg"] > 359.0
+
+
+def test_impossible_jump_is_reported_once_and_resets_the_track():
+    detector = AnomalyDetector()
+    walk(detector, "t1", 0, 10)
+    # Delhi to Mumbai in ten minutes
+    assert kinds(detector.update("t1", 19.07, 72.87, 600 + 600)) == [IMPOSSIBLE_JUMP]
+    assert detector.update("t1", 19.0705, 72.87, 600 + 660) == []
+    assert detector.stats("t1")["fixes"] == 2
+
+
+def test_short_fast_hop_is_not_a_jump():
+    detector = AnomalyDetector(min_jump_km=5.0)
+    detector.update("t1", 28.6, 77.2, 0)
+    # 2 km in 1 second is absurd but below the minimum jump distance (GPS noise)
+    assert detector.update("t1", 28.618, 77.2, 1) == []
+
+
+def test_out_of_order_fixes_are_ignored():
+    detector = AnomalyDetector()
+    detector.update("t1", 28.6, 77.2, 100)
+    assert detector.update("t1", 10.0, 10.0, 50) == []
+    assert detector.stats("t1")["fixes"] == 1
+
+
+def test_stillness_is_reported_once_per_episode():
+    detector = AnomalyDetector(still_seconds=3600, still_radius_km=0.2)
+    raised = []
+    for minute in range(0, 181, 10):
+        raised += detector.update("t1", 28.6, 77.2, minute * 60)
+    assert kinds(raised) == [PROLONGED_STILLNESS]
+
+    # Moving away starts a new episode
+    raised = walk(detector, "t1", 181 * 60, 10, step_deg=0.01)
+    for minute in range(0, 61, 10):
+        raised += detector.update("t1", 30.0, 77.2, 20000 + minute * 60)
+    assert kinds(raised) == [PROLONGED_STILLNESS]
+
+
+def test_route_deviation_with_hysteresis():
+    detector = AnomalyDetector(route_deviation_km=100.0)
+    detector.set_plan("t1", [(28.6, 77.2), (26.9, 75.8)])
+    assert detector.has_plan("t1")
+
+    raised = []
+    # Drift east slowly: 0.5 degrees (about 50 km) per step, an hour apart
+    for step in range(6):
+        raised += detector.update("t1", 28.6, 77.2 + step * 0.5, step * 3600)
+    assert kinds(raised) == [ROUTE_DEVIATION]
+    assert detector.stats("t1")["off_route"]
+
+    # Back near the plan, then out again: a second episode
+    raised = detector.update("t1", 28.6, 77.3, 7 * 3600)
+    assert raised == [] and not detector.stats("t1")["off_route"]
+    raised = detector.update("t1", 28.6, 79.0, 9 * 3600)
+    assert kinds(raised) == [ROUTE_DEVIATION]
+
+
+def test_empty_plan_disables_route_checks():
+    detector = AnomalyDetector(route_deviation_km=1.0)
+    detector.set_plan("t1", [])
+    assert detector.update("t1", 0.0, 0.0, 0) == []
+
+
+def test_forget_drops_the_track():
+    detector = AnomalyDetector()
+    walk(detector, "t1", 0, 3)
+    walk(detector, "t2", 0, 3)
+    detector.forget("t1")
+    assert len(detector) == 1
+    assert detector.stats("t1") is None
+
+
+def test_distance_to_path():
+    path = [(0.0, 0.0), (0.0, 1.0)]
+    assert abs(distance_to_path_km(0.5, 0.5, path) - 0.5 * KM_PER_DEGREE) < 0.5
+    assert abs(distance_to_path_km(0.0, 2.0, path) - KM_PER_DEGREE) < 0.5
+    assert distance_to_path_km(0.0, 0.5, path) < 1e-9
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from database import CommandMetrics, PoolMetrics, command_summary, create_client, pool_summary
+from metrics import MetricsRegistry
+
+ADDRESS = ("mongo", 27017)
+
+
+def command_event(name, command, request_id=1, duration_micros=2000):
+    return SimpleNamespace(command_name=name, command=command, request_id=request_id, connection_id=ADDRESS,
+                           duration_micros=duration_micros)
+
+
+def test_commands_are_timed_per_collection():
+    registry = MetricsRegistry()
+    listener = CommandMetrics(registry)
+    listener.started(command_event("find", {"find": "tourists"}, request_id=1))
+    listener.started(command_event("getMore", {"getMore": 42, "collection": "locations"}, request_id=2))
+    listener.started(command_event("ping", {"ping": 1}, request_id=3))
+    listener.succeeded(command_event("find", {}, request_id=1, duration_micros=500_000))
+    listener.failed(command_event("getMore", {}, request_id=2))
+    listener.succeeded(command_event("ping", {}, request_id=3))
+
+    rows = command_summary(registry)
+    assert [(row["collection"], row["command"], row["count"]) for row in rows][0] == ("tourists", "find", 1)
+    assert {(row["collection"], row["command"]) for row in rows} == {
+        ("tourists", "find"), ("locations", "getMore"), ("", "ping")
+    }
+    assert listener.failures.labels("locations", "getMore").value == 1
+    assert listener._inflight == {}
+
+
+def test_pool_tracks_connections_in_use_and_checkout_waits():
+    registry = MetricsRegistry()
+    listener = PoolMetrics(registry)
+    event = SimpleNamespace(address=ADDRESS, reason="timeout")
+    for _ in range(2):
+        listener.connection_created(event)
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+    listener.connection_checked_in(event)
+    listener.connection_check_out_started(event)
+    listener.connection_check_out_failed(event)
+
+    summary = pool_summary(registry)["mongo:27017"]
+    assert (summary["open"], summary["in_use"]) == (2, 1)
+    assert summary["checkout_wait"]["count"] == 3
+    assert listener.checkout_failures.labels("mongo:27017", "timeout").value == 1
+
+
+def test_client_uses_the_configured_pool():
+    client = create_client("mongodb://localhost:27017", max_pool_size=7, min_pool_size=2,
+                           wait_queue_timeout_ms=250, write_concern="majority", registry=MetricsRegistry())
+    try:
+        pool = client.delegate.options.pool_options
+        assert (pool.max_pool_size, pool.min_pool_size, pool.wait_queue_timeout) == (7, 2, 0.25)
+        assert client.write_concern.document == {"w": "majority"}
+    finally:
+        client.close()
@@ -0,0 +1,54 @@
+import asyncio
+
+from events import EventBus
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(asyncio.run(subscription.next()))
+    return events
+
+
+def test_events_reach_matching_subscribers_only():
+    bus = EventBus()
+    everything = bus.subscribe()
+    alerts = bus.subscribe(["alert"])
+    locations = bus.subscribe(["location.updated"])
+    bus.publish("alert.created", {"id": "a1"})
+    bus.publish("location.updated", {"tourist_id": "t1"})
+    bus.publish("location.deleted", {"tourist_id": "t1"})
+    assert [e["topic"] for e in drain(everything)] == ["alert.created", "location.updated", "location.deleted"]
+    assert [e["topic"] for e in drain(alerts)] == ["alert.created"]
+    assert [e["topic"] for e in drain(locations)] == ["location.updated"]
+
+
+def test_slow_subscriber_drops_oldest_and_reports_it():
+    bus = EventBus(max_queue=3)
+    subscription = bus.subscribe()
+    for i in range(5):
+        bus.publish("alert.created", {"n": i})
+    events = drain(subscription)
+    assert [e["data"]["n"] for e in events] == [2, 3, 4]
+    assert events[0]["dropped"] == 2
+    assert "dropped" not in events[1]
+
+
+def test_reconnect_replays_events_after_last_id():
+    bus = EventBus(replay_size=3)
+    ids = [bus.publish("alert.created", {"n": i})["id"] for i in range(5)]
+    bus.publish("location.updated", {})
+    resumed = bus.subscribe(["alert"], last_event_id=ids[2])
+    assert [e["data"]["n"] for e in drain(resumed)] == [3, 4]
+    # Events that fell out of the replay buffer are not replayed
+    assert [e["data"].get("n") for e in drain(bus.subscribe(last_event_id=0))] == [3, 4, None]
+
+
+def test_unsubscribed_console_gets_nothing():
+    bus = EventBus()
+    subscription = bus.subscribe()
+    bus.unsubscribe(subscription)
+    bus.unsubscribe(subscription)
+    bus.publish("alert.created", {})
+    assert bus.subscriber_count == 0
+    assert bus.queued == 0 and subscription.queue.empty()
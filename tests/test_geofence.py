@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+from geofence import DWELL, ENTER, EXIT, Fence, GeofenceEngine
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def fence(fence_id, lat, lng, radius_km=1.0, level=5):
+    return Fence(fence_id, fence_id.title(), "threat", level, lat, lng, radius_km)
+
+
+def events(engine, tourist_id, lat, lng, seconds):
+    return [(e.fence_id, e.event) for e in engine.update(tourist_id, lat, lng, START + timedelta(seconds=seconds))]
+
+
+def test_enter_dwell_exit_are_reported_once():
+    engine = GeofenceEngine(dwell_seconds=60)
+    engine.set_fences("threats", [fence("market", 28.6, 77.2)])
+
+    assert events(engine, "t1", 28.0, 77.0, 0) == []
+    assert events(engine, "t1", 28.6, 77.2, 10) == [("market", ENTER)]
+    assert events(engine, "t1", 28.601, 77.2, 30) == []
+    assert events(engine, "t1", 28.601, 77.2, 70) == [("market", DWELL)]
+    assert events(engine, "t1", 28.602, 77.2, 200) == []
+    assert events(engine, "t1", 28.0, 77.0, 210) == [("market", EXIT)]
+    assert [f.id for f in engine.memberships("t1")] == []
+
+
+def test_tourists_are_tracked_independently():
+    engine = GeofenceEngine()
+    engine.set_fences("threats", [fence("market", 28.6, 77.2)])
+    assert events(engine, "t1", 28.6, 77.2, 0) == [("market", ENTER)]
+    assert events(engine, "t2", 28.6, 77.2, 0) == [("market", ENTER)]
+    assert engine.tracked_tourists() == 2
+
+    engine.forget("t1")
+    assert engine.tracked_tourists() == 1
+    # Forgotten state starts over
+    assert events(engine, "t1", 28.6, 77.2, 5) == [("market", ENTER)]
+
+
+def test_replacing_a_source_exits_removed_fences():
+    engine = GeofenceEngine()
+    engine.set_fences("threats", [fence("market", 28.6, 77.2)])
+    engine.set_fences("advisories", [fence("flood", 28.6, 77.2, radius_km=5)])
+    assert sorted(events(engine, "t1", 28.6, 77.2, 0)) == [("flood", ENTER), ("market", ENTER)]
+
+    engine.set_fences("advisories", [])
+    assert events(engine, "t1", 28.6, 77.2, 5) == [("flood", EXIT)]
+    assert [f.id for f in engine.memberships("t1")] == ["market"]
+
+
+def test_fence_spanning_grid_cells_is_found_from_each():
+    engine = GeofenceEngine(cell_deg=0.5)
+    # Centred on a cell corner, so it overlaps four cells
+    engine.set_fences("threats", [fence("corner", 28.5, 77.5, radius_km=20)])
+    for lat, lng in [(28.45, 77.45), (28.55, 77.45), (28.45, 77.55), (28.55, 77.55)]:
+        engine.forget("t1")
+        assert events(engine, "t1", lat, lng, 0) == [("corner", ENTER)]
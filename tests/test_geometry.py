@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from geo import KM_PER_DEGREE
+from geofence import ENTER, GeofenceEngine, PolygonFence
+from geometry import prepare_geometry
+
+SQUARE = [[10, 10], [11, 10], [11, 11], [10, 11], [10, 10]]
+HOLE = [[10.4, 10.4], [10.6, 10.4], [10.6, 10.6], [10.4, 10.6], [10.4, 10.4]]
+
+
+def test_polygon_with_hole():
+    shape = prepare_geometry({"type": "Polygon", "coordinates": [SQUARE, HOLE]})
+    assert shape.contains(10.2, 10.2)
+    assert not shape.contains(10.5, 10.5)
+    assert not shape.contains(11.2, 10.5)
+    assert shape.bbox == (10.0, 10.0, 11.0, 11.0)
+
+
+def test_multipolygon_contains_either_part():
+    far = [[20, 20], [21, 20], [21, 21], [20, 21], [20, 20]]
+    shape = prepare_geometry({"type": "MultiPolygon", "coordinates": [[SQUARE], [far]]})
+    assert shape.contains(10.5, 10.5)
+    assert shape.contains(20.5, 20.5)
+    assert not shape.contains(15.0, 15.0)
+    assert shape.bbox == (10.0, 10.0, 21.0, 21.0)
+
+
+def test_concave_polygon_with_many_bands():
+    # A comb: teeth pointing north from a base strip, enough edges to split into bands
+    ring = [[0, 0]]
+    for tooth in range(20):
+        ring += [[tooth + 0.2, 0], [tooth + 0.2, 1], [tooth + 0.8, 1], [tooth + 0.8, 0]]
+    ring += [[20, 0], [20, -0.5], [0, -0.5], [0, 0]]
+    shape = prepare_geometry({"type": "Polygon", "coordinates": [ring]})
+    assert len(shape.polygons[0].exterior.bands) > 1
+    assert shape.contains(0.5, 3.5)
+    assert not shape.contains(0.5, 3.1)
+    assert shape.contains(-0.25, 3.1)
+
+
+@pytest.mark.parametrize("lat, lng", [(11.05, 10.5), (9.95, 10.5), (10.5, 11.05), (10.5, 9.95)])
+def test_distance_to_each_side(lat, lng):
+    shape = prepare_geometry({"type": "Polygon", "coordinates": [SQUARE]})
+    expected = 0.05 * KM_PER_DEGREE
+    if lat == 10.5:
+        # Longitude degrees shrink with latitude
+        expected *= 0.98481
+    assert shape.distance_km(lat, lng) == pytest.approx(expected, rel=0.01)
+    assert shape.within_km(lat, lng, expected * 1.05)
+    assert not shape.within_km(lat, lng, expected * 0.95)
+
+
+def test_distance_is_zero_inside():
+    shape = prepare_geometry({"type": "Polygon", "coordinates": [SQUARE]})
+    assert shape.distance_km(10.5, 10.5) == 0.0
+
+
+def test_non_polygon_geometry_is_ignored():
+    assert prepare_geometry(None) is None
+    assert prepare_geometry({"type": "Point", "coordinates": [10, 10]}) is None
+
+
+def test_degenerate_ring_is_rejected():
+    with pytest.raises(ValueError):
+        prepare_geometry({"type": "Polygon", "coordinates": [[[10, 10], [11, 11], [10, 10]]]})
+
+
+def test_polygon_fence_follows_the_shape_not_the_circle():
+    shape = prepare_geometry({"type": "Polygon", "coordinates": [SQUARE, HOLE]})
+    engine = GeofenceEngine()
+    engine.set_fences("threats", [PolygonFence("zone", "Zone", "threat", 8, 10.5, 10.5, 1.0, shape)])
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert engine.update("t1", 10.5, 10.5, now) == []
+    assert [e.event for e in engine.update("t1", 10.9, 10.9, now)] == [ENTER]
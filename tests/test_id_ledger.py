@@ -0,0 +1,215 @@
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from id_ledger import IDLedger, fold_proof, leaf_hash, merkle_tree
+from metrics import MetricsRegistry
+
+
+def make_ledger(mongo, **kwargs):
+    return IDLedger(mongo, registry=MetricsRegistry(), **kwargs)
+
+
+def payload(i):
+    return {"id": f"t{i}", "name": f"Tourist {i}", "phone": "+91 98765 43210",
+            "valid_until": "2026-06-01T00:00:00", "issued_at": "2026-05-01T00:00:00"}
+
+
+async def register(ledger, count, start=0):
+    for i in range(start, start + count):
+        await ledger.append(f"t{i}", payload(i))
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13, 100])
+def test_every_proof_folds_to_the_root(count):
+    rng = random.Random(count)
+    leaves = [f"{rng.getrandbits(256):064x}" for _ in range(count)]
+    root, proofs = merkle_tree(leaves)
+    assert all(fold_proof(leaf, proof) == root for leaf, proof in zip(leaves, proofs))
+    assert max(len(proof) for proof in proofs) <= math.ceil(math.log2(count))
+
+
+def test_proof_does_not_fold_for_another_leaf_or_order():
+    leaves = [f"{i:064x}" for i in range(1, 6)]
+    root, proofs = merkle_tree(leaves)
+    assert fold_proof(leaves[1], proofs[0]) != root
+    swapped = [("l" if side == "r" else "r", sibling) for side, sibling in proofs[0]]
+    assert fold_proof(leaves[0], swapped) != root
+    assert fold_proof(leaves[0], proofs[0][:-1]) != root
+
+
+def test_leaf_hash_covers_only_card_fields():
+    card = payload(1)
+    assert leaf_hash(dict(card, blockchain_hash="ignored")) == leaf_hash(card)
+    assert leaf_hash(dict(card, name="Mallory")) != leaf_hash(card)
+
+
+def test_sealed_ids_verify(mongo):
+    async def run():
+        ledger = make_ledger(mongo, max_batch=4)
+        await ledger.ensure_indexes()
+        await register(ledger, 6)
+        assert (await ledger.verify(payload(0)))["reason"] == "pending"
+        assert [await ledger.seal() for _ in range(3)] == [4, 2, 0]
+
+        result = await ledger.verify(payload(5))
+        assert result["valid"] and result["batch"] == 1
+        stored = await ledger.proof("t5")
+        assert (await ledger.verify(payload(5), stored["proof"], stored["batch"]))["reason"] == "valid"
+        assert (await ledger.verify(dict(payload(5), name="Mallory")))["reason"] == "payload_mismatch"
+        assert (await ledger.verify(dict(payload(5), name="Mallory"), stored["proof"], 1))["reason"] == "proof_mismatch"
+        assert (await ledger.verify(payload(99)))["reason"] == "unknown_id"
+        return await ledger.verify_chain()
+
+    chain = asyncio.run(run())
+    assert chain["valid"] and chain["batches"] == 2
+
+
+def test_verify_chain_finds_a_rewritten_batch(mongo):
+    async def run():
+        ledger = make_ledger(mongo, max_batch=2)
+        await ledger.ensure_indexes()
+        await register(ledger, 6)
+        while await ledger.seal():
+            pass
+        chain = await ledger.verify_chain()
+        assert chain["valid"] and chain["batches"] == 3
+        await mongo.id_ledger_batches.update_one({"_id": 1}, {"$set": {"root": "0" * 64}})
+        return await ledger.verify_chain()
+
+    assert asyncio.run(run()) == {"valid": False, "batches": 1, "broken_at": 1}
+
+
+def test_racing_sealers_never_share_leaves(mongo):
+    async def run():
+        first, second = make_ledger(mongo), make_ledger(mongo)
+        await first.ensure_indexes()
+        await register(first, 10)
+        original = first._stamped
+
+        async def stamped_then_raced(token):
+            # More IDs arrive and a second worker seals the same batch number while the first builds its tree
+            leaves = await original(token)
+            await register(first, 5, start=10)
+            assert await second.seal() == 5
+            return leaves
+
+        first._stamped = stamped_then_raced
+        assert await first.seal() == 0
+        first._stamped = original
+        assert await first.seal() == 10
+        return [await first.verify(payload(i)) for i in range(15)], await first.verify_chain()
+
+    results, chain = asyncio.run(run())
+    assert all(r["valid"] for r in results)
+    assert [r["batch"] for r in results] == [1] * 10 + [0] * 5
+    assert chain["valid"] and chain["batches"] == 2
+
+
+def test_loser_of_the_batch_insert_releases_its_leaves(mongo):
+    async def run():
+        ledger = make_ledger(mongo)
+        await ledger.ensure_indexes()
+        await register(ledger, 3)
+        # Another worker inserts batch 0 between this one's stamping and its insert
+        original = ledger._stamped
+
+        async def stamped_then_raced(token):
+            leaves = await original(token)
+            await mongo.id_ledger_batches.insert_one({"_id": 0, "root": "x", "prev_hash": "0" * 64, "hash": "y", "count": 0})
+            ledger._stamped = original
+            return leaves
+
+        ledger._stamped = stamped_then_raced
+        assert await ledger.seal() == 0
+        leaves = await mongo.id_ledger_leaves.find({}, {"_id": 0}).to_list(None)
+        assert all(leaf["seal"] is None and leaf["batch"] is None and "proof" not in leaf for leaf in leaves)
+        assert await ledger.seal() == 3
+        return (await ledger.proof("t0"))["batch"]
+
+    assert asyncio.run(run()) == 1
+
+
+def test_interrupted_seals_are_finished_or_released(mongo):
+    async def run():
+        ledger = make_ledger(mongo)
+        await ledger.ensure_indexes()
+        await register(ledger, 4)
+        await ledger.seal()
+        # Batch 0 was inserted but its proofs never written; a later seal stamped leaves and died
+        expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await mongo.id_ledger_leaves.update_many(
+            {"tourist_id": {"$in": ["t0", "t1"]}},
+            {"$set": {"batch": None, "lease_until": expired}, "$unset": {"proof": "", "index": ""}}
+        )
+        await register(ledger, 2, start=4)
+        await mongo.id_ledger_leaves.update_many(
+            {"tourist_id": {"$in": ["t4", "t5"]}}, {"$set": {"seal": "dead", "lease_until": expired}}
+        )
+        assert await ledger.seal() == 2
+        return [await ledger.verify(payload(i)) for i in range(6)]
+
+    results = asyncio.run(run())
+    assert all(r["valid"] for r in results)
+    assert [r["batch"] for r in results] == [0, 0, 0, 0, 1, 1]
+
+
+def test_slow_seal_keeps_its_leaves_while_its_lease_holds(mongo):
+    async def run():
+        ledger = make_ledger(mongo)
+        await ledger.ensure_indexes()
+        await register(ledger, 3)
+        # Stamped long after queueing by a live worker whose lease has not run out
+        await mongo.id_ledger_leaves.update_many(
+            {"tourist_id": {"$in": ["t0", "t1"]}},
+            {"$set": {"seal": "slow", "lease_until": datetime.now(timezone.utc) + timedelta(seconds=30)}}
+        )
+        assert await ledger.seal() == 1
+        return await mongo.id_ledger_leaves.count_documents({"seal": "slow", "batch": None})
+
+    assert asyncio.run(run()) == 2
+
+
+def test_sealer_whose_lease_ran_out_gives_up_its_batch(mongo):
+    async def run():
+        ledger = make_ledger(mongo, lease_seconds=0.0)
+        await ledger.ensure_indexes()
+        await register(ledger, 3)
+        assert await ledger.seal() == 0
+        leaves = await mongo.id_ledger_leaves.find({}, {"_id": 0}).to_list(None)
+        assert all(leaf["seal"] is None and "lease_until" not in leaf for leaf in leaves)
+        ledger.lease_seconds = 60.0
+        return await mongo.id_ledger_batches.count_documents({}), await ledger.seal()
+
+    assert asyncio.run(run()) == (0, 3)
+
+
+def test_each_batch_number_is_claimed(mongo):
+    claimed = []
+
+    async def claim(key, ttl_seconds):
+        if key in claimed:
+            return False
+        claimed.append(key)
+        return True
+
+    async def run():
+        ledger = make_ledger(mongo, max_batch=2, claim=claim)
+        await ledger.ensure_indexes()
+        await register(ledger, 5)
+        sealed = []
+        while True:
+            count = await ledger.seal()
+            sealed.append(count)
+            if count < ledger.max_batch:
+                break
+        # A worker whose claim on the next number is taken seals nothing
+        await register(ledger, 1, start=5)
+        claimed.append("id_ledger_seal:3")
+        return sealed, await ledger.seal()
+
+    assert asyncio.run(run()) == ([2, 2, 1], 0)
+    assert claimed == ["id_ledger_seal:0", "id_ledger_seal:1", "id_ledger_seal:2", "id_ledger_seal:3"]
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from idempotency import IdempotencyStore
+from metrics import MetricsRegistry
+
+
+def make_store(mongo, **kwargs):
+    return IdempotencyStore(mongo, registry=MetricsRegistry(), **kwargs)
+
+
+def outcomes(store, scope="alert"):
+    return {values[1]: child.value for values, child in store.requests.children() if values[0] == scope}
+
+
+def test_first_request_runs_and_retries_replay(mongo):
+    async def run():
+        store = make_store(mongo)
+        await store.ensure_indexes()
+        assert await store.begin("alert", "k1", "body") == ("new", None)
+        await store.complete("alert", "k1", "body", {"id": "a1"})
+        assert await store.begin("alert", "k1", "body") == ("replay", {"id": "a1"})
+
+        # Another worker has no copy in memory and replays from the database
+        other = make_store(mongo)
+        assert await other.begin("alert", "k1", "body") == ("replay", {"id": "a1"})
+        assert await other.begin("alert", "k1", "body") == ("replay", {"id": "a1"})
+        return store, other
+
+    store, other = asyncio.run(run())
+    assert outcomes(store) == {"new": 1, "replay_memory": 1}
+    assert outcomes(other) == {"replay": 1, "replay_memory": 1}
+
+
+def test_reused_key_with_another_body_is_a_mismatch(mongo):
+    async def run():
+        store = make_store(mongo)
+        await store.ensure_indexes()
+        await store.begin("alert", "k1", "body")
+        assert await store.begin("alert", "k1", "other") == ("mismatch", None)
+        await store.complete("alert", "k1", "body", {"id": "a1"})
+        assert await store.begin("alert", "k1", "other") == ("mismatch", None)
+        assert await make_store(mongo).begin("alert", "k1", "other") == ("mismatch", None)
+
+    asyncio.run(run())
+
+
+def test_concurrent_retry_waits_for_the_pending_claim(mongo):
+    async def run():
+        store = make_store(mongo)
+        await store.ensure_indexes()
+        assert await store.begin("alert", "k1", "body") == ("new", None)
+        assert await store.begin("alert", "k1", "body") == ("in_progress", None)
+
+    asyncio.run(run())
+
+
+def test_stale_pending_claim_is_taken_over_once(mongo):
+    async def run():
+        store = make_store(mongo)
+        await store.ensure_indexes()
+        assert await store.begin("alert", "k1", "body") == ("new", None)
+        # The first worker died and its claim has run out
+        await mongo.idempotency_keys.update_one(
+            {"key": "k1"}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        assert await store.begin("alert", "k1", "body") == ("new", None)
+        assert await store.begin("alert", "k1", "body") == ("in_progress", None)
+
+    asyncio.run(run())
+
+
+def test_release_lets_a_retry_run_again(mongo):
+    async def run():
+        store = make_store(mongo)
+        await store.ensure_indexes()
+        await store.begin("alert", "k1", "body")
+        await store.release("alert", "k1", "body")
+        assert await store.begin("alert", "k1", "body") == ("new", None)
+
+    asyncio.run(run())
+
+
+def test_keys_are_scoped(mongo):
+    async def run():
+        store = make_store(mongo)
+        await store.ensure_indexes()
+        await store.begin("alert", "k1", "body")
+        await store.complete("alert", "k1", "body", {"id": "a1"})
+        assert await store.begin("location", "k1", "body") == ("new", None)
+
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Seconds `import server` may take in a fresh interpreter; the LLM SDK alone used to cost several
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# Loaded on first use or by the startup warm-up, never by the import itself
+DEFERRED_MODULES = ("emergentintegrations", "litellm", "openai", "google", "qrcode", "PIL", "requests", "motor", "pymongo")
+
+MEASURE = f"""
+import json, sys, time
+started = time.perf_counter()
+import server
+elapsed = time.perf_counter() - started
+loaded = sorted({{name.split('.')[0] for name in sys.modules}} & set({DEFERRED_MODULES!r}))
+print(json.dumps({{"seconds": elapsed, "deferred_loaded": loaded}}))
+"""
+
+
+def measure_import():
+    env = dict(os.environ, MONGO_URL="mongodb://localhost:27017", DB_NAME="import_time_test")
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_stays_within_budget():
+    # Best of three so a busy machine does not fail the build
+    runs = [measure_import() for _ in range(3)]
+    fastest = min(run["seconds"] for run in runs)
+    assert fastest <= IMPORT_BUDGET_SECONDS, f"import server took {fastest:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+
+
+def test_import_defers_heavy_dependencies():
+    assert measure_import()["deferred_loaded"] == []
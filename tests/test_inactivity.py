@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from inactivity import InactivitySweeper, TimerWheel
+
+
+def test_tourist_expires_after_threshold_once():
+    wheel = TimerWheel(threshold_seconds=60, tick_seconds=10)
+    wheel.touch("t1", 1.0, 2.0, now=100)
+    assert wheel.expire(150) == []
+    # Deadline 160 falls in slot 16; it expires once slot 17 starts
+    assert wheel.expire(170) == [("t1", 100, 1.0, 2.0)]
+    assert wheel.expire(1000) == []
+    assert len(wheel) == 0
+
+
+def test_touch_rearms_the_deadline():
+    wheel = TimerWheel(threshold_seconds=60, tick_seconds=10)
+    wheel.touch("t1", 1.0, 2.0, now=100)
+    wheel.touch("t1", 3.0, 4.0, now=150)
+    assert wheel.expire(200) == []
+    assert wheel.expire(230) == [("t1", 150, 3.0, 4.0)]
+
+
+def test_expiry_order_follows_deadlines():
+    wheel = TimerWheel(threshold_seconds=60, tick_seconds=10)
+    wheel.touch("late", 0.0, 0.0, now=140)
+    wheel.touch("early", 0.0, 0.0, now=100)
+    assert [entry[0] for entry in wheel.expire(10_000)] == ["early", "late"]
+
+
+def test_forget_disarms():
+    wheel = TimerWheel(threshold_seconds=60, tick_seconds=10)
+    wheel.touch("t1", 0.0, 0.0, now=100)
+    wheel.touch("t2", 0.0, 0.0, now=100)
+    wheel.forget("t1")
+    assert [entry[0] for entry in wheel.expire(1000)] == ["t2"]
+
+
+def test_expire_visits_only_populated_slots():
+    wheel = TimerWheel(threshold_seconds=60, tick_seconds=1)
+    for i in range(1000):
+        wheel.touch(f"t{i}", 0.0, 0.0, now=i)
+    assert len(wheel.expire(530)) == 470
+    assert len(wheel) == 530
+
+
+def test_sweeper_reports_silent_tourists_and_survives_callback_errors():
+    reported = []
+
+    async def on_silence(entry):
+        if entry[0] == "broken":
+            raise RuntimeError("notification failed")
+        reported.append(entry[0])
+
+    async def run():
+        sweeper = InactivitySweeper(on_silence, threshold_seconds=60, tick_seconds=10)
+        sweeper.wheel.touch("broken", 0.0, 0.0, now=0)
+        sweeper.wheel.touch("t1", 0.0, 0.0, now=5)
+        return await sweeper.sweep(now=500)
+
+    assert asyncio.run(run()) == 2
+    assert reported == ["t1"]
+
+
+def test_restarted_sweeper_reports_a_tourist_silent_since_before_the_restart():
+    reported = []
+
+    async def on_silence(entry):
+        reported.append(entry)
+
+    async def run():
+        # The new process re-arms from the stored last fix, not from its own start time
+        now = time.time()
+        sweeper = InactivitySweeper(on_silence, threshold_seconds=60, tick_seconds=10)
+        sweeper.touch("silent", 1.0, 2.0, seen_at=now - 300)
+        sweeper.touch("recent", 3.0, 4.0, seen_at=now - 5)
+        return await sweeper.sweep(now)
+
+    assert asyncio.run(run()) == 1
+    assert [(entry[0], entry[2], entry[3]) for entry in reported] == [("silent", 1.0, 2.0)]
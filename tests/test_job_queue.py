@@ -0,0 +1,123 @@
+import asyncio
+
+from job_queue import DurableJobQueue
+from metrics import MetricsRegistry
+
+
+def make_queue(mongo, handler=None, **kwargs):
+    queue = DurableJobQueue(mongo, retry_base_seconds=0.0, registry=MetricsRegistry(), **kwargs)
+    queue.add_lane("bulk", 1)
+    queue.add_lane("emergency", 1)
+
+    async def noop(payload):
+        pass
+
+    queue.register("sync", "bulk", handler or noop)
+    return queue
+
+
+def outcome(queue, name):
+    return queue.jobs.labels("bulk", "sync", name).value
+
+
+def test_keyed_jobs_coalesce_while_queued(mongo):
+    async def run():
+        queue = make_queue(mongo)
+        await queue.ensure_indexes()
+        first = await queue.enqueue("sync", {"n": 1}, key="tourist-1")
+        assert await queue.enqueue("sync", {"n": 2}, key="tourist-1") is None
+        assert await queue.enqueue("sync", {"n": 3}, key="tourist-2") is not None
+        # Unkeyed jobs never collide on the partial index
+        await queue.enqueue("sync", {"n": 4})
+        await queue.enqueue("sync", {"n": 5})
+        assert await mongo.jobs.count_documents({}) == 4
+        assert (await mongo.jobs.find_one({"key": "tourist-1"}))["id"] == first
+        assert outcome(queue, "coalesced") == 1
+
+        # Once claimed, the key is free for the next change
+        await queue.claim("bulk")
+        await queue.claim("bulk")
+        await queue.claim("bulk")
+        await queue.claim("bulk")
+        assert await queue.enqueue("sync", {"n": 6}, key="tourist-1") is not None
+
+    asyncio.run(run())
+
+
+def test_duplicate_key_error_is_coalesced(mongo):
+    async def run():
+        queue = make_queue(mongo)
+        await queue.ensure_indexes()
+        await queue.enqueue("sync", {}, key="tourist-1")
+        # Two upserts that both miss the match race to insert; the loser hits the unique index
+        original = mongo.jobs.update_one
+
+        async def racing_update(filter, update, upsert=False):
+            from pymongo.errors import DuplicateKeyError
+            raise DuplicateKeyError("E11000 duplicate key")
+
+        mongo.jobs.update_one = racing_update
+        try:
+            assert await queue.enqueue("sync", {}, key="tourist-1") is None
+        finally:
+            mongo.jobs.update_one = original
+        assert outcome(queue, "coalesced") == 1
+
+    asyncio.run(run())
+
+
+def test_failed_job_is_retried_then_coalesced_into_a_newer_one(mongo):
+    async def run():
+        async def failing(payload):
+            raise RuntimeError("upstream down")
+
+        queue = make_queue(mongo, failing)
+        await queue.ensure_indexes()
+        await queue.enqueue("sync", {}, key="tourist-1")
+        await queue._run("bulk", await queue.claim("bulk"))
+        job = await mongo.jobs.find_one({"key": "tourist-1"})
+        assert job["status"] == "queued" and job["last_error"] == "upstream down"
+        assert outcome(queue, "retried") == 1
+
+        # While the retry runs, a newer job with the same key is queued
+        claimed = await queue.claim("bulk")
+        await queue.enqueue("sync", {}, key="tourist-1")
+        await queue._run("bulk", claimed)
+        statuses = sorted([doc["status"] async for doc in mongo.jobs.find({"key": "tourist-1"})])
+        assert statuses == ["done", "queued"]
+        assert outcome(queue, "coalesced") == 1
+
+    asyncio.run(run())
+
+
+def test_job_fails_after_max_attempts(mongo):
+    async def run():
+        async def failing(payload):
+            raise RuntimeError("bad payload")
+
+        queue = make_queue(mongo, failing, max_attempts=2)
+        await queue.ensure_indexes()
+        await queue.enqueue("sync", {})
+        await queue._run("bulk", await queue.claim("bulk"))
+        await queue._run("bulk", await queue.claim("bulk"))
+        assert (await mongo.jobs.find_one({}))["status"] == "failed"
+        assert await queue.claim("bulk") is None
+
+    asyncio.run(run())
+
+
+def test_depth_gauge_covers_every_lane_and_status(mongo):
+    async def run():
+        queue = make_queue(mongo)
+        await queue.ensure_indexes()
+        await queue.enqueue("sync", {})
+        await queue.enqueue("sync", {})
+        await queue.claim("bulk")
+        await queue.refresh_depth()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.depth.labels("bulk", "queued").value == 1
+    assert queue.depth.labels("bulk", "running").value == 1
+    assert queue.depth.labels("bulk", "failed").value == 0
+    assert queue.depth.labels("emergency", "queued").value == 0
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+from live_positions import LivePositionStore, viewport_tile_count, viewport_tiles
+
+NOW = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def ids(frame, key="upsert"):
+    return sorted(entry if key == "remove" else entry[0] for entry in frame[key])
+
+
+def test_viewport_tiles_wrap_the_antimeridian():
+    tiles = viewport_tiles(-10, 170, 10, -170, 4)
+    assert {x for _, x, _ in tiles} == {15, 0}
+    assert viewport_tile_count(-10, 170, 10, -170, 4) == len(tiles)
+
+
+def test_large_viewports_subscribe_at_a_coarser_zoom():
+    store = LivePositionStore(zoom=14, max_subscription_tiles=16)
+    city = store.subscribe(28.60, 77.20, 28.61, 77.21)
+    country = store.subscribe(8, 68, 37, 97)
+    assert len(country.tiles) <= 16 and country.zoom < city.zoom
+    store.unsubscribe(country)
+    assert country.tiles == [] and country.zoom not in store._subscription_zooms
+
+
+def test_snapshot_and_deltas_only_cover_the_viewport():
+    store = LivePositionStore()
+    store.update("inside", 28.605, 77.205, NOW)
+    store.update("outside", 19.07, 72.87, NOW)
+    subscription = store.subscribe(28.60, 77.20, 28.61, 77.21)
+    assert ids(store.snapshot(subscription)) == ["inside"]
+
+    store.update("outside", 19.08, 72.88, NOW)
+    assert subscription.take_delta() is None
+    # Many fixes between frames coalesce into one entry
+    for i in range(5):
+        store.update("inside", 28.605 + i * 0.0001, 77.205, NOW)
+    frame = subscription.take_delta()
+    assert frame["seq"] == 1 and ids(frame) == ["inside"]
+    assert frame["upsert"][0][1] == 28.6054
+
+
+def test_leaving_the_viewport_and_eviction_send_removals():
+    store = LivePositionStore()
+    subscription = store.subscribe(28.60, 77.20, 28.61, 77.21)
+    store.update("walker", 28.605, 77.205, NOW)
+    store.update("evicted", 28.606, 77.206, NOW)
+    subscription.take_delta()
+
+    store.update("walker", 28.70, 77.30, NOW)
+    store.remove("evicted")
+    frame = subscription.take_delta()
+    assert frame["upsert"] == [] and ids(frame, "remove") == ["evicted", "walker"]
+    assert len(store) == 1
+
+
+def test_unsubscribed_viewport_gets_no_changes():
+    store = LivePositionStore()
+    subscription = store.subscribe(28.60, 77.20, 28.61, 77.21)
+    store.unsubscribe(subscription)
+    store.update("inside", 28.605, 77.205, NOW)
+    assert subscription.take_delta() is None
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import location_retention
+from geo import KM_PER_DEGREE
+from location_retention import LocationRetention, simplify_track
+from metrics import MetricsRegistry
+
+# About 10 m of latitude
+STEP = 10.0 / (KM_PER_DEGREE * 1000.0)
+
+
+def deviation_m(point, a, b):
+    """Perpendicular distance in metres from point to the line a-b, in the same projection"""
+    km_x = KM_PER_DEGREE * math.cos(math.radians(point[0]))
+    (px, py), (ax, ay), (bx, by) = [(p[1] * km_x * 1000.0, p[0] * KM_PER_DEGREE * 1000.0) for p in (point, a, b)]
+    length = math.hypot(bx - ax, by - ay)
+    return abs((by - ay) * (px - ax) - (bx - ax) * (py - ay)) / length
+
+
+def test_straight_track_keeps_its_ends():
+    points = [(28.6 + i * STEP, 77.2, float(i)) for i in range(100)]
+    assert simplify_track(points, 5.0) == [points[0], points[-1]]
+
+
+def test_corner_is_kept():
+    north = [(28.6 + i * STEP, 77.2, float(i)) for i in range(50)]
+    east = [(north[-1][0], 77.2 + i * STEP, float(50 + i)) for i in range(1, 50)]
+    simplified = simplify_track(north + east, 5.0)
+    assert simplified == [north[0], north[-1], east[-1]]
+
+
+def test_every_dropped_point_is_within_tolerance():
+    # A wiggly walk: sideways noise of up to 30 m
+    points = [(28.6 + i * STEP, 77.2 + 3 * STEP * math.sin(i * 0.7), float(i)) for i in range(200)]
+    simplified = simplify_track(points, 10.0)
+    assert 2 < len(simplified) < len(points)
+    kept = [points.index(p) for p in simplified]
+    for first, last in zip(kept, kept[1:]):
+        for point in points[first + 1:last]:
+            assert deviation_m(point, points[first], points[last]) <= 10.0 + 1e-6
+
+
+def test_short_tracks_and_loops():
+    assert simplify_track([], 5.0) == []
+    assert simplify_track([(0.0, 0.0, 0.0), (1.0, 1.0, 1.0)], 5.0) == [(0.0, 0.0, 0.0), (1.0, 1.0, 1.0)]
+    # A loop back to the start has a zero-length chord; the far point is still kept
+    loop = [(28.6, 77.2, 0.0), (28.6 + 10 * STEP, 77.2, 1.0), (28.6, 77.2, 2.0)]
+    assert simplify_track(loop, 5.0) == loop
+
+
+def test_finished_hours_are_compacted_and_archived(mongo, tmp_path):
+    hour = datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+
+    async def run():
+        fixes = [
+            {"tourist_id": tourist, "latitude": 28.6 + i * STEP, "longitude": 77.2,
+             "recorded_at": hour + timedelta(minutes=i), "timestamp": hour + timedelta(minutes=i)}
+            for tourist in ("t1", "t2") for i in range(60)
+        ]
+        await mongo.location_history.insert_many(fixes)
+        retention = LocationRetention(mongo, archive_dir=str(tmp_path), registry=MetricsRegistry())
+        # Only the hour that finished compact_after_seconds ago is compacted
+        assert await retention.run_once(now=hour + timedelta(hours=1, minutes=30)) == 0
+        assert await retention.run_once(now=hour + timedelta(hours=2)) == 1
+        assert await retention.run_once(now=hour + timedelta(hours=2)) == 0
+        return await mongo.location_tracks.find({}, {"_id": 0}).sort("tourist_id", 1).to_list(None)
+
+    tracks = asyncio.run(run())
+    assert [t["tourist_id"] for t in tracks] == ["t1", "t2"]
+    assert all(t["raw_count"] == 60 and len(t["points"]) == 2 for t in tracks)
+    with gzip.open(tmp_path / "2026" / "01" / "01" / "10.jsonl.gz", "rt") as archive:
+        assert len([json.loads(line) for line in archive]) == 120
+
+
+def test_archive_is_written_in_batches_and_dropped_on_failure(mongo, tmp_path, monkeypatch):
+    hour = datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+    monkeypatch.setattr(location_retention, "ARCHIVE_BATCH", 7)
+
+    async def run():
+        await mongo.location_history.insert_many([
+            {"tourist_id": f"t{i % 3}", "latitude": 28.6, "longitude": 77.2 + i * STEP,
+             "recorded_at": hour + timedelta(seconds=i)}
+            for i in range(50)
+        ])
+        retention = LocationRetention(mongo, archive_dir=str(tmp_path), registry=MetricsRegistry())
+
+        def failing(points, tolerance_m):
+            raise RuntimeError("worker stopped")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(location_retention, "simplify_track", failing)
+            with pytest.raises(RuntimeError):
+                await retention.compact_chunk(hour, hour + timedelta(hours=1))
+        # The failed hour leaves no partial file and is redone from scratch
+        assert list((tmp_path / "2026" / "01" / "01").iterdir()) == []
+        await retention.compact_chunk(hour, hour + timedelta(hours=1))
+        return await mongo.location_tracks.count_documents({})
+
+    assert asyncio.run(run()) == 3
+    archived = list((tmp_path / "2026" / "01" / "01").iterdir())
+    assert [p.name for p in archived] == ["10.jsonl.gz"]
+    with gzip.open(archived[0], "rt") as archive:
+        times = [json.loads(line)["recorded_at"] for line in archive]
+    assert times == sorted(times) and len(times) == 50
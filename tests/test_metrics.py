@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from metrics import MetricsRegistry
+
+
+def test_text_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests served", ["route"])
+    requests.labels('/api/"quoted"').inc()
+    requests.labels("/api/alerts").inc(2)
+    registry.gauge("queue_depth", "Queued jobs").set_function(lambda: 3)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(2.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 3.05",
+        "latency_seconds_count 3",
+        "# HELP queue_depth Queued jobs",
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+        "# HELP requests_total Requests served",
+        "# TYPE requests_total counter",
+        'requests_total{route="/api/\\"quoted\\""} 1',
+        'requests_total{route="/api/alerts"} 2',
+    ]
+
+
+def test_failing_gauge_function_renders_nan():
+    registry = MetricsRegistry()
+    registry.gauge("broken", "Raises").set_function(lambda: 1 / 0)
+    assert registry.render().splitlines()[-1] == "broken NaN"
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = MetricsRegistry().histogram("h", "H", buckets=(1.0, 2.0, 4.0))
+    assert math.isnan(histogram.labels().quantile(0.5))
+    for value in [0.5] * 50 + [1.5] * 40 + [3.0] * 10:
+        histogram.observe(value)
+    child = histogram.labels()
+    assert child.quantile(0.5) == 1.0
+    assert child.quantile(0.7) == pytest.approx(1.5)
+    assert child.quantile(0.95) == pytest.approx(3.0)
+    assert child.summary()["count"] == 100 and child.summary()["mean"] == pytest.approx(1.15)
+
+    # Values past the last bucket are capped at its bound
+    histogram.observe(60.0)
+    assert child.quantile(1.0) == 4.0
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("jobs_total", "Jobs", ["lane"])
+    assert registry.counter("jobs_total", "Jobs again", ["lane"]) is first
+    with pytest.raises(ValueError):
+        registry.gauge("jobs_total", "Jobs", ["lane"])
+    with pytest.raises(ValueError):
+        registry.counter("jobs_total", "Jobs", ["lane", "status"])
+    with pytest.raises(ValueError):
+        first.labels("routine", "extra")
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from profiling import LoopBlockDetector, Profiler, ProfilingMiddleware, stage
+
+
+def test_debug_header_needs_the_token_when_one_is_set():
+    open_profiler = Profiler()
+    assert open_profiler.wants("") and open_profiler.wants("anything")
+    assert not open_profiler.wants(None)
+
+    gated = Profiler(debug_token="secret")
+    assert gated.wants("secret")
+    assert not gated.wants("guess") and not gated.wants(None)
+    assert Profiler(sample_rate=1.0, debug_token="secret").wants(None)
+
+
+async def handler(scope, receive, send):
+    with stage("geocode"):
+        await asyncio.sleep(0.01)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(app, headers):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/threats/nearby", "headers": headers}
+    await app(scope, None, send)
+    return dict(sent[0]["headers"])
+
+
+def test_profiled_request_reports_its_stages():
+    profiler = Profiler(debug_token="secret")
+    app = ProfilingMiddleware(handler, profiler)
+
+    assert asyncio.run(call(app, [(b"x-debug-profile", b"guess")])) == {}
+    headers = asyncio.run(call(app, [(b"x-debug-profile", b"secret")]))
+    [profile] = profiler.recent()
+    assert headers[b"x-profile-id"] == str(profile.id).encode()
+    assert headers[b"server-timing"].startswith(b"geocode;dur=")
+    assert [s["name"] for s in profile.summary()["stages"]] == ["geocode"]
+    assert profile.status == 200 and profile.stages[0]["duration_ms"] >= 10
+
+
+def test_blocking_call_on_the_loop_is_detected(caplog):
+    detector = LoopBlockDetector(threshold_ms=50, heartbeat_ms=5)
+
+    def blocking_io():
+        time.sleep(0.3)
+
+    async def run():
+        await detector.start()
+        await asyncio.sleep(0.05)
+        assert detector.blocks == 0
+        blocking_io()
+        await asyncio.sleep(0.2)
+        await detector.stop()
+
+    asyncio.run(run())
+    assert detector.blocks == 1
+    assert "blocking_io" in caplog.text
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from geo import tile_for
+from risk_raster import threat_penalty
+from risk_tiles import RiskTileStore
+from shared_arrays import SharedArrayStore
+from threat_registry import ThreatIndex
+
+DELHI = (28.61, 77.21)
+MUMBAI = (19.07, 72.87)
+
+
+def threat(name, lat, lng, radius_km=5.0, threat_level=5):
+    return SimpleNamespace(name=name, latitude=lat, longitude=lng, radius_km=radius_km, threat_level=threat_level)
+
+
+def make_store(threats, **kwargs):
+    store = RiskTileStore(tile_size=32, precompute_zoom=1, **kwargs)
+    store.set_layer("global", ThreatIndex(threats))
+    return store
+
+
+def test_risk_is_read_from_the_rendered_tiles():
+    store = make_store([threat("delhi", *DELHI, threat_level=5), threat("overlap", *DELHI, threat_level=10)])
+    assert store.risk_at(*DELHI) == threat_penalty(5) + threat_penalty(10)
+    assert store.risk_at(*MUMBAI) == 0.0
+    assert store.lookup([{"lat": DELHI[0], "lng": DELHI[1]}]) == [1.25]
+    tile = store.tile(*tile_for(*DELHI, store.lookup_zoom))
+    assert len(tile.to_bytes()) == store.tile_bytes
+    assert store.misses == 2 and store.hits == 2
+
+
+def test_a_changed_threat_drops_only_the_tiles_it_overlaps():
+    delhi, mumbai = threat("delhi", *DELHI), threat("mumbai", *MUMBAI)
+    store = make_store([delhi, mumbai])
+    store.risk_at(*DELHI)
+    store.risk_at(*MUMBAI)
+    delhi_key, mumbai_key = tile_for(*DELHI, store.lookup_zoom), tile_for(*MUMBAI, store.lookup_zoom)
+    etag = store.tile(*delhi_key).etag
+
+    # Re-seeding the same threats is not a change
+    store.set_layer("global", ThreatIndex([threat("delhi", *DELHI), threat("mumbai", *MUMBAI)]))
+    assert store.generation == 1 and len(store) == 2
+
+    store.set_layer("global", ThreatIndex([delhi, threat("mumbai", *MUMBAI, threat_level=9)]))
+    assert store.generation == 2 and list(store._tiles) == [delhi_key]
+    assert store.risk_at(*MUMBAI) == pytest.approx(threat_penalty(9), abs=1e-3)
+    assert store.tile(*delhi_key).etag == etag
+
+
+def test_many_changes_clear_the_whole_cache():
+    store = make_store([threat("delhi", *DELHI)], full_rebuild_threshold=1)
+    store.risk_at(*DELHI)
+    store.set_layer("global", ThreatIndex([threat(f"zone {i}", *MUMBAI) for i in range(2)]))
+    assert len(store) == 0 and store.risk_at(*DELHI) == 0.0
+
+
+def test_workers_share_one_pyramid_per_threat_set(tmp_path):
+    shared = SharedArrayStore(str(tmp_path))
+    first = make_store([threat("delhi", *DELHI)], shared=shared)
+    first.precompute()
+    second = make_store([threat("delhi", *DELHI)], shared=shared)
+    second._render = None  # must map the first worker's pyramid rather than render
+    second.precompute()
+    assert second.tile(0, 0, 0).etag == first.tile(0, 0, 0).etag
+    assert len(list(tmp_path.glob("risk-pyramid-*.npy"))) == 1
+
+    # A new threat set publishes a new pyramid and prunes the old one
+    first.set_layer("global", ThreatIndex([threat("mumbai", *MUMBAI)]))
+    first.precompute()
+    assert [p.name for p in tmp_path.glob("risk-pyramid-*.npy")] == [f"risk-pyramid-{first.content_key}.npy"]
@@ -0,0 +1,83 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from geo import KM_PER_DEGREE
+from route_geometry import DensifiedRoute, score_route
+from threat_registry import ThreatIndex
+
+
+def threat(name, lat, lng, radius_km, level=5, geometry=None):
+    return SimpleNamespace(id=name, name=name, latitude=lat, longitude=lng, radius_km=radius_km,
+                           threat_level=level, threat_type="crime", geometry=geometry)
+
+
+def point(lat, lng):
+    return {"lat": lat, "lng": lng}
+
+
+def test_densified_route_covers_the_whole_length():
+    route = DensifiedRoute([point(0, 0), point(0, 1), point(1, 1)], spacing_km=5.0)
+    assert route.segment_count == 2
+    assert route.km.sum() == pytest.approx(route.segment_km.sum())
+    assert route.km.max() <= 5.0
+    assert list(route.sub_segments([1])) == list(range(route.offsets[1], route.offsets[2]))
+
+
+def test_chord_through_circle_centre_is_the_diameter():
+    index = ThreatIndex([threat("zone", 0.0, 0.5, radius_km=10, level=4)])
+    result = score_route([point(0, 0), point(0, 1)], index, spacing_km=1.0)
+    [zone] = result["zones"]
+    assert zone["km_inside"] == pytest.approx(20.0, rel=0.01)
+    assert zone["exposure"] == pytest.approx(80.0, rel=0.01)
+    assert result["exposure"] == pytest.approx(80.0, rel=0.01)
+
+
+def test_offset_chord_matches_geometry():
+    # Passes 6 km from the centre of a 10 km circle: chord is 2 * sqrt(100 - 36) = 16 km
+    offset_deg = 6.0 / KM_PER_DEGREE
+    index = ThreatIndex([threat("zone", offset_deg, 0.5, radius_km=10)])
+    result = score_route([point(0, 0), point(0, 1)], index, spacing_km=0.7)
+    assert result["zones"][0]["km_inside"] == pytest.approx(16.0, rel=0.01)
+
+
+def test_result_does_not_depend_on_densification():
+    index = ThreatIndex([threat("a", 0.02, 0.3, 5), threat("b", -0.05, 0.7, 12, level=8)])
+    coarse = score_route([point(0, 0), point(0, 1)], index, spacing_km=50.0)
+    fine = score_route([point(0, 0), point(0, 1)], index, spacing_km=0.25)
+    assert coarse["exposure"] == pytest.approx(fine["exposure"], rel=1e-3)
+
+
+def test_exposure_is_attributed_to_segments_and_sorted_by_zone():
+    index = ThreatIndex([threat("minor", 0.0, 0.5, 3, level=2), threat("major", 0.5, 1.0, 5, level=9)])
+    result = score_route([point(0, 0), point(0, 1), point(1, 1)], index)
+    assert [z["name"] for z in result["zones"]] == ["major", "minor"]
+    first, second = result["segments"]
+    assert [z["name"] for z in first["zones"]] == ["minor"]
+    assert [z["name"] for z in second["zones"]] == ["major"]
+    assert first["exposure"] + second["exposure"] == pytest.approx(result["exposure"], abs=0.01)
+
+
+def test_route_missing_the_circle_has_no_exposure():
+    index = ThreatIndex([threat("zone", 0.2, 0.5, radius_km=10)])
+    assert score_route([point(0, 0), point(0, 1)], index)["zones"] == []
+
+
+def test_polygon_overlap_is_resolved_to_spacing():
+    square = {"type": "Polygon", "coordinates": [[[0.4, -0.1], [0.6, -0.1], [0.6, 0.1], [0.4, 0.1], [0.4, -0.1]]]}
+    index = ThreatIndex([threat("square", 0.0, 0.5, radius_km=0, geometry=square)])
+    result = score_route([point(0, 0), point(0, 1)], index, spacing_km=0.5)
+    assert result["zones"][0]["km_inside"] == pytest.approx(0.2 * KM_PER_DEGREE, abs=1.0)
+
+
+def test_route_across_antimeridian():
+    index = ThreatIndex([threat("zone", 0.0, 180.0, radius_km=10)])
+    result = score_route([point(0, 179.5), point(0, -179.5)], index)
+    assert result["length_km"] == pytest.approx(KM_PER_DEGREE, rel=0.01)
+    assert result["zones"][0]["km_inside"] == pytest.approx(20.0, rel=0.01)
+
+
+def test_single_point_route():
+    assert score_route([point(0, 0)], ThreatIndex([])) == {"length_km": 0.0, "exposure": 0.0, "segments": [], "zones": []}
+    assert math.isclose(score_route([point(0, 0), point(0, 0)], ThreatIndex([]))["length_km"], 0.0)
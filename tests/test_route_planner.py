@@ -0,0 +1,95 @@
+import heapq
+import math
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+from geo import haversine_km
+from route_planner import MOVES, RoutePlanner, simplify_cells
+from threat_registry import ThreatIndex
+
+
+def threat(lat, lng, radius_km, level=9):
+    return SimpleNamespace(name="zone", latitude=lat, longitude=lng, radius_km=radius_km, threat_level=level,
+                           geometry=None)
+
+
+START = {"lat": 28.0, "lng": 77.0}
+END = {"lat": 28.0, "lng": 78.0}
+
+
+def path_cost(surface, cells):
+    total = 0.0
+    for (r1, c1), (r2, c2) in zip(cells, cells[1:]):
+        length = math.hypot((r2 - r1) * surface.dlat * surface.km_y, (c2 - c1) * surface.dlng * surface.km_x)
+        total += length * (surface.cost[r1, c1] + surface.cost[r2, c2]) * 0.5
+    return total
+
+
+def dijkstra_cost(surface, start, goal):
+    best = {start: 0.0}
+    heap = [(0.0, start)]
+    while heap:
+        g, (r, c) = heapq.heappop(heap)
+        if (r, c) == goal:
+            return g
+        if g > best[(r, c)]:
+            continue
+        for dr, dc in MOVES:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < surface.rows and 0 <= nc < surface.cols:
+                cells = [(r, c), (nr, nc)]
+                ng = g + path_cost(surface, cells)
+                if ng < best.get((nr, nc), math.inf):
+                    best[(nr, nc)] = ng
+                    heapq.heappush(heap, (ng, (nr, nc)))
+    return math.inf
+
+
+def test_open_country_route_is_near_straight():
+    plan = RoutePlanner().plan([START, END], ThreatIndex([]))
+    assert plan["route"][0] == START and plan["route"][-1] == END
+    assert plan["metrics"]["risk_exposure"] == 0.0
+    assert plan["metrics"]["length_km"] <= haversine_km(28.0, 77.0, 28.0, 78.0) * 1.05
+
+
+def test_route_detours_around_a_threat_on_the_direct_line():
+    planner = RoutePlanner()
+    index = ThreatIndex([threat(28.0, 77.5, 15)])
+    plan = planner.plan([START, END], index)
+    direct = plan["surface"].route_cost([START, END])
+    assert direct["risk_exposure"] > 0
+    assert plan["metrics"]["risk_exposure"] < direct["risk_exposure"] * 0.2
+    assert all(haversine_km(p["lat"], p["lng"], 28.0, 77.5) > 10 for p in plan["route"])
+
+
+def test_astar_matches_dijkstra_on_random_costs():
+    rng = random.Random(3)
+    threats = [threat(rng.uniform(27.6, 28.4), rng.uniform(76.8, 78.2), rng.uniform(3, 20), rng.randint(1, 10))
+               for _ in range(25)]
+    planner = RoutePlanner(max_cells=40)
+    surface = planner.surface(planner.region_for([START, END]), ThreatIndex(threats))
+    for _ in range(5):
+        start = (rng.randrange(surface.rows), rng.randrange(surface.cols))
+        goal = (rng.randrange(surface.rows), rng.randrange(surface.cols))
+        cells = surface.astar(start, goal)
+        assert cells[0] == start and cells[-1] == goal
+        assert np.isclose(path_cost(surface, cells), dijkstra_cost(surface, start, goal))
+
+
+def test_surfaces_are_cached_per_region_and_index_build():
+    planner = RoutePlanner()
+    index = ThreatIndex([threat(28.0, 77.5, 15)])
+    planner.plan([START, END], index)
+    planner.plan([{"lat": 28.0, "lng": 77.1}, {"lat": 28.0, "lng": 77.9}], index)
+    assert (planner.hits, planner.misses) == (1, 1)
+
+    planner.plan([START, END], ThreatIndex([threat(28.0, 77.5, 15)]))
+    assert planner.misses == 2
+
+
+def test_simplify_cells_keeps_turns_only():
+    cells = [(0, 0), (0, 1), (0, 2), (1, 3), (2, 4), (2, 5)]
+    assert simplify_cells(cells) == [(0, 0), (0, 2), (2, 4), (2, 5)]
+    assert simplify_cells([(0, 0), (1, 1)]) == [(0, 0), (1, 1)]
@@ -0,0 +1,38 @@
+import os
+import time
+
+import numpy as np
+
+from shared_arrays import SharedArrayStore, content_key
+
+
+def test_second_worker_maps_the_published_array(tmp_path):
+    store = SharedArrayStore(str(tmp_path))
+    key = content_key(["tiles", 3])
+    built = store.get_or_build("pyramid", key, lambda: np.arange(4, dtype=np.float16))
+    mapped = SharedArrayStore(str(tmp_path)).get_or_build("pyramid", key, lambda: None)
+    assert isinstance(mapped, np.memmap) and mapped.tolist() == built.tolist() == [0, 1, 2, 3]
+    assert not os.path.exists(store._path("pyramid", key) + ".lock")
+
+
+def test_lock_left_by_an_exited_worker_is_cleared(tmp_path):
+    store = SharedArrayStore(str(tmp_path), wait_seconds=5.0)
+    lock_path = store._path("pyramid", "k") + ".lock"
+    open(lock_path, "w").close()
+    old = time.time() - 60
+    os.utime(lock_path, (old, old))
+
+    started = time.monotonic()
+    array = store.get_or_build("pyramid", "k", lambda: np.ones(2))
+    # Built at once instead of waiting out wait_seconds on the dead builder
+    assert time.monotonic() - started < 1.0
+    assert array.tolist() == [1.0, 1.0] and not os.path.exists(lock_path)
+
+
+def test_fresh_lock_waits_then_builds_locally(tmp_path):
+    store = SharedArrayStore(str(tmp_path), wait_seconds=0.2)
+    lock_path = store._path("pyramid", "k") + ".lock"
+    open(lock_path, "w").close()
+    assert store.get_or_build("pyramid", "k", lambda: np.zeros(1)).tolist() == [0.0]
+    # The live builder still owns its lock
+    assert os.path.exists(lock_path)
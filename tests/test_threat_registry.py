@@ -0,0 +1,112 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+from geo import haversine_km
+from threat_registry import ThreatIndex, ThreatRegistry
+
+
+def threat(name, lat, lng, radius_km=1.0, geometry=None):
+    return SimpleNamespace(name=name, latitude=lat, longitude=lng, radius_km=radius_km, geometry=geometry)
+
+
+def brute_force(threats, lat, lng, radius_km):
+    return [t for t in threats if haversine_km(lat, lng, t.latitude, t.longitude) <= max(radius_km, t.radius_km)]
+
+
+def test_nearby_matches_brute_force():
+    rng = random.Random(7)
+    threats = [
+        threat(f"t{i}", rng.uniform(-60, 60), rng.uniform(-179, 179), rng.uniform(0.5, 300)) for i in range(400)
+    ]
+    index = ThreatIndex(threats)
+    for _ in range(200):
+        lat, lng, radius = rng.uniform(-60, 60), rng.uniform(-179, 179), rng.uniform(0, 500)
+        assert index.nearby(lat, lng, radius) == brute_force(threats, lat, lng, radius)
+
+
+def test_point_inside_large_threat_matches_with_zero_radius():
+    index = ThreatIndex([threat("zone", 28.6, 77.2, radius_km=50)])
+    assert [t.name for t in index.nearby(28.9, 77.2, 0)] == ["zone"]
+    assert index.nearby(30.0, 77.2, 0) == []
+
+
+def test_search_across_antimeridian():
+    index = ThreatIndex([threat("east", 0.0, 179.9, radius_km=1), threat("far", 0.0, 170.0, radius_km=1)])
+    assert [t.name for t in index.nearby(0.0, -179.9, 50)] == ["east"]
+
+
+def test_polygon_threat_uses_its_area():
+    square = {"type": "Polygon", "coordinates": [[[10, 10], [11, 10], [11, 11], [10, 11], [10, 10]]]}
+    index = ThreatIndex([threat("square", 10.5, 10.5, radius_km=0, geometry=square)])
+    assert len(index.nearby(10.9, 10.9, 0)) == 1
+    assert index.nearby(10.5, 11.5, 10) == []
+    assert len(index.nearby(10.5, 11.05, 10)) == 1
+
+
+def make_registry(mongo, seeds):
+    return ThreatRegistry(
+        mongo,
+        build_record=lambda doc: SimpleNamespace(**doc),
+        seed_records=lambda: [dict(s) for s in seeds],
+    )
+
+
+SEEDS = [
+    {"id": "s1", "name": "seed", "latitude": 0.0, "longitude": 0.0, "radius_km": 5.0, "source": "global_database"},
+]
+
+
+def test_reload_serves_seeds_until_collection_is_initialised(mongo):
+    async def run():
+        registry = make_registry(mongo, SEEDS)
+        await mongo.global_threats.insert_one(
+            {"id": "a1", "name": "admin", "latitude": 1.0, "longitude": 1.0, "radius_km": 5.0, "source": "admin"}
+        )
+        await registry.reload(force=True)
+        return sorted(t.name for t in registry.index.threats)
+
+    assert asyncio.run(run()) == ["admin", "seed"]
+
+
+def test_deactivated_seeds_stay_deactivated(mongo):
+    async def run():
+        registry = make_registry(mongo, SEEDS)
+        await mongo.global_threats.insert_many([dict(s) for s in SEEDS])
+        await mongo.global_threats.update_one({"id": "s1"}, {"$set": {"is_active": False}})
+        await registry.bump_version()
+        assert await registry.reload()
+        return len(registry.index)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_reload_only_on_version_change(mongo):
+    async def run():
+        registry = make_registry(mongo, [])
+        assert await registry.reload()
+        assert not await registry.reload()
+        await registry.bump_version()
+        assert await registry.reload()
+        return registry.version
+
+    assert asyncio.run(run()) == 1
+
+
+def test_content_hash_follows_data_changed_without_a_version_bump(mongo):
+    async def run():
+        registry, other = make_registry(mongo, SEEDS), make_registry(mongo, SEEDS)
+        await mongo.global_threats.insert_many([dict(s) for s in SEEDS])
+        await registry.reload(force=True)
+        await other.reload(force=True)
+        assert registry.index.content_hash == other.index.content_hash
+        before = registry.index.content_hash
+
+        # A change-stream reload after a direct edit
+        await mongo.global_threats.update_one({"id": "s1"}, {"$set": {"radius_km": 50.0}})
+        await registry.reload(force=True)
+        assert registry.version == 0
+        return before, registry.index.content_hash
+
+    before, after = asyncio.run(run())
+    assert before != after
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from metrics import MetricsRegistry
+from trip_lifecycle import TripLifecycleSweeper, trip_end_at
+
+NOW = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def make_sweeper(mongo, evicted, **kwargs):
+    sweeper = TripLifecycleSweeper(mongo, evicted.extend, registry=MetricsRegistry(), **kwargs)
+    sweeper._swept_until = NOW - timedelta(hours=1)
+    return sweeper
+
+
+async def register(mongo, tourist_id, ends_in_minutes, active=True):
+    await mongo.tourists.insert_one(
+        {"id": tourist_id, "is_active": active, "trip_end_at": NOW + timedelta(minutes=ends_in_minutes)}
+    )
+
+
+def test_trip_end_at_normalises_to_utc():
+    assert trip_end_at(datetime(2026, 6, 1, 12)) == NOW
+    assert trip_end_at(datetime.fromisoformat("2026-06-01T17:30:00+05:30")) == NOW
+
+
+def test_ended_trips_are_deactivated_and_evicted(mongo):
+    evicted = []
+
+    async def run():
+        sweeper = make_sweeper(mongo, evicted)
+        await sweeper.seed_counters()
+        for tourist_id, ends_in in (("t1", -30), ("t2", -5), ("t3", 30)):
+            await register(mongo, tourist_id, ends_in)
+        await mongo.counters.update_one({"_id": "tourists"}, {"$set": {"total": 3, "active": 3}})
+        assert await sweeper.sweep(NOW) == 2
+        assert await sweeper.sweep(NOW) == 0
+        active = await mongo.tourists.distinct("id", {"is_active": True})
+        return active, await sweeper.counters()
+
+    active, counters = asyncio.run(run())
+    assert sorted(evicted) == ["t1", "t2"]
+    assert active == ["t3"]
+    assert counters == {"total": 3, "active": 1}
+
+
+def test_trips_that_ended_long_ago_are_still_deactivated(mongo):
+    evicted = []
+
+    async def run():
+        sweeper = make_sweeper(mongo, evicted)
+        # Ended before the last sweep, e.g. while every worker was down
+        await register(mongo, "t1", -24 * 60)
+        return await sweeper.sweep(NOW)
+
+    assert asyncio.run(run()) == 1
+    assert evicted == ["t1"]
+
+
+def test_every_worker_evicts_tourists_another_deactivated(mongo):
+    first, second = [], []
+
+    async def run():
+        await register(mongo, "t1", -5)
+        await make_sweeper(mongo, first).sweep(NOW)
+        other = make_sweeper(mongo, second)
+        assert await other.sweep(NOW) == 1
+        assert other.deactivated.labels().value == 0
+        # Once it has swept past the trip end, the tourist is not evicted again
+        assert await other.sweep(NOW + timedelta(minutes=1)) == 0
+
+    asyncio.run(run())
+    assert first == second == ["t1"]
+
+
+def test_sweep_pages_through_batches(mongo):
+    evicted = []
+
+    async def run():
+        sweeper = make_sweeper(mongo, evicted, batch_size=3)
+        for i in range(10):
+            await register(mongo, f"t{i}", -i - 1)
+        return await sweeper.sweep(NOW)
+
+    assert asyncio.run(run()) == 10
+    assert sorted(evicted) == sorted(f"t{i}" for i in range(10))